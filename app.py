@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, render_template_string
 import os
 import json
 import numpy as np
@@ -9,14 +9,31 @@ import subprocess
 from sentence_transformers import SentenceTransformer
 import tempfile
 from werkzeug.utils import secure_filename
+from urllib.parse import urlencode
 import shutil
 import hashlib
 from datetime import datetime
 from tqdm import tqdm
+from catalog_db import DocumentCatalogDB, SCAN_STATES
+from chunk_store import ChunkStore
+from doc_chunker import chunk_text
+from pipeline import Stage, run_pipeline
+from ocr import OCR_AVAILABLE, OcrEngine, page_pdf_bytes
+from index_store import IndexReader, publish_index, read_current_version, read_version_metadata
+from retrieval import (build_lucene_classpath, semantic_search,
+                       build_chunk_position_map, lucene_hits_to_indices, combine_results,
+                       run_lucene_search, LuceneBatchUnsupported)
 import sys
 import logging
 import time
 import traceback
+import io
+import fcntl
+import threading
+from contextlib import contextmanager
+from collections import Counter
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
 
 app = Flask(__name__)
 
@@ -24,16 +41,106 @@ app = Flask(__name__)
 UPLOAD_FOLDER = './uploads'
 DOCS_DIR = "./docs"
 INDEX_FILE = "indexed_docs.json"
-CATALOG_FILE = "document_catalog.json"  # New: tracks indexed files
+CATALOG_DB_FILE = "document_catalog.db"  # SQLite catalog of indexed files and chunks
+CATALOG_FILE = "document_catalog.json"  # Legacy JSON catalog, imported into CATALOG_DB_FILE once
 LUCENE_INDEX_DIR = "./lucene_index"
 LUCENE_INPUT_FILE = "lucene_input.json"
-LUCENE_RESULTS_FILE = "lucene_results.json"
-LUCENE_CHUNKS_FILE = "lucene_chunks.json"
+LUCENE_RESULTS_FILE = "lucene_results.json"  # where LuceneIndexerSearcher writes search results
+LUCENE_SEARCH_LOCK_FILE = "lucene_search.lock"  # Serializes JVM searches sharing LUCENE_RESULTS_FILE
+# Set to 1 once the deployed searcher honors a per-request "results_file"; searches then
+# use private result files and run concurrently instead of under LUCENE_SEARCH_LOCK_FILE
+LUCENE_PRIVATE_RESULTS_SUPPORTED = os.getenv("LUCENE_PRIVATE_RESULTS_SUPPORTED", "0") == "1"
+LUCENE_CHUNKS_FILE = "lucene_chunks.json"  # Chunk metadata written by the Java indexer
+LUCENE_CHUNKS_OUTPUT_FILES = ["lucene_chunks_temp.json", LUCENE_CHUNKS_FILE]
+CHUNK_STORE_DIR = "./chunk_store"  # Per-document chunk metadata segments
+INDEX_VERSIONS_DIR = "./index_versions"  # Published query index snapshots (see index_store.py)
+INDEX_KEEP_VERSIONS = 2  # unpinned snapshots kept after each publish
+INDEX_LOCK_FILE = "indexing.lock"  # Serializes indexing across worker processes
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "your-anthropic-api-key")
 NUM_QA_PAIRS = 2
 JAVA_CLASS = "LuceneIndexerSearcher"
 LIBS = "./libs"
 
+# Who chunks documents during /index: "java" (the Lucene indexer writes lucene_chunks.json)
+# or "python" (doc_chunker, streamed per document while Lucene indexes in the background)
+CHUNKER = os.getenv("CHUNKER", "java")
+LUCENE_CHUNKS_INPUT_FILE = "lucene_index_chunks.json"  # chunks handed to the Java indexer in python mode
+# Python chunking needs the Java indexer's "index-chunks" action, which the
+# LuceneIndexerSearcher build in LIBS does not have yet; set to 1 once it does
+LUCENE_INDEX_CHUNKS_SUPPORTED = os.getenv("LUCENE_INDEX_CHUNKS_SUPPORTED", "0") == "1"
+
+if CHUNKER not in ("java", "python"):
+    raise ValueError(f"Unknown CHUNKER '{CHUNKER}'. Use 'java' or 'python'")
+if CHUNKER == "python" and not LUCENE_INDEX_CHUNKS_SUPPORTED:
+    raise RuntimeError(
+        f"CHUNKER=python requires a {JAVA_CLASS} with the \"index-chunks\" action, "
+        "which is not available; use CHUNKER=java, or set LUCENE_INDEX_CHUNKS_SUPPORTED=1 "
+        "after deploying a Java indexer that implements it"
+    )
+
+# OCR fallback for PDF pages without a text layer (needs pytesseract + pdf2image)
+OCR_ENABLED = os.getenv("OCR_ENABLED", "1") == "1"
+OCR_CACHE_DIR = "./ocr_cache"
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))  # tesseract processes per document
+OCR_DOC_WORKERS = 2  # documents OCR'd at once by the indexing pipeline's ocr stage
+OCR_MAX_PAGES = 50  # pages OCR'd per document
+OCR_BUDGET_SECONDS = 120  # wall-clock OCR budget per document
+OCR_MIN_PAGE_CHARS = 20  # pages with less extracted text are treated as image-only
+
+# DOCS_DIR scan state: endpoints read the stored diff; a background refresher keeps it current
+SCAN_MAX_AGE_SECONDS = int(os.getenv("SCAN_MAX_AGE_SECONDS", "30"))  # /index rescans when the stored scan is older
+SCAN_REFRESH_SECONDS = 15
+
+# Catalog/status pagination
+CATALOG_PAGE_SIZE = 50
+CATALOG_MAX_PAGE_SIZE = 500
+CATALOG_FILTER_ARGS = ("state", "extension", "modified_after", "modified_before", "indexed_after", "indexed_before")
+
+# Indexing pipeline: bounded queues between extract -> chunk -> summarize -> embed -> enrich
+INDEX_QUEUE_SIZE = 64
+EXTRACT_WORKERS = 2
+EMBED_BATCH_SIZE = 64  # chunks per encode call, across documents
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "8"))  # concurrent Claude calls per LLM stage
+
+# "inline": summaries/Q&A are generated before a chunk is embedded and published.
+# "deferred": chunks are embedded from raw content and published at once; a background
+# worker adds summaries/Q&A later, re-embeds and republishes.
+ENRICHMENT_MODE = os.getenv("ENRICHMENT_MODE", "inline")
+ENRICHMENT_BATCH_CHUNKS = 64  # chunks enriched per republish
+ENRICHMENT_POLL_SECONDS = 30
+ENRICHMENT_LOCK_FILE = "enrichment.lock"  # one enrichment worker per host
+ENRICHMENT_MAX_ATTEMPTS = 5  # failed summary/Q&A calls per chunk before it is left unenriched
+ENRICHMENT_RETRY_SECONDS = 60  # backoff after the first failure, doubled on each further one
+
+# Prompt caching for /query answer generation
+# "anthropic" sends cache_control breakpoints, "local" uses an in-process stand-in
+# (no API calls, for tests), "off" sends the plain single-message prompt.
+PROMPT_CACHE_MODE = os.getenv("PROMPT_CACHE_MODE", "anthropic")
+HOT_CHUNK_LIMIT = 20  # most frequently retrieved chunks kept in the cached prefix
+HOT_CHUNK_REFRESH_QUERIES = 50  # recompute the hot set every N queries so the prefix stays stable
+DOC_SUMMARY_MAX_CHARS = 1500
+QUERY_SYSTEM_PROMPT = (
+    "You answer questions about an indexed document collection. "
+    "Use only the provided context blocks, cite the document name and chunk number "
+    "you relied on, and say so when the context does not contain the answer."
+)
+
+# How semantic and Lucene results are combined: "union" or "rrf" (reciprocal rank fusion)
+FUSION_METHOD = os.getenv("FUSION_METHOD", "union")
+
+# Upper bound on queries accepted by one /query/batch request
+MAX_BATCH_QUERIES = 10000
+
+# Uploads are streamed in blocks; bodies up to this size are also kept in memory for extraction
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+UPLOAD_BUFFER_MAX_BYTES = 64 * 1024 * 1024
+
+# Latency histogram buckets (seconds) for /metrics
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Each worker process snapshots its histograms here; /metrics sums every snapshot
+METRICS_DIR = os.getenv("METRICS_DIR", "./metrics")
+METRICS_FLUSH_SECONDS = 5  # how often each worker writes its snapshot
+
 # Logging Configuration
 logging.basicConfig(
     level=logging.INFO,
@@ -51,6 +158,7 @@ query_logger = logging.getLogger('Query')
 file_logger = logging.getLogger('FileOps')
 java_logger = logging.getLogger('JavaLucene')
 ai_logger = logging.getLogger('AI')
+metrics_logger = logging.getLogger('Metrics')
 
 # Set log levels
 app_logger.setLevel(logging.INFO)
@@ -59,6 +167,8 @@ query_logger.setLevel(logging.INFO)
 file_logger.setLevel(logging.DEBUG)
 java_logger.setLevel(logging.INFO)
 ai_logger.setLevel(logging.INFO)
+# Per-stage timing spans are logged at INFO; METRICS_LOG_LEVEL=WARNING silences them
+metrics_logger.setLevel(os.getenv("METRICS_LOG_LEVEL", "INFO").upper())
 
 # Ensure directories exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -84,6 +194,171 @@ try:
 except Exception as e:
     ai_logger.error(f"❌ Failed to load SentenceTransformer model: {e}")
 
+# Stage latency metrics
+class StageMetrics:
+    """Thread-safe latency histograms keyed by pipeline stage, exported in Prometheus text format.
+
+    Observations are aggregated in memory. Every gunicorn worker keeps its own
+    histograms, so each process writes them to metrics_dir/<pid>.json from a
+    background flusher (start_metrics_flusher) and when it serves a scrape, and
+    render_prometheus sums all snapshots. Snapshots of exited workers are kept
+    so counters never go backwards; clear_metrics_dir resets them at startup.
+    """
+
+    def __init__(self, buckets=METRICS_BUCKETS, metrics_dir=METRICS_DIR):
+        self.buckets = tuple(sorted(buckets))
+        self.metrics_dir = metrics_dir
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pid = os.getpid()
+        self.dirty = False
+        self.histograms = {}  # stage -> {"counts": [...], "sum": float, "count": int}
+        self.errors = Counter()
+        os.makedirs(metrics_dir, exist_ok=True)
+
+    def observe(self, stage, seconds, error=False):
+        with self.lock:
+            if self.pid != os.getpid():
+                # Forked worker: the parent's observations stay in the parent's snapshot
+                self.pid = os.getpid()
+                self.histograms = {}
+                self.errors = Counter()
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self.histograms[stage] = histogram
+            for i, upper_bound in enumerate(self.buckets):
+                if seconds <= upper_bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+            if error:
+                self.errors[stage] += 1
+            self.dirty = True
+
+    def flush(self):
+        """Write this process's snapshot if anything was observed since the last flush."""
+        with self.flush_lock:
+            with self.lock:
+                if not self.dirty or self.pid != os.getpid():
+                    return  # nothing new (or nothing observed since the fork)
+                snapshot = json.dumps({"histograms": self.histograms, "errors": self.errors})
+                self.dirty = False
+            path = os.path.join(self.metrics_dir, f"{self.pid}.json")
+            try:
+                with open(f"{path}.tmp", "w") as f:
+                    f.write(snapshot)
+                os.replace(f"{path}.tmp", path)
+            except OSError as e:
+                self.dirty = True
+                metrics_logger.warning(f"⚠️  Could not write metrics snapshot {path}: {e}")
+
+    def _merged_snapshots(self):
+        """Sum the snapshots of every worker process."""
+        histograms = {}
+        errors = Counter()
+        for name in os.listdir(self.metrics_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.metrics_dir, name), "r") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue  # removed or replaced while listing
+            for stage, histogram in snapshot["histograms"].items():
+                merged = histograms.setdefault(stage, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+                merged["counts"] = [a + b for a, b in zip(merged["counts"], histogram["counts"])]
+                merged["sum"] += histogram["sum"]
+                merged["count"] += histogram["count"]
+            errors.update(snapshot["errors"])
+        return histograms, errors
+
+    def render_prometheus(self):
+        """Render all histograms, summed over worker processes, as Prometheus exposition text."""
+        self.flush()
+        histograms, errors = self._merged_snapshots()
+
+        lines = [
+            "# HELP docsearch_stage_duration_seconds Duration of query and indexing stages.",
+            "# TYPE docsearch_stage_duration_seconds histogram"
+        ]
+        for stage in sorted(histograms):
+            histogram = histograms[stage]
+            for upper_bound, count in zip(self.buckets, histogram["counts"]):
+                lines.append(f'docsearch_stage_duration_seconds_bucket{{stage="{stage}",le="{upper_bound:g}"}} {count}')
+            lines.append(f'docsearch_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'docsearch_stage_duration_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+            lines.append(f'docsearch_stage_duration_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+        lines.append("# HELP docsearch_stage_errors_total Stages that raised an exception.")
+        lines.append("# TYPE docsearch_stage_errors_total counter")
+        for stage in sorted(errors):
+            lines.append(f'docsearch_stage_errors_total{{stage="{stage}"}} {errors[stage]}')
+        return "\n".join(lines) + "\n"
+
+stage_metrics = StageMetrics()
+
+def clear_metrics_dir(metrics_dir=METRICS_DIR):
+    """Drop the snapshots of a previous run; called once at startup, before workers record anything."""
+    for name in os.listdir(metrics_dir):
+        if name.endswith((".json", ".tmp")):
+            try:
+                os.remove(os.path.join(metrics_dir, name))
+            except FileNotFoundError:
+                pass
+
+def metrics_flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        stage_metrics.flush()
+
+def start_metrics_flusher():
+    """Start the thread that writes this process's metrics snapshot every METRICS_FLUSH_SECONDS."""
+    thread = threading.Thread(target=metrics_flush_loop, name="metrics-flusher", daemon=True)
+    thread.start()
+    return thread
+
+@contextmanager
+def timed_stage(stage, **fields):
+    """Time a block as a named stage: records it in stage_metrics and logs a structured span."""
+    start_time = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start_time
+        stage_metrics.observe(stage, elapsed, error=error)
+        span = {"span": stage, "duration_s": round(elapsed, 6), "status": "error" if error else "ok"}
+        span.update(fields)
+        metrics_logger.info(json.dumps(span))
+
+@contextmanager
+def file_lock(path):
+    """Exclusive advisory lock shared by every worker process on this host."""
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+@contextmanager
+def try_file_lock(path):
+    """Non-blocking variant of file_lock; yields False if another process holds the lock."""
+    with open(path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 def get_file_hash(file_path):
     """Generate MD5 hash of file content for change detection."""
     start_time = time.time()
@@ -105,16 +380,24 @@ def get_file_hash(file_path):
         file_logger.error(f"❌ Error hashing file {file_path}: {e}")
         return None
 
-def get_file_info(file_path):
-    """Get file metadata for catalog."""
+def get_file_info(file_path, known=None):
+    """Get file metadata for catalog.
+
+    known is a previously recorded (size, modified_time, hash); when size and
+    mtime still match, its hash is reused instead of re-reading the file.
+    """
     file_logger.debug(f"📊 Getting file info for: {file_path}")
     
     try:
         stat = os.stat(file_path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime and known[2]:
+            file_hash = known[2]
+        else:
+            file_hash = get_file_hash(file_path)
         file_info = {
             "size": stat.st_size,
             "modified_time": stat.st_mtime,
-            "hash": get_file_hash(file_path)
+            "hash": file_hash
         }
         file_logger.debug(f"✅ File info retrieved: size={file_info['size']:,} bytes, modified={datetime.fromtimestamp(file_info['modified_time'])}")
         return file_info
@@ -122,47 +405,122 @@ def get_file_info(file_path):
         file_logger.error(f"❌ Error getting file info for {file_path}: {e}")
         return None
 
-def load_document_catalog():
-    """Load the document catalog or create new one."""
-    file_logger.debug(f"📖 Loading document catalog from: {CATALOG_FILE}")
+def save_upload_stream(file_storage, dest_path):
+    """Stream an upload to dest_path, hashing it on the way.
+
+    Returns (file_info, data): the catalog file info and the uploaded bytes, or
+    None for data when the body is larger than UPLOAD_BUFFER_MAX_BYTES.
+    """
+    start_time = time.time()
+    hash_md5 = hashlib.md5()
+    buffer = bytearray()
+    file_size = 0
     
-    if os.path.exists(CATALOG_FILE):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path) or ".", suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for block in iter(lambda: file_storage.stream.read(UPLOAD_BLOCK_SIZE), b""):
+                f.write(block)
+                hash_md5.update(block)
+                file_size += len(block)
+                if buffer is not None:
+                    buffer.extend(block)
+                    if len(buffer) > UPLOAD_BUFFER_MAX_BYTES:
+                        buffer = None
+        os.replace(tmp_path, dest_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    
+    stat = os.stat(dest_path)
+    file_info = {
+        "size": file_size,
+        "modified_time": stat.st_mtime,
+        "hash": hash_md5.hexdigest()
+    }
+    elapsed = time.time() - start_time
+    file_logger.info(f"✅ Upload saved: {dest_path} ({file_size:,} bytes, hash {file_info['hash'][:16]}..., time: {elapsed:.2f}s)")
+    return file_info, (bytes(buffer) if buffer is not None else None)
+
+def open_document_catalog():
+    """Open the SQLite catalog, importing the legacy JSON catalog on first use."""
+    catalog = DocumentCatalogDB(CATALOG_DB_FILE)
+    if catalog.is_empty() and os.path.exists(CATALOG_FILE):
         try:
-            with open(CATALOG_FILE, "r") as f:
-                catalog = json.load(f)
-            file_logger.info(f"✅ Loaded catalog: {len(catalog.get('indexed_files', {}))} files, {catalog.get('total_chunks', 0)} chunks")
-            return catalog
+            imported = catalog.import_json_catalog(CATALOG_FILE)
+            os.replace(CATALOG_FILE, CATALOG_FILE + ".migrated")
+            file_logger.info(f"✅ Imported {imported} files from {CATALOG_FILE} into {CATALOG_DB_FILE}")
         except Exception as e:
-            file_logger.error(f"❌ Error loading catalog: {e}")
-    
-    # Return empty catalog structure
-    file_logger.info("📝 Creating new empty catalog")
-    return {
-        "version": "1.0",
-        "last_updated": datetime.now().isoformat(),
-        "indexed_files": {},  # filename -> {hash, size, modified_time, chunks_count, indexed_time}
-        "total_chunks": 0
+            file_logger.error(f"❌ Error importing legacy catalog {CATALOG_FILE}: {e}")
+    return catalog
+
+def load_document_catalog():
+    """Load the document catalog as a dict (indexed_files, total_chunks, last_updated)."""
+    file_logger.debug(f"📖 Loading document catalog from: {CATALOG_DB_FILE}")
+    
+    catalog = {
+        "version": "2.0",
+        "last_updated": catalog_db.last_updated() or datetime.now().isoformat(),
+        "indexed_files": catalog_db.indexed_files(),  # filename -> {hash, size, modified_time, chunks_count, indexed_time}
+        "total_chunks": catalog_db.total_chunks()
     }
+    file_logger.info(f"✅ Loaded catalog: {len(catalog['indexed_files'])} files, {catalog['total_chunks']} chunks")
+    return catalog
 
-def save_document_catalog(catalog):
-    """Save the document catalog."""
-    file_logger.debug(f"💾 Saving document catalog to: {CATALOG_FILE}")
-    
+def update_catalog_file(filename, file_info, chunks):
+    """Record one indexed file and its chunks in a single catalog transaction."""
     try:
-        catalog["last_updated"] = datetime.now().isoformat()
-        with open(CATALOG_FILE, "w") as f:
-            json.dump(catalog, f, indent=2)
-        file_logger.info(f"✅ Catalog saved: {len(catalog.get('indexed_files', {}))} files, {catalog.get('total_chunks', 0)} chunks")
+        catalog_db.upsert_file(filename, file_info, chunks)
+        file_logger.debug(f"💾 Catalog updated for {filename} ({len(chunks)} chunks)")
         return True
     except Exception as e:
-        file_logger.error(f"❌ Error saving catalog: {e}")
+        file_logger.error(f"❌ Error updating catalog for {filename}: {e}")
         return False
 
+catalog_db = open_document_catalog()
+chunk_store = ChunkStore(CHUNK_STORE_DIR)
+index_reader = IndexReader(INDEX_VERSIONS_DIR)
+
+def save_index_file(indexed_docs):
+    """Atomically replace INDEX_FILE, so a crash mid-write never leaves a truncated index."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(INDEX_FILE) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(indexed_docs, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, INDEX_FILE)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def publish_search_index(indexed_docs):
+    """Snapshot indexed_docs and the Lucene index as a new version; workers switch on their next query."""
+    # Counted here, where every entry is written anyway, so /status never scans the chunks
+    metadata = {"pending_enrichment": sum(1 for entry in indexed_docs if entry.get("enriched") is False)}
+    with timed_stage("index.publish", chunks=len(indexed_docs)):
+        version = publish_index(INDEX_VERSIONS_DIR, indexed_docs, LUCENE_INDEX_DIR, INDEX_KEEP_VERSIONS,
+                                metadata=metadata)
+    indexing_logger.info(f"📢 Published index version {version} ({len(indexed_docs)} chunks)")
+    if ENRICHMENT_MODE == "deferred":
+        enrichment_wakeup.set()
+    return version
+
+def bootstrap_index_versions():
+    """Publish an existing indexed_docs.json the first time versioned serving is used."""
+    if read_current_version(INDEX_VERSIONS_DIR) is None and os.path.exists(INDEX_FILE):
+        with open(INDEX_FILE, "r") as f:
+            publish_search_index(json.load(f))
+
 def get_files_to_index():
     """Determine which files need to be indexed (new or modified)."""
     indexing_logger.info("🔍 Scanning for files that need indexing...")
     
     catalog = load_document_catalog()
+    known_stats = catalog_db.known_file_stats()
+    dir_mtime = docs_dir_mtime()
     files_to_index = []
     files_to_remove = []
     
@@ -175,7 +533,7 @@ def get_files_to_index():
         for i, filename in enumerate(doc_files, 1):
             file_path = os.path.join(DOCS_DIR, filename)
             indexing_logger.debug(f"   📄 [{i}/{len(doc_files)}] Analyzing: {filename}")
-            file_info = get_file_info(file_path)
+            file_info = get_file_info(file_path, known_stats.get(filename))
             if file_info:
                 current_files[filename] = file_info
             else:
@@ -212,8 +570,99 @@ def get_files_to_index():
     indexing_logger.info(f"   • Files to remove: {len(files_to_remove)}")
     indexing_logger.info(f"   • Files up to date: {len(current_files) - len(files_to_index)}")
     
+    # Persist the diff so catalog/status pages can be served from the database
+    catalog_db.record_scan(current_files, files_to_index, files_to_remove, dir_mtime)
+    
     return files_to_index, files_to_remove, current_files
 
+def docs_dir_mtime():
+    """DOCS_DIR's own mtime; it changes whenever a file is added, removed or renamed."""
+    try:
+        return os.stat(DOCS_DIR).st_mtime
+    except OSError:
+        return 0.0
+
+def scan_freshness(max_age=SCAN_MAX_AGE_SECONDS):
+    """When the stored scan ran, how old it is and whether it is stale."""
+    scanned_at = catalog_db.last_scan()
+    if scanned_at is None:
+        return {"scanned_at": None, "age_seconds": None, "stale": True}
+    age = (datetime.now() - datetime.fromisoformat(scanned_at)).total_seconds()
+    stale = age > max_age or catalog_db.last_scan_dir_mtime() != docs_dir_mtime()
+    return {"scanned_at": scanned_at, "age_seconds": round(age, 1), "stale": stale}
+
+def get_scan(max_age=SCAN_MAX_AGE_SECONDS, force=False):
+    """DOCS_DIR diff as (files_to_index, files_to_remove, current_files), rescanning only when stale."""
+    if force or scan_freshness(max_age)["stale"]:
+        return get_files_to_index()
+    indexing_logger.info("📋 Using stored scan state (fresh)")
+    return catalog_db.load_scan()
+
+def ensure_scan(rescan=False):
+    """Make sure a stored scan exists (or refresh it on request); returns its timestamp."""
+    if rescan or catalog_db.last_scan() is None:
+        get_files_to_index()
+    return catalog_db.last_scan()
+
+def parse_catalog_query(args):
+    """Filters and paging for catalog APIs from request args.
+
+    Returns (filters, page, per_page) or raises ValueError with a message for the client.
+    """
+    state = args.get("state") or None
+    if state and state not in SCAN_STATES:
+        raise ValueError(f"Unknown state '{state}'. Use one of: {', '.join(SCAN_STATES)}")
+    
+    def parse_date(name):
+        value = args.get(name)
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"'{name}' must be an ISO date, e.g. 2024-01-31")
+    
+    def epoch(name):
+        date = parse_date(name)
+        return date.timestamp() if date else None
+    
+    def iso(name):
+        # indexed_time is stored as datetime.isoformat() text and compared as a string
+        date = parse_date(name)
+        return date.isoformat() if date else None
+    
+    filters = {
+        "state": state,
+        "extension": args.get("extension") or None,
+        "modified_after": epoch("modified_after"),
+        "modified_before": epoch("modified_before"),
+        "indexed_after": iso("indexed_after"),
+        "indexed_before": iso("indexed_before")
+    }
+    try:
+        page = max(1, int(args.get("page", 1)))
+        per_page = min(CATALOG_MAX_PAGE_SIZE, max(1, int(args.get("per_page", CATALOG_PAGE_SIZE))))
+    except ValueError:
+        raise ValueError("'page' and 'per_page' must be integers")
+    return filters, page, per_page
+
+def query_catalog(args):
+    """One filtered page of the catalog as a JSON-ready dict."""
+    filters, page, per_page = parse_catalog_query(args)
+    scanned_at = ensure_scan(args.get("rescan") in ("1", "true"))
+    total, items = catalog_db.list_entries(limit=per_page, offset=(page - 1) * per_page, **filters)
+    return {
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": (total + per_page - 1) // per_page,
+        "filters": {key: args.get(key) for key in CATALOG_FILTER_ARGS if args.get(key)},
+        "counts": catalog_db.state_counts(),
+        "scanned_at": scanned_at,
+        "scan": scan_freshness(),
+        "items": items
+    }
+
 def rebuild_lucene_index_incremental(files_to_index):
     """Rebuild Lucene index with only new/modified files with progress tracking."""
     if not files_to_index:
@@ -318,113 +767,84 @@ def rebuild_lucene_index_incremental(files_to_index):
         except Exception as e:
             java_logger.warning(f"⚠️  Error cleaning up temp directory: {e}")
 
-def merge_lucene_chunks():
-    if not files_to_index:
-        return True, "No files to index"
-    
-    print(f"🔍 Building Lucene index for {len(files_to_index)} files...")
-    
-    # Create temporary directory with only files to index
-    temp_docs_dir = tempfile.mkdtemp()
+def index_chunks_in_lucene(chunks):
+    """Index pre-built chunks with the Java indexer ("index-chunks" action).
+
+    The indexer replaces every Lucene document whose doc_name appears in the
+    chunks file, so chunk ids match the Python chunker exactly.
+    """
+    java_logger.info(f"🔍 Starting Lucene indexing of {len(chunks)} pre-built chunks")
     try:
-        print("📁 Copying files to temporary directory...")
-        for i, filename in enumerate(files_to_index, 1):
-            src_path = os.path.join(DOCS_DIR, filename)
-            dst_path = os.path.join(temp_docs_dir, filename)
-            shutil.copy2(src_path, dst_path)
-            print(f"   📄 [{i}/{len(files_to_index)}] Copied: {filename}")
-            sys.stdout.flush()
+        with open(LUCENE_CHUNKS_INPUT_FILE, "w") as f:
+            json.dump(chunks, f)
         
-        # Create input for Java indexer
         lucene_input = {
-            "action": "index-dir",
-            "docs_dir": temp_docs_dir,
+            "action": "index-chunks",
+            "chunks_file": LUCENE_CHUNKS_INPUT_FILE,
             "index_dir": LUCENE_INDEX_DIR
         }
-        
         with open(LUCENE_INPUT_FILE, "w") as f:
-            json.dump(lucene_input, f)
-        
-        # Run Java indexer
-        classpath = (
-            f".:"
-            f"{LIBS}/lucene-core-9.12.2.jar:"
-            f"{LIBS}/lucene-analyzers-common-9.12.2.jar:"
-            f"{LIBS}/lucene-queryparser-9.12.2.jar:"
-            f"{LIBS}/gson-2.10.1.jar:"
-            f"{LIBS}/pdfbox-3.0.5.jar:"
-            f"{LIBS}/pdfbox-io-3.0.5.jar:"
-            f"{LIBS}/fontbox-3.0.5.jar:"
-            f"{LIBS}/poi-4.1.2.jar:"
-            f"{LIBS}/poi-ooxml-4.1.2.jar:"
-            f"{LIBS}/poi-scratchpad-4.1.2.jar:"
-            f"{LIBS}/poi-ooxml-schemas-4.1.2.jar:"
-            f"{LIBS}/xmlbeans-3.1.0.jar:"
-            f"{LIBS}/compress.1.9.2.jar:"
-            f"{LIBS}/commons-collections4-4.4.jar"
-        )
+            json.dump(lucene_input, f, indent=2)
         
-        print("🚀 Running Java Lucene indexer...")
+        java_start = time.time()
         result = subprocess.run(
-            ["java", "-cp", classpath, JAVA_CLASS, LUCENE_INPUT_FILE],
+            ["java", "-cp", build_lucene_classpath(LIBS), JAVA_CLASS, LUCENE_INPUT_FILE],
             capture_output=True,
             text=True,
             check=True
         )
-        print("✅ Java indexer completed successfully")
+        java_logger.info(f"✅ Java chunk indexing completed (time: {time.time() - java_start:.2f}s)")
+        if result.stderr:
+            java_logger.warning(f"⚠️  Java stderr: {result.stderr}")
         return True, result.stdout
-        
     except subprocess.CalledProcessError as e:
-        print(f"❌ Java indexer failed: {e.stderr}")
+        java_logger.error(f"❌ Java chunk indexing failed: {e.stderr}")
         return False, f"Error running Java Lucene indexer: {e.stderr}"
-    finally:
-        # Clean up temp directory
-        print("🧹 Cleaning up temporary directory...")
-        shutil.rmtree(temp_docs_dir, ignore_errors=True)
-
-def merge_lucene_chunks():
-    """Merge new chunks with existing chunk metadata."""
-    # Load existing chunks
-    existing_chunks = []
-    if os.path.exists(LUCENE_CHUNKS_FILE):
-        try:
-            with open(LUCENE_CHUNKS_FILE, "r") as f:
-                existing_chunks = json.load(f)
-        except Exception as e:
-            print(f"Error loading existing chunks: {e}")
+    except Exception as e:
+        java_logger.error(f"❌ Unexpected error in Lucene chunk indexing: {e}")
+        return False, f"Unexpected error: {str(e)}"
+
+def merge_lucene_chunks(files_to_index, run_started):
+    """Move the Java indexer's chunk output for files_to_index into the chunk store.
+
+    Only the segments of the given documents are rewritten; returns their chunks.
+    Output older than run_started is left over from an earlier run and ignored.
+    """
+    # Allow for filesystems that store mtimes at one-second resolution
+    fresh_after = int(run_started) - 1
+    output_file = next((path for path in LUCENE_CHUNKS_OUTPUT_FILES
+                        if os.path.exists(path) and os.path.getmtime(path) >= fresh_after), None)
+    if output_file is None:
+        indexing_logger.warning("⚠️  Java indexer produced no chunk metadata")
+        return []
     
-    # The Java indexer creates a new lucene_chunks.json with new files
-    # We need to merge this with existing chunks
-    temp_chunks_file = "lucene_chunks_temp.json"
-    if os.path.exists(temp_chunks_file):
-        try:
-            with open(temp_chunks_file, "r") as f:
-                new_chunks = json.load(f)
-            
-            # Merge chunks (remove old chunks for updated files)
-            files_to_index, _, _ = get_files_to_index()
-            
-            # Remove chunks from files that were re-indexed
-            filtered_existing = [chunk for chunk in existing_chunks 
-                               if chunk["doc_name"] not in files_to_index]
-            
-            # Add new chunks
-            merged_chunks = filtered_existing + new_chunks
-            
-            # Save merged chunks
-            with open(LUCENE_CHUNKS_FILE, "w") as f:
-                json.dump(merged_chunks, f, indent=2)
-            
-            # Clean up temp file
-            os.remove(temp_chunks_file)
-            
-            return merged_chunks
-            
-        except Exception as e:
-            print(f"Error merging chunks: {e}")
-            return existing_chunks
+    try:
+        with open(output_file, "r") as f:
+            java_chunks = json.load(f)
+    except Exception as e:
+        indexing_logger.error(f"❌ Error loading chunk metadata from {output_file}: {e}")
+        return []
+    
+    wanted = set(files_to_index)
+    chunks_by_doc = {filename: [] for filename in files_to_index}
+    for chunk in java_chunks:
+        if chunk["doc_name"] in wanted:
+            chunks_by_doc[chunk["doc_name"]].append(chunk)
     
-    return existing_chunks
+    new_chunks = []
+    for filename in files_to_index:
+        doc_chunks = chunks_by_doc[filename]
+        if doc_chunks:
+            chunk_store.replace_document(filename, doc_chunks)
+        else:
+            chunk_store.remove_document(filename)
+        new_chunks.extend(doc_chunks)
+    indexing_logger.info(f"📦 Stored {len(new_chunks)} chunks for {len(files_to_index)} documents")
+    
+    # The output is per run; the store is now the source of truth
+    os.remove(output_file)
+    
+    return new_chunks
 
 # Utility functions
 def get_local_embedding(text):
@@ -487,9 +907,49 @@ def generate_qa_pairs(chunk, doc_text, num_pairs=NUM_QA_PAIRS):
         ai_logger.error(f"   Traceback: {traceback.format_exc()}")
         return []
 
-def extract_text_from_file(file_path):
-    """Extract text from supported file types."""
-    file_logger.info(f"📖 Extracting text from: {file_path}")
+ocr_engine = OcrEngine(OCR_CACHE_DIR, workers=OCR_WORKERS) if OCR_ENABLED and OCR_AVAILABLE else None
+
+def prepare_ocr_job(pdf_reader, page_texts, file_path):
+    """Collect the pages without a text layer for OCR; returns a job for run_ocr_job, or None."""
+    image_pages = [i for i, page_text in enumerate(page_texts) if len(page_text.strip()) < OCR_MIN_PAGE_CHARS]
+    if not image_pages:
+        return None
+    if ocr_engine is None:
+        file_logger.warning(f"⚠️  {len(image_pages)} pages without text in {file_path}; OCR "
+                            f"{'disabled' if not OCR_ENABLED else 'unavailable (install pytesseract and pdf2image)'}")
+        return None
+    
+    if len(image_pages) > OCR_MAX_PAGES:
+        file_logger.warning(f"⚠️  OCR limited to {OCR_MAX_PAGES} of {len(image_pages)} image-only pages in {file_path}")
+        image_pages = image_pages[:OCR_MAX_PAGES]
+    pages = {i: page_pdf_bytes(pdf_reader, i) for i in image_pages}
+    return {"file_path": file_path, "page_texts": page_texts, "pages": pages}
+
+def run_ocr_job(job):
+    """OCR the job's image-only pages and return the document text with them filled in."""
+    file_path, page_texts = job["file_path"], job["page_texts"]
+    file_logger.info(f"🔎 OCR for {len(job['pages'])} image-only pages of {file_path}")
+    with timed_stage("extract.ocr", pages=len(job["pages"])):
+        ocr_texts, failed, skipped = ocr_engine.ocr_pages(job["pages"], budget_seconds=OCR_BUDGET_SECONDS)
+    for i, ocr_text in ocr_texts.items():
+        page_texts[i] = ocr_text
+        file_logger.debug(f"      Page {i+1}: {len(ocr_text)} chars (OCR)")
+    if failed:
+        file_logger.error(f"❌ OCR failed for {len(failed)} pages of {file_path}: {[i + 1 for i in failed]}")
+    if skipped:
+        file_logger.warning(f"⚠️  OCR budget reached: {len(skipped)} pages skipped in {file_path}")
+    return "\n".join(page_texts).strip()
+
+def extract_text_from_file(file_path, data=None, ocr_jobs=None):
+    """Extract text from supported file types.
+
+    If data holds the file's bytes (e.g. a just-received upload) it is parsed
+    from memory instead of re-reading file_path; the path still selects the type.
+    PDF pages without a text layer are OCR'd here, unless an ocr_jobs list is
+    given: then the text layer alone is returned and the OCR job is appended
+    to ocr_jobs for the caller to run with run_ocr_job.
+    """
+    file_logger.info(f"📖 Extracting text from: {file_path}{' (in memory)' if data is not None else ''}")
     start_time = time.time()
     
     try:
@@ -500,11 +960,11 @@ def extract_text_from_file(file_path):
         text = ""
         if ext == '.docx':
             file_logger.debug("   Using python-docx for DOCX extraction")
-            doc = Document(file_path)
+            doc = Document(io.BytesIO(data) if data is not None else file_path)
             text = "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
         elif ext == '.pdf':
             file_logger.debug("   Using PyPDF2 for PDF extraction")
-            with open(file_path, 'rb') as f:
+            with (io.BytesIO(data) if data is not None else open(file_path, 'rb')) as f:
                 pdf_reader = PyPDF2.PdfReader(f)
                 page_texts = []
                 for i, page in enumerate(pdf_reader.pages):
@@ -512,10 +972,19 @@ def extract_text_from_file(file_path):
                     page_texts.append(page_text)
                     file_logger.debug(f"      Page {i+1}: {len(page_text)} chars")
                 text = "\n".join(page_texts).strip()
+                ocr_job = prepare_ocr_job(pdf_reader, page_texts, file_path)
+            if ocr_job is not None:
+                if ocr_jobs is not None:
+                    ocr_jobs.append(ocr_job)
+                else:
+                    text = run_ocr_job(ocr_job)
         elif ext in ['.txt', '.md']:
             file_logger.debug(f"   Reading as plain text file")
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read().strip()
+            if data is not None:
+                text = data.decode('utf-8').strip()
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    text = f.read().strip()
         else:
             file_logger.warning(f"⚠️  Unsupported file type: {ext}")
             return ""
@@ -533,15 +1002,380 @@ def extract_text_from_file(file_path):
         file_logger.error(f"   Traceback: {traceback.format_exc()}")
         return ""
 
-def index_documents_incremental():
-    """Index only new or modified documents with progress tracking."""
-    files_to_index, files_to_remove, current_files = get_files_to_index()
-    catalog = load_document_catalog()
+def contextualize_chunk(chunk, summary=None):
+    """Text that gets embedded for a chunk; the summary line is left out until one exists."""
+    summary_line = f"Summary: {summary}\n" if summary else ""
+    return (
+        f"Document: {chunk['doc_name']}, Chunk {chunk['chunk_id']}\n"
+        f"Keywords: {', '.join(chunk['keywords'])}\n"
+        f"{summary_line}\n"
+        f"{chunk['content']}"
+    )
+
+def run_indexing_pipeline(files_to_index, chunks_by_doc=None, doc_texts=None, on_chunked=None):
+    """Extract, OCR, chunk, summarize, embed and enrich files_to_index as overlapping stages.
+
+    Stages are connected by bounded queues: extraction, OCR of image-only PDF
+    pages and chunking run per document, summaries and Q&A pairs are generated by ENRICH_WORKERS threads,
+    and embeddings are encoded in batches of EMBED_BATCH_SIZE across documents.
+    With ENRICHMENT_MODE=deferred the LLM stages are skipped and entries are
+    marked for the background enrichment worker.
+    chunks_by_doc supplies Java-built chunks; without it doc_chunker is used.
+    on_chunked(all_chunks) runs as soon as the last document is chunked.
+    Returns (new_chunks, new_embeddings), both in file and chunk order.
+    """
+    doc_texts = dict(doc_texts or {})
+    produced_chunks = {}
+    ocr_jobs_by_doc = {}
+    
+    def extract(filename):
+        if filename not in doc_texts:
+            ocr_jobs = []
+            with timed_stage("index.extract_text", doc=filename):
+                doc_texts[filename] = extract_text_from_file(os.path.join(DOCS_DIR, filename), ocr_jobs=ocr_jobs) or ""
+            if ocr_jobs:
+                ocr_jobs_by_doc[filename] = ocr_jobs[0]
+        return [filename]
+    
+    def ocr(filename):
+        # Its own stage, so scanned PDFs do not hold up text extraction of the other files
+        job = ocr_jobs_by_doc.pop(filename, None)
+        if job is not None:
+            doc_texts[filename] = run_ocr_job(job)
+        return [filename]
+    
+    def chunk(filename):
+        if chunks_by_doc is not None:
+            doc_chunks = chunks_by_doc.get(filename, [])
+        else:
+            with timed_stage("index.chunk", doc=filename):
+                doc_chunks = chunk_text(filename, doc_texts[filename])
+            if doc_chunks:
+                chunk_store.replace_document(filename, doc_chunks)
+            else:
+                chunk_store.remove_document(filename)
+        produced_chunks[filename] = doc_chunks
+        print(f"   📄 {filename}: {len(doc_chunks)} chunks")
+        sys.stdout.flush()
+        return [{"chunk": c, "doc_text": doc_texts[filename]} for c in doc_chunks]
+    
+    def chunking_done():
+        if on_chunked:
+            on_chunked([c for filename in files_to_index for c in produced_chunks.get(filename, [])])
+    
+    def summarize(item):
+        with timed_stage("index.summarize"):
+            item["summary"] = generate_summary(item["chunk"]["content"])
+        return [item]
+    
+    def embed(items):
+        contextualized_chunks = [contextualize_chunk(item["chunk"], item.get("summary")) for item in items]
+        with timed_stage("index.encode", chunks=len(contextualized_chunks)):
+            embeddings = embedding_model.encode(contextualized_chunks, batch_size=32, show_progress_bar=False)
+        for item, embedding in zip(items, embeddings):
+            item["embedding"] = embedding.tolist()
+        return items
+    
+    def enrich(item):
+        chunk = item["chunk"]
+        with timed_stage("index.enrich"):
+            qa_pairs = generate_qa_pairs(chunk["content"], item["doc_text"])
+        return [{
+            "doc_name": chunk["doc_name"],
+            "chunk_id": chunk["chunk_id"],
+            "chunk": chunk["content"],
+            "summary": item["summary"],
+            "keywords": chunk["keywords"],
+            "qa_pairs": qa_pairs,
+            "embedding": item["embedding"]
+        }]
+    
+    def mark_unenriched(item):
+        chunk = item["chunk"]
+        return [{
+            "doc_name": chunk["doc_name"],
+            "chunk_id": chunk["chunk_id"],
+            "chunk": chunk["content"],
+            "summary": "",
+            "keywords": chunk["keywords"],
+            "qa_pairs": [],
+            "embedding": item["embedding"],
+            "enriched": False
+        }]
+    
+    if ENRICHMENT_MODE == "deferred":
+        stages = [
+            Stage("extract", extract, workers=EXTRACT_WORKERS),
+            Stage("ocr", ocr, workers=OCR_DOC_WORKERS),
+            Stage("chunk", chunk, on_done=chunking_done),
+            Stage("embed", embed, batch_size=EMBED_BATCH_SIZE),
+            Stage("finish", mark_unenriched)
+        ]
+    else:
+        stages = [
+            Stage("extract", extract, workers=EXTRACT_WORKERS),
+            Stage("ocr", ocr, workers=OCR_DOC_WORKERS),
+            Stage("chunk", chunk, on_done=chunking_done),
+            Stage("summarize", summarize, workers=ENRICH_WORKERS),
+            Stage("embed", embed, batch_size=EMBED_BATCH_SIZE),
+            Stage("enrich", enrich, workers=ENRICH_WORKERS)
+        ]
+    with timed_stage("index.pipeline", files=len(files_to_index)):
+        new_embeddings = run_pipeline(files_to_index, stages, queue_size=INDEX_QUEUE_SIZE)
+    
+    # Stages finish out of order; keep the index file deterministic
+    file_order = {filename: i for i, filename in enumerate(files_to_index)}
+    new_embeddings.sort(key=lambda entry: (file_order[entry["doc_name"]], entry["chunk_id"]))
+    new_chunks = [c for filename in files_to_index for c in produced_chunks.get(filename, [])]
+    return new_chunks, new_embeddings
+
+def chunk_and_embed_java(files_to_index, doc_texts=None):
+    """Java indexes and chunks the files, then the chunks go through the indexing pipeline.
+
+    Returns (success, (new_chunks, new_embeddings)) or (False, error).
+    """
+    # Build Lucene index for new files
+    run_started = time.time()
+    with timed_stage("index.lucene"):
+        success, message = rebuild_lucene_index_incremental(files_to_index)
+    if not success:
+        return False, f"Failed to build Lucene index: {message}"
+    
+    print("✅ Lucene indexing completed")
+    
+    # Store chunk metadata for the files we're currently indexing
+    with timed_stage("index.merge_chunks"):
+        new_chunks = merge_lucene_chunks(files_to_index, run_started)
+    
+    if not new_chunks:
+        return True, ([], [])
+    
+    print(f"📦 Generated {len(new_chunks)} chunks from {len(files_to_index)} files")
+    
+    chunks_by_doc = {}
+    for chunk in new_chunks:
+        chunks_by_doc.setdefault(chunk['doc_name'], []).append(chunk)
+    
+    print("🧮 Extracting, summarizing, embedding and enriching...")
+    try:
+        new_chunks, new_embeddings = run_indexing_pipeline(files_to_index, chunks_by_doc, doc_texts)
+    except RuntimeError as e:
+        indexing_logger.error(f"❌ Indexing pipeline failed: {e}")
+        return False, str(e)
+    print(f"✅ Created {len(new_embeddings)} embedding entries")
+    return True, (new_chunks, new_embeddings)
+
+def chunk_and_embed_streaming(files_to_index, doc_texts=None):
+    """Chunk in Python inside the indexing pipeline; Lucene indexes in the background once chunking is done.
+
+    doc_texts may carry already extracted texts by filename.
+    Returns (success, (new_chunks, new_embeddings)) or (False, error).
+    """
+    lucene_outcome = {}
+    lucene_threads = []
+    
+    def start_lucene(all_chunks):
+        if not all_chunks:
+            return
+        def lucene_worker():
+            with timed_stage("index.lucene"):
+                lucene_outcome["result"] = index_chunks_in_lucene(all_chunks)
+        thread = threading.Thread(target=lucene_worker, name="lucene-indexer", daemon=True)
+        thread.start()
+        lucene_threads.append(thread)
+    
+    print("🧮 Extracting, chunking, summarizing, embedding and enriching...")
+    try:
+        new_chunks, new_embeddings = run_indexing_pipeline(files_to_index, None, doc_texts, on_chunked=start_lucene)
+    except RuntimeError as e:
+        indexing_logger.error(f"❌ Indexing pipeline failed: {e}")
+        return False, str(e)
+    finally:
+        for thread in lucene_threads:
+            thread.join()
+    print(f"✅ Created {len(new_embeddings)} embedding entries")
+    
+    if not new_chunks:
+        return True, ([], [])
+    success, message = lucene_outcome.get("result", (False, "Lucene indexer thread did not finish"))
+    if not success:
+        return False, f"Failed to build Lucene index: {message}"
+    print("✅ Lucene indexing completed")
+    
+    return True, (new_chunks, new_embeddings)
+
+# Deferred enrichment
+enrichment_wakeup = threading.Event()
+
+def enrich_pending_chunks(max_chunks=ENRICHMENT_BATCH_CHUNKS):
+    """Summarize, add Q&A to and re-embed up to max_chunks unenriched entries, then republish.
+
+    A chunk whose summary or Q&A call fails stays enriched=False and is retried
+    with exponential backoff, at most ENRICHMENT_MAX_ATTEMPTS times.
+    Returns the number of entries updated.
+    """
+    if not os.path.exists(INDEX_FILE):
+        return 0
+    now = time.time()
+    with open(INDEX_FILE, "r") as f:
+        pending = [entry for entry in json.load(f)
+                   if entry.get("enriched") is False
+                   and entry.get("enrich_attempts", 0) < ENRICHMENT_MAX_ATTEMPTS
+                   and entry.get("enrich_retry_at", 0) <= now][:max_chunks]
+    if not pending:
+        return 0
+    
+    ai_logger.info(f"✨ Enriching {len(pending)} chunks in the background...")
+    doc_texts = {}
+    for doc_name in {entry["doc_name"] for entry in pending}:
+        doc_texts[doc_name] = extract_text_from_file(os.path.join(DOCS_DIR, doc_name)) or ""
+    
+    with timed_stage("enrich.llm", chunks=len(pending)):
+        with ThreadPoolExecutor(max_workers=ENRICH_WORKERS) as pool:
+            summaries = list(pool.map(lambda entry: generate_summary(entry["chunk"]), pending))
+            qa_pairs = list(pool.map(lambda entry: generate_qa_pairs(entry["chunk"], doc_texts[entry["doc_name"]]), pending))
+    
+    # generate_summary/generate_qa_pairs return "" / [] when the API call fails
+    enriched = [(entry, summary, pairs) for entry, summary, pairs in zip(pending, summaries, qa_pairs)
+                if summary and pairs]
+    failed = {(entry["doc_name"], entry["chunk_id"], entry["chunk"])
+              for entry, summary, pairs in zip(pending, summaries, qa_pairs) if not (summary and pairs)}
+    
+    embeddings = []
+    if enriched:
+        with timed_stage("enrich.encode", chunks=len(enriched)):
+            contextualized_chunks = [
+                contextualize_chunk({"doc_name": entry["doc_name"], "chunk_id": entry["chunk_id"],
+                                     "keywords": entry["keywords"], "content": entry["chunk"]}, summary)
+                for entry, summary, _ in enriched
+            ]
+            embeddings = embedding_model.encode(contextualized_chunks, batch_size=32, show_progress_bar=False)
+    
+    # Keyed by content too, so a chunk reindexed meanwhile is not overwritten with stale enrichment
+    updates = {
+        (entry["doc_name"], entry["chunk_id"], entry["chunk"]): (summary, pairs, embedding.tolist())
+        for (entry, summary, pairs), embedding in zip(enriched, embeddings)
+    }
+    
+    with file_lock(INDEX_LOCK_FILE), timed_stage("enrich.publish"):
+        with open(INDEX_FILE, "r") as f:
+            all_embeddings = json.load(f)
+        updated = 0
+        retried = 0
+        for entry in all_embeddings:
+            if entry.get("enriched") is not False:
+                continue
+            key = (entry["doc_name"], entry["chunk_id"], entry["chunk"])
+            if key in updates:
+                entry["summary"], entry["qa_pairs"], entry["embedding"] = updates[key]
+                entry["enriched"] = True
+                entry.pop("enrich_attempts", None)
+                entry.pop("enrich_retry_at", None)
+                updated += 1
+            elif key in failed:
+                attempts = entry.get("enrich_attempts", 0) + 1
+                entry["enrich_attempts"] = attempts
+                entry["enrich_retry_at"] = now + ENRICHMENT_RETRY_SECONDS * 2 ** (attempts - 1)
+                if attempts >= ENRICHMENT_MAX_ATTEMPTS:
+                    ai_logger.warning(f"⚠️  Giving up enriching {entry['doc_name']} chunk {entry['chunk_id']} "
+                                      f"after {attempts} failed attempts")
+                retried += 1
+        if updated or retried:
+            save_index_file(all_embeddings)
+        if updated:
+            publish_search_index(all_embeddings)
+    
+    if retried:
+        ai_logger.warning(f"⚠️  Enrichment failed for {retried} chunks; they stay pending and will be retried")
+    ai_logger.info(f"✅ Enriched and republished {updated} chunks")
+    return updated
+
+def enrichment_loop():
+    """Background worker: enrich pending chunks whenever woken or every ENRICHMENT_POLL_SECONDS."""
+    while True:
+        enrichment_wakeup.wait(timeout=ENRICHMENT_POLL_SECONDS)
+        enrichment_wakeup.clear()
+        try:
+            with try_file_lock(ENRICHMENT_LOCK_FILE) as acquired:
+                if not acquired:
+                    continue  # another process is enriching
+                while enrich_pending_chunks():
+                    pass
+        except Exception as e:
+            ai_logger.error(f"❌ Background enrichment failed: {e}")
+            ai_logger.error(f"   Traceback: {traceback.format_exc()}")
+
+# (version, pending count) of the live version; versions are immutable, so one read each
+pending_enrichment_cache = (None, 0)
+
+def count_pending_enrichment():
+    """Chunks in the live index still waiting for summaries/Q&A, as recorded when it was published."""
+    global pending_enrichment_cache
+    version = read_current_version(INDEX_VERSIONS_DIR)
+    if version is None:
+        return 0
+    cached_version, pending = pending_enrichment_cache
+    if cached_version != version:
+        pending = read_version_metadata(INDEX_VERSIONS_DIR, version).get("pending_enrichment")
+        if pending is None:
+            # Published before the count was recorded
+            snapshot = index_reader.get()
+            pending = sum(1 for chunk in snapshot.chunks if chunk.get("enriched") is False) if snapshot else 0
+        pending_enrichment_cache = (version, pending)
+    return pending
+
+def start_enrichment_worker():
+    """Start the background enrichment thread in this process (deferred mode only)."""
+    if ENRICHMENT_MODE != "deferred":
+        return None
+    thread = threading.Thread(target=enrichment_loop, name="enrichment-worker", daemon=True)
+    thread.start()
+    enrichment_wakeup.set()
+    app_logger.info("✨ Background enrichment worker started")
+    return thread
+
+def scan_refresh_loop():
+    """Background refresher: rescan DOCS_DIR whenever the stored scan goes stale."""
+    while True:
+        time.sleep(SCAN_REFRESH_SECONDS)
+        try:
+            if not scan_freshness()["stale"]:
+                continue
+            # Skip while indexing runs (it updates scan rows itself) or another process refreshes
+            with try_file_lock(INDEX_LOCK_FILE) as acquired:
+                if acquired:
+                    with timed_stage("scan.refresh"):
+                        get_files_to_index()
+        except Exception as e:
+            indexing_logger.error(f"❌ Background scan refresh failed: {e}")
+
+def start_scan_refresher():
+    """Start the background DOCS_DIR scan refresher in this process."""
+    thread = threading.Thread(target=scan_refresh_loop, name="scan-refresher", daemon=True)
+    thread.start()
+    app_logger.info(f"🔄 Background scan refresher started (every {SCAN_REFRESH_SECONDS}s when stale)")
+    return thread
+
+def start_background_workers():
+    """Threads each serving process runs: metrics flusher, scan refresher and, in deferred mode, enrichment."""
+    start_metrics_flusher()
+    start_scan_refresher()
+    start_enrichment_worker()
+
+def index_documents_incremental(scan=None):
+    """Index only new or modified documents with progress tracking.
+
+    scan is a (files_to_index, files_to_remove, current_files) diff the caller already has.
+    """
+    with timed_stage("index.scan"):
+        files_to_index, files_to_remove, current_files = scan or get_scan()
+        catalog = load_document_catalog()
     
     # Remove deleted files from catalog
     for filename in files_to_remove:
         if filename in catalog["indexed_files"]:
-            del catalog["indexed_files"][filename]
+            catalog_db.remove_file(filename)
+            chunk_store.remove_document(filename)
             print(f"🗑️  Removed {filename} from catalog")
     
     if not files_to_index:
@@ -555,141 +1389,56 @@ def index_documents_incremental():
         print(f"📄 [{i}/{len(files_to_index)}] Processing: {filename}")
         sys.stdout.flush()  # Ensure immediate output
     
-    print(f"🚀 Starting batch indexing of {len(files_to_index)} files...")
+    print(f"🚀 Starting batch indexing of {len(files_to_index)} files (chunker: {CHUNKER})...")
     
-    # Build Lucene index for new files
-    success, message = rebuild_lucene_index_incremental(files_to_index)
+    if CHUNKER == "python":
+        success, result = chunk_and_embed_streaming(files_to_index)
+    else:
+        success, result = chunk_and_embed_java(files_to_index)
     if not success:
-        return False, f"Failed to build Lucene index: {message}"
-    
-    print("✅ Lucene indexing completed")
-    
-    # Load existing embeddings
-    existing_embeddings = []
-    if os.path.exists(INDEX_FILE):
-        try:
-            with open(INDEX_FILE, "r") as f:
-                existing_embeddings = json.load(f)
-            print(f"📊 Loaded {len(existing_embeddings)} existing embeddings")
-        except Exception as e:
-            print(f"⚠️  Error loading existing embeddings: {e}")
-    
-    # Remove embeddings for files that were re-indexed
-    existing_embeddings = [emb for emb in existing_embeddings 
-                          if emb["doc_name"] not in files_to_index]
-    
-    # Process new chunk metadata
-    chunk_metadata = merge_lucene_chunks()
-    
-    # Filter chunks for files we're currently indexing
-    new_chunks = [chunk for chunk in chunk_metadata 
-                  if chunk["doc_name"] in files_to_index]
+        return False, result
+    new_chunks, new_embeddings = result
     
     if not new_chunks:
         print("⚠️  No new chunks found")
         return True, {"message": "No chunks to process", "files_processed": len(files_to_index)}
     
-    print(f"📦 Generated {len(new_chunks)} chunks from {len(files_to_index)} files")
-    
-    # Cache document texts for new files
-    print("📖 Reading document texts...")
-    doc_texts = {}
-    for i, filename in enumerate(files_to_index, 1):
-        print(f"   📄 [{i}/{len(files_to_index)}] Reading: {filename}")
-        doc_path = os.path.join(DOCS_DIR, filename)
-        doc_texts[filename] = extract_text_from_file(doc_path) or ""
-        sys.stdout.flush()
-    
-    # Generate embeddings for new chunks with progress
-    print("🧮 Generating embeddings...")
-    print("   📝 Creating contextualized chunks...")
-    contextualized_chunks = []
-    
-    # Group chunks by document for progress tracking
-    chunks_by_doc = {}
-    for chunk in new_chunks:
-        doc_name = chunk['doc_name']
-        if doc_name not in chunks_by_doc:
-            chunks_by_doc[doc_name] = []
-        chunks_by_doc[doc_name].append(chunk)
-    
-    # Process chunks with document-level progress
-    for doc_name, doc_chunks in chunks_by_doc.items():
-        print(f"   📄 Processing {len(doc_chunks)} chunks from {doc_name}")
-        for chunk in doc_chunks:
-            contextualized_chunk = (
-                f"Document: {chunk['doc_name']}, Chunk {chunk['chunk_id']}\n"
-                f"Keywords: {', '.join(chunk['keywords'])}\n"
-                f"Summary: {generate_summary(chunk['content'])}\n\n"
-                f"{chunk['content']}"
-            )
-            contextualized_chunks.append(contextualized_chunk)
-        sys.stdout.flush()
-    
-    print(f"🚀 Encoding {len(contextualized_chunks)} chunks to embeddings...")
-    embeddings = embedding_model.encode(contextualized_chunks, batch_size=32, show_progress_bar=False)
-    print("✅ Embedding generation completed")
-    
-    # Create new embedding entries with progress
-    print("🔗 Creating embedding entries...")
-    new_embeddings = []
-    
-    processed_chunks = 0
-    for doc_name, doc_chunks in chunks_by_doc.items():
-        print(f"   📄 Processing embeddings for {doc_name}")
-        
-        for chunk in doc_chunks:
-            chunk_id = chunk["chunk_id"]
-            content = chunk["content"]
-            keywords = chunk["keywords"]
-            
-            print(f"      🧩 Chunk {chunk_id}: Generating summary and Q&A...")
-            summary = generate_summary(content)
-            qa_pairs = generate_qa_pairs(content, doc_texts[doc_name])
-            
-            embedding = embeddings[processed_chunks].tolist() if processed_chunks < len(embeddings) else None
-            processed_chunks += 1
-            
-            if embedding:
-                new_embeddings.append({
-                    "doc_name": doc_name,
-                    "chunk_id": chunk_id,
-                    "chunk": content,
-                    "summary": summary,
-                    "keywords": keywords,
-                    "qa_pairs": qa_pairs,
-                    "embedding": embedding
-                })
-            
-            sys.stdout.flush()
+    # Load existing embeddings
+    with timed_stage("index.load_embeddings"):
+        existing_embeddings = []
+        if os.path.exists(INDEX_FILE):
+            try:
+                with open(INDEX_FILE, "r") as f:
+                    existing_embeddings = json.load(f)
+                print(f"📊 Loaded {len(existing_embeddings)} existing embeddings")
+            except Exception as e:
+                # Saving without the existing entries would drop every other document's embeddings
+                print(f"❌ Error loading existing embeddings: {e}")
+                return False, f"Cannot read existing index {INDEX_FILE}: {e}"
     
-    print(f"✅ Created {len(new_embeddings)} embedding entries")
+    # Remove embeddings for files that were re-indexed
+    reindexed = set(files_to_index)
+    existing_embeddings = [emb for emb in existing_embeddings 
+                          if emb["doc_name"] not in reindexed]
     
     # Merge with existing embeddings
     all_embeddings = existing_embeddings + new_embeddings
     print(f"💾 Saving {len(all_embeddings)} total embeddings...")
     
     # Save updated embeddings
-    with open(INDEX_FILE, "w") as f:
-        json.dump(all_embeddings, f)
-    
-    # Update catalog with progress
-    print("📋 Updating document catalog...")
-    for filename in files_to_index:
-        file_info = current_files[filename]
-        chunks_count = len([chunk for chunk in new_chunks if chunk["doc_name"] == filename])
-        
-        catalog["indexed_files"][filename] = {
-            "hash": file_info["hash"],
-            "size": file_info["size"],
-            "modified_time": file_info["modified_time"],
-            "chunks_count": chunks_count,
-            "indexed_time": datetime.now().isoformat()
-        }
-        print(f"   📄 Updated catalog for {filename} ({chunks_count} chunks)")
-    
-    catalog["total_chunks"] = len(all_embeddings)
-    save_document_catalog(catalog)
+    with timed_stage("index.save"):
+        save_index_file(all_embeddings)
+        publish_search_index(all_embeddings)
+    
+        # Update catalog with progress, one transaction per file
+        print("📋 Updating document catalog...")
+        chunks_by_file = {}
+        for chunk in new_chunks:
+            chunks_by_file.setdefault(chunk["doc_name"], []).append(chunk)
+        for filename in files_to_index:
+            file_chunks = chunks_by_file.get(filename, [])
+            update_catalog_file(filename, current_files[filename], file_chunks)
+            print(f"   📄 Updated catalog for {filename} ({len(file_chunks)} chunks)")
     
     print("🎉 Incremental indexing completed successfully!")
     print(f"📊 Summary:")
@@ -705,111 +1454,291 @@ def index_documents_incremental():
         "processed_files": files_to_index
     }
 
-def query_documents(query, top_k=5):
-    """Retrieve and answer a query using Java Lucene and semantic search."""
-    # Load indexed documents
-    if not os.path.exists(INDEX_FILE):
-        return False, "No indexed documents available. Please run indexing first."
-    
-    with open(INDEX_FILE, "r") as f:
-        indexed_docs = json.load(f)
+# Prompt caching helpers
+chunk_retrieval_counts = Counter()  # (doc_name, chunk_id) -> times retrieved by /query
+hot_context_state = {"keys": [], "queries_since_refresh": HOT_CHUNK_REFRESH_QUERIES}
+hot_context_lock = threading.Lock()  # request threads update the counts and hot set concurrently
+
+class LocalPromptCacheClient:
+    """In-process stand-in for the Anthropic messages API with prompt caching.
+
+    Tracks which cacheable prefixes have been seen and reports usage the same
+    way the API does, so caching behaviour can be exercised without network calls.
+    """
+
+    def __init__(self):
+        self.seen_prefixes = set()
+        self.messages = self
+
+    @staticmethod
+    def _estimate_tokens(text):
+        return max(1, len(text) // 4)
+
+    def create(self, model, max_tokens, messages, system=None, **kwargs):
+        system_blocks = system if isinstance(system, list) else ([{"type": "text", "text": system}] if system else [])
+
+        # The cached prefix runs up to and including the last block with a breakpoint
+        prefix_end = 0
+        for i, block in enumerate(system_blocks, 1):
+            if block.get("cache_control"):
+                prefix_end = i
+        prefix_text = "".join(block["text"] for block in system_blocks[:prefix_end])
+        tail_text = "".join(block["text"] for block in system_blocks[prefix_end:])
+        tail_text += "".join(
+            m["content"] if isinstance(m["content"], str) else "".join(b.get("text", "") for b in m["content"])
+            for m in messages
+        )
+
+        cache_read = cache_creation = 0
+        if prefix_text:
+            prefix_hash = hashlib.sha256(f"{model}\n{prefix_text}".encode("utf-8")).hexdigest()
+            if prefix_hash in self.seen_prefixes:
+                cache_read = self._estimate_tokens(prefix_text)
+            else:
+                cache_creation = self._estimate_tokens(prefix_text)
+                self.seen_prefixes.add(prefix_hash)
+
+        usage = SimpleNamespace(
+            input_tokens=self._estimate_tokens(tail_text),
+            output_tokens=0,
+            cache_creation_input_tokens=cache_creation,
+            cache_read_input_tokens=cache_read
+        )
+        text = f"[local prompt cache stand-in] {len(system_blocks)} system blocks, {len(messages)} messages"
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], usage=usage)
+
+local_prompt_cache_client = LocalPromptCacheClient()
+
+def get_generation_client():
+    """Return the client used for answer generation according to PROMPT_CACHE_MODE."""
+    if PROMPT_CACHE_MODE == "local":
+        return local_prompt_cache_client
+    return anthropic_client
+
+def format_context_chunk(indexed_doc):
+    """Render one indexed chunk as a context block for the answer prompt."""
+    return (
+        f"Document: {indexed_doc['doc_name']}, Chunk {indexed_doc['chunk_id']}\n"
+        f"Keywords: {', '.join(indexed_doc['keywords'])}\n"
+        f"Summary: {indexed_doc['summary']}\n"
+        f"Q&A: {json.dumps(indexed_doc['qa_pairs'], indent=2)}\n\n"
+        f"{indexed_doc['chunk']}"
+    )
+
+def record_chunk_retrievals(indexed_docs, indices):
+    """Count retrievals per chunk and refresh the hot set every HOT_CHUNK_REFRESH_QUERIES queries."""
+    keys = [(indexed_docs[i]["doc_name"], indexed_docs[i]["chunk_id"]) for i in indices]
+    with hot_context_lock:
+        chunk_retrieval_counts.update(keys)
+
+        hot_context_state["queries_since_refresh"] += 1
+        if hot_context_state["queries_since_refresh"] < HOT_CHUNK_REFRESH_QUERIES:
+            return
+        hot_keys = [key for key, _ in chunk_retrieval_counts.most_common(HOT_CHUNK_LIMIT)]
+        # Sorted so the prefix text does not change when only the ranking among hot chunks moves
+        hot_context_state["keys"] = sorted(hot_keys)
+        hot_context_state["queries_since_refresh"] = 0
+    ai_logger.debug(f"🔥 Refreshed hot context: {len(hot_keys)} chunks")
+
+def build_document_summaries(indexed_docs, doc_names):
+    """Build one summary block per document from its chunk summaries, in chunk order."""
+    summaries = {}
+    for doc in indexed_docs:
+        if doc["doc_name"] in doc_names and doc.get("summary"):
+            summaries.setdefault(doc["doc_name"], []).append((doc["chunk_id"], doc["summary"]))
+
+    blocks = []
+    for doc_name in sorted(summaries):
+        text = " ".join(summary for _, summary in sorted(summaries[doc_name]))
+        blocks.append(f"Document: {doc_name}\nSummary: {text[:DOC_SUMMARY_MAX_CHARS]}")
+    return blocks
+
+def build_query_request(query, indexed_docs, combined_indices):
+    """Build messages.create arguments with the stable context first as a cacheable prefix.
+
+    Order is: instructions, per-document summaries and full text of the hot chunks
+    (identical across queries until the hot set is refreshed), then the query-specific
+    chunks in the user turn.
+    """
+    if PROMPT_CACHE_MODE == "off":
+        context = "\n\n".join(format_context_chunk(indexed_docs[i]) for i in combined_indices)
+        return {"messages": [{"role": "user", "content": f"Query: {query}\n\nContext:\n{context}"}]}
+
+    position = {(doc["doc_name"], doc["chunk_id"]): i for i, doc in enumerate(indexed_docs)}
+    with hot_context_lock:
+        hot_keys = list(hot_context_state["keys"])
+    hot_indices = [position[key] for key in hot_keys if key in position]
+    hot_set = set(hot_indices)
+
+    # The instructions alone are far below the minimum cacheable prefix (1024 tokens),
+    # so the only breakpoint goes after the document context that follows them
+    system = [{"type": "text", "text": QUERY_SYSTEM_PROMPT}]
+    if hot_indices:
+        hot_doc_names = {indexed_docs[i]["doc_name"] for i in hot_indices}
+        summaries = build_document_summaries(indexed_docs, hot_doc_names)
+        hot_context = "\n\n".join(format_context_chunk(indexed_docs[i]) for i in hot_indices)
+        system.append({
+            "type": "text",
+            "text": "Document summaries:\n\n" + "\n\n".join(summaries) + "\n\nFrequently used context:\n\n" + hot_context,
+            "cache_control": {"type": "ephemeral"}
+        })
+
+    cached_refs = [f"Document: {indexed_docs[i]['doc_name']}, Chunk {indexed_docs[i]['chunk_id']}"
+                   for i in combined_indices if i in hot_set]
+    fresh_context = "\n\n".join(format_context_chunk(indexed_docs[i]) for i in combined_indices if i not in hot_set)
+
+    user_content = f"Query: {query}\n\n"
+    if cached_refs:
+        user_content += "Relevant frequently used context: " + "; ".join(cached_refs) + "\n\n"
+    user_content += f"Context:\n{fresh_context}"
+
+    return {"system": system, "messages": [{"role": "user", "content": user_content}]}
+
+def summarize_cache_usage(response):
+    """Extract prompt cache token counts from a messages.create response."""
+    usage = getattr(response, "usage", None)
+    return {
+        "mode": PROMPT_CACHE_MODE,
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0
+    }
+
+def retrieve_chunks(queries, top_k=5):
+    """Retrieve top-k chunk positions for each query via semantic and Lucene search.
+
+    All queries share one index load, one batched embedding call, one
+    matrix-matrix similarity search and one JVM invocation.
+    Returns (success, (indexed_docs, [combined indices per query])) or (False, error).
+    """
+    with timed_stage("query.load_index"):
+        snapshot = index_reader.get()  # reloads only when a new version was published
     
+    # Pin the snapshot so embeddings, chunk ids and Lucene hits come from the same indexing run
+    with index_reader.pin(snapshot):
+        return retrieve_from_snapshot(snapshot, queries, top_k)
+
+def retrieve_from_snapshot(snapshot, queries, top_k):
+    """retrieve_chunks against one pinned index snapshot."""
+    indexed_docs = snapshot.chunks if snapshot else None
+    if indexed_docs is None:
+        return False, "No indexed documents available. Please run indexing first."
     if not indexed_docs:
         return False, "No indexed documents available."
     
-    # Embed query for semantic search
-    query_embedding = get_local_embedding(query)
-    if not query_embedding:
-        return False, "Error embedding query."
+    # Embed queries for semantic search
+    with timed_stage("query.embed", queries=len(queries)):
+        try:
+            query_embeddings = embedding_model.encode(list(queries), batch_size=32, convert_to_numpy=True, show_progress_bar=False)
+        except Exception as e:
+            ai_logger.error(f"❌ Error generating query embeddings: {e}")
+            return False, "Error embedding query."
     
     # Semantic search
-    embeddings = np.array([doc["embedding"] for doc in indexed_docs])
-    similarities = np.dot(embeddings, query_embedding) / (
-        np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding)
-    )
-    semantic_indices = np.argsort(similarities)[::-1][:top_k]
+    with timed_stage("query.semantic_search", queries=len(queries)):
+        semantic_indices, _ = semantic_search(snapshot.embeddings, query_embeddings, top_k)
     
     # Lucene search via Java
-    with open(LUCENE_INPUT_FILE, "w") as f:
-        json.dump({"action": "search", "query": query, "index_dir": LUCENE_INDEX_DIR, "top_k": top_k}, f)
-    
-    classpath = (
-        f".:"
-        f"{LIBS}/lucene-core-9.12.2.jar:"
-        f"{LIBS}/lucene-analyzers-common-9.12.2.jar:"
-        f"{LIBS}/lucene-queryparser-9.12.2.jar:"
-        f"{LIBS}/gson-2.10.1.jar:"
-        f"{LIBS}/pdfbox-3.0.5.jar:"
-        f"{LIBS}/pdfbox-io-3.0.5.jar:"
-        f"{LIBS}/fontbox-3.0.5.jar:"
-        f"{LIBS}/poi-4.1.2.jar:"
-        f"{LIBS}/poi-ooxml-4.1.2.jar:"
-        f"{LIBS}/poi-scratchpad-4.1.2.jar:"
-        f"{LIBS}/poi-ooxml-schemas-4.1.2.jar:"
-        f"{LIBS}/xmlbeans-3.1.0.jar:"
-        f"{LIBS}/compress.1.9.2.jar:"
-        f"{LIBS}/commons-collections4-4.4.jar"
-    )
-    
     try:
-        subprocess.run(
-            ["java", "-cp", classpath, JAVA_CLASS, LUCENE_INPUT_FILE],
-            check=True,
-            capture_output=True
-        )
+        with timed_stage("query.lucene_search", queries=len(queries)):
+            if LUCENE_PRIVATE_RESULTS_SUPPORTED:
+                lucene_hits = run_lucene_search(
+                    queries, snapshot.lucene_dir, top_k, build_lucene_classpath(LIBS), JAVA_CLASS
+                )
+            else:
+                with file_lock(LUCENE_SEARCH_LOCK_FILE):
+                    lucene_hits = run_lucene_search(
+                        queries, snapshot.lucene_dir, top_k, build_lucene_classpath(LIBS), JAVA_CLASS,
+                        results_file=LUCENE_RESULTS_FILE
+                    )
+    except LuceneBatchUnsupported:
+        raise  # /query/batch answers 501
     except subprocess.CalledProcessError as e:
         return False, f"Error performing Lucene search: {e}"
-    
-    # Read Lucene search results
-    try:
-        with open(LUCENE_RESULTS_FILE, "r") as f:
-            lucene_results = json.load(f)
     except Exception as e:
         return False, f"Error reading Lucene results: {e}"
     
-    lucene_indices = []
-    for result in lucene_results.get("hits", []):
-        doc_name = result["doc_name"]
-        chunk_id = int(result["chunk_id"])
-        for i, indexed_doc in enumerate(indexed_docs):
-            if indexed_doc["doc_name"] == doc_name and indexed_doc["chunk_id"] == chunk_id:
-                lucene_indices.append(i)
-                break
-    
-    # Combine results (union of top-k indices)
-    combined_indices = list(set(semantic_indices) | set(lucene_indices))[:top_k]
-    retrieved_chunks = [
-        f"Document: {indexed_docs[i]['doc_name']}, Chunk {indexed_docs[i]['chunk_id']}\n"
-        f"Keywords: {', '.join(indexed_docs[i]['keywords'])}\n"
-        f"Summary: {indexed_docs[i]['summary']}\n"
-        f"Q&A: {json.dumps(indexed_docs[i]['qa_pairs'], indent=2)}\n\n"
-        f"{indexed_docs[i]['chunk']}"
-        for i in combined_indices
-    ]
+    position_map = build_chunk_position_map(indexed_docs)
+    combined = []
+    for query_semantic, hits in zip(semantic_indices, lucene_hits):
+        lucene_indices = lucene_hits_to_indices(hits, position_map)
+        combined.append(combine_results(query_semantic, lucene_indices, top_k, FUSION_METHOD))
     
-    # Generate response with Claude
-    context = "\n\n".join(retrieved_chunks)
+    return True, (indexed_docs, combined)
+
+def format_sources(indexed_docs, indices):
+    """Describe retrieved chunks for API responses."""
+    return [{"doc_name": indexed_docs[i]["doc_name"], 
+             "chunk_id": indexed_docs[i]["chunk_id"],
+             "summary": indexed_docs[i]["summary"]} for i in indices]
+
+def generate_answer(query, indexed_docs, combined_indices):
+    """Generate an answer with Claude from the retrieved chunks."""
+    # Stable context first so it can be served from the prompt cache
+    request_kwargs = build_query_request(query, indexed_docs, combined_indices)
     try:
-        response = anthropic_client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1000,
-            messages=[{"role": "user", "content": f"Query: {query}\n\nContext:\n{context}"}]
-        )
+        with timed_stage("query.generate"):
+            response = get_generation_client().messages.create(
+                model="claude-3-5-sonnet-20241022",
+                max_tokens=1000,
+                **request_kwargs
+            )
+        cache_usage = summarize_cache_usage(response)
+        ai_logger.info(f"🗄️  Prompt cache: read {cache_usage['cache_read_input_tokens']} tokens, "
+                       f"wrote {cache_usage['cache_creation_input_tokens']} tokens, "
+                       f"uncached {cache_usage['input_tokens']} tokens")
         return True, {
             "answer": response.content[0].text,
-            "sources": [{"doc_name": indexed_docs[i]["doc_name"], 
-                        "chunk_id": indexed_docs[i]["chunk_id"],
-                        "summary": indexed_docs[i]["summary"]} for i in combined_indices]
+            "sources": format_sources(indexed_docs, combined_indices),
+            "prompt_cache": cache_usage
         }
     except Exception as e:
         return False, f"Error generating response: {e}"
 
+def query_documents(query, top_k=5, answer=True):
+    """Retrieve and answer a query using Java Lucene and semantic search.
+
+    With answer=False only retrieval runs and no Claude call is made.
+    """
+    success, retrieved = retrieve_chunks([query], top_k)
+    if not success:
+        return False, retrieved
+    
+    indexed_docs, combined = retrieved
+    combined_indices = combined[0]
+    
+    if not answer:
+        return True, {"sources": format_sources(indexed_docs, combined_indices)}
+    
+    record_chunk_retrievals(indexed_docs, combined_indices)
+    return generate_answer(query, indexed_docs, combined_indices)
+
+def query_documents_batch(queries, top_k=5, answer=False):
+    """Retrieve (and optionally answer) many queries in one pass over the index."""
+    success, retrieved = retrieve_chunks(queries, top_k)
+    if not success:
+        return False, retrieved
+    
+    indexed_docs, combined = retrieved
+    results = []
+    for query, combined_indices in zip(queries, combined):
+        result = {"query": query, "sources": format_sources(indexed_docs, combined_indices)}
+        if answer:
+            answered, answer_result = generate_answer(query, indexed_docs, combined_indices)
+            if answered:
+                result["answer"] = answer_result["answer"]
+            else:
+                result["error"] = answer_result
+        results.append(result)
+    
+    return True, results
+
 # Flask Routes
 
 @app.route('/')
 def home():
     """Home page with API documentation."""
-    catalog = load_document_catalog()
+    indexed_total, indexed_preview = catalog_db.list_entries(state="indexed", limit=CATALOG_PAGE_SIZE)
     
     html = f"""
     <!DOCTYPE html>
@@ -830,9 +1759,9 @@ def home():
         
         <div class="status">
             <h3>Current Status:</h3>
-            <p><strong>Indexed Files:</strong> {len(catalog['indexed_files'])}</p>
-            <p><strong>Total Chunks:</strong> {catalog['total_chunks']}</p>
-            <p><strong>Last Updated:</strong> {catalog['last_updated']}</p>
+            <p><strong>Indexed Files:</strong> {catalog_db.count_files()}</p>
+            <p><strong>Total Chunks:</strong> {catalog_db.total_chunks()}</p>
+            <p><strong>Last Updated:</strong> {catalog_db.last_updated()}</p>
         </div>
         
         <div class="endpoint">
@@ -867,26 +1796,36 @@ def home():
             <form action="/query" method="post" enctype="application/x-www-form-urlencoded">
                 <input type="text" name="query" placeholder="Enter your question..." style="width: 300px; padding: 5px;">
                 <input type="number" name="top_k" value="5" min="1" max="20" style="width: 60px; padding: 5px;">
+                <label><input type="checkbox" name="answer" value="false"> Retrieval only</label>
                 <button type="submit">Search</button>
             </form>
         </div>
         
         <div class="endpoint">
             <h2><span class="method">GET</span> /catalog</h2>
-            <p>View detailed catalog of indexed documents.</p>
+            <p>View detailed catalog of indexed documents, paginated and filterable by
+            <code>state</code> (new, modified, indexed, removed), <code>extension</code>,
+            <code>modified_after</code>/<code>modified_before</code> and <code>indexed_after</code>/<code>indexed_before</code>.
+            The same data is available as JSON from <code>GET /api/catalog</code>.</p>
             <a href="/catalog"><button>View Catalog</button></a>
         </div>
         
-        <h3>Indexed Files:</h3>
+        <div class="endpoint">
+            <h2><span class="method">GET</span> /metrics</h2>
+            <p>Latency histograms for embedding, semantic search, Lucene search, generation and indexing stages (Prometheus text format).</p>
+            <a href="/metrics"><button>View Metrics</button></a>
+        </div>
+        
+        <h3>Indexed Files (showing {len(indexed_preview)} of {indexed_total}, <a href="/catalog?state=indexed">see all</a>):</h3>
     """
     
-    for filename, info in catalog['indexed_files'].items():
+    for info in indexed_preview:
         html += f"""
         <div class="catalog">
-            <strong>{filename}</strong><br>
-            <small>Chunks: {info.get('chunks_count', 0)} | 
-            Size: {info.get('size', 0)} bytes | 
-            Indexed: {info.get('indexed_time', 'Unknown')}</small>
+            <strong>{info['filename']}</strong><br>
+            <small>Chunks: {info['chunks_count'] or 0} | 
+            Size: {info['size']} bytes | 
+            Indexed: {info['indexed_time'] or 'Unknown'}</small>
         </div>
         """
     
@@ -898,8 +1837,14 @@ def home():
         <p><strong>Incremental Indexing:</strong><br>
         <code>curl -X POST http://localhost:8000/index</code></p>
         
+        <p><strong>Catalog Page (JSON):</strong><br>
+        <code>curl "http://localhost:8000/api/catalog?state=new&extension=pdf&page=1&per_page=50"</code></p>
+        
         <p><strong>Querying:</strong><br>
         <code>curl -X POST http://localhost:8000/query -H "Content-Type: application/json" -d '{"query": "your question", "top_k": 5}'</code></p>
+        
+        <p><strong>Batch Retrieval:</strong><br>
+        <code>curl -X POST http://localhost:8000/query/batch -H "Content-Type: application/json" -d '{"queries": ["first question", "second question"], "top_k": 5, "answer": false}'</code></p>
     </body>
     </html>
     """
@@ -941,7 +1886,8 @@ def index_documents():
                     
                     # Incremental indexing
                     indexing_logger.info(f"🔄 [{request_id}] Starting incremental indexing after upload")
-                    success, result = index_documents_incremental()
+                    with file_lock(INDEX_LOCK_FILE), timed_stage("index.total"):
+                        success, result = index_documents_incremental()
                     
                     elapsed = time.time() - start_time
                     if not success:
@@ -962,25 +1908,25 @@ def index_documents():
             app_logger.error(f"❌ [{request_id}] Documents directory not found: {DOCS_DIR}")
             return jsonify({"error": f"Documents directory {DOCS_DIR} not found"}), 400
         
-        # Check what needs indexing before running
-        files_to_index, files_to_remove, current_files = get_files_to_index()
+        # Check what needs indexing before running (stored scan unless stale or ?rescan=1)
+        files_to_index, files_to_remove, current_files = get_scan(force=request.args.get("rescan") in ("1", "true"))
         
         if not files_to_index and not files_to_remove:
-            catalog = load_document_catalog()
             elapsed = time.time() - start_time
             
             app_logger.info(f"✅ [{request_id}] No changes detected - all documents up to date ({elapsed:.2f}s)")
             return jsonify({
                 "message": "No changes detected - all documents are up to date",
-                "indexed_files": len(catalog["indexed_files"]),
-                "total_chunks": catalog["total_chunks"],
+                "indexed_files": catalog_db.count_files(),
+                "total_chunks": catalog_db.total_chunks(),
                 "request_id": request_id,
                 "processing_time": elapsed
             })
         
         # Perform incremental indexing
         indexing_logger.info(f"🔄 [{request_id}] Starting incremental indexing")
-        success, result = index_documents_incremental()
+        with file_lock(INDEX_LOCK_FILE), timed_stage("index.total"):
+            success, result = index_documents_incremental()
         
         elapsed = time.time() - start_time
         if not success:
@@ -1014,11 +1960,15 @@ def search_documents():
             data = request.get_json()
             query = data.get('query')
             top_k = data.get('top_k', 5)
-            query_logger.debug(f"📋 [{request_id}] JSON request - Query: '{query}', top_k: {top_k}")
+            answer = data.get('answer', True)
+            if isinstance(answer, str):
+                answer = answer.lower() not in ('false', '0', 'no')
+            query_logger.debug(f"📋 [{request_id}] JSON request - Query: '{query}', top_k: {top_k}, answer: {answer}")
         else:
             query = request.form.get('query')
             top_k = int(request.form.get('top_k', 5))
-            query_logger.debug(f"📋 [{request_id}] Form request - Query: '{query}', top_k: {top_k}")
+            answer = request.form.get('answer', 'true').lower() not in ('false', '0', 'no')
+            query_logger.debug(f"📋 [{request_id}] Form request - Query: '{query}', top_k: {top_k}, answer: {answer}")
         
         if not query:
             query_logger.warning(f"⚠️  [{request_id}] Empty query provided")
@@ -1027,7 +1977,8 @@ def search_documents():
         query_logger.info(f"🔍 [{request_id}] Processing query: '{query}' (top_k: {top_k})")
         
         # Perform search
-        success, result = query_documents(query, top_k)
+        with timed_stage("query.total" if answer else "query.retrieval_total"):
+            success, result = query_documents(query, top_k, answer)
         
         elapsed = time.time() - start_time
         
@@ -1041,6 +1992,13 @@ def search_documents():
         
         # Handle form submission (return HTML)
         if not request.is_json:
+            answer_html = ""
+            if 'answer' in result:
+                answer_html = f"""<div class="answer">
+                    <h3>Answer:</h3>
+                    <p>{result['answer'].replace(chr(10), '<br>')}</p>
+                </div>"""
+            
             html_result = f"""
             <!DOCTYPE html>
             <html>
@@ -1065,10 +2023,7 @@ def search_documents():
                     <div class="meta">Request ID: {request_id} | Processing time: {elapsed:.2f}s</div>
                 </div>
                 
-                <div class="answer">
-                    <h3>Answer:</h3>
-                    <p>{result['answer'].replace(chr(10), '<br>')}</p>
-                </div>
+                {answer_html}
                 
                 <div class="sources">
                     <h3>Sources:</h3>
@@ -1090,13 +2045,16 @@ def search_documents():
             return html_result
         
         # Return JSON for API calls
-        return jsonify({
+        response = {
             "query": query,
-            "answer": result['answer'],
             "sources": result['sources'],
             "request_id": request_id,
             "processing_time": elapsed
-        })
+        }
+        if answer:
+            response["answer"] = result['answer']
+            response["prompt_cache"] = result.get('prompt_cache')
+        return jsonify(response)
         
     except Exception as e:
         elapsed = time.time() - start_time
@@ -1104,151 +2062,226 @@ def search_documents():
         query_logger.error(f"   Traceback: {traceback.format_exc()}")
         return jsonify({"error": f"Query failed: {str(e)}", "request_id": request_id}), 500
 
-@app.route('/catalog', methods=['GET'])
-def view_catalog():
-    """View detailed document catalog."""
+@app.route('/query/batch', methods=['POST'])
+def search_documents_batch():
+    """Retrieve results for many queries in one request; answers are optional."""
+    request_id = f"req_{int(time.time())}"
+    query_logger.info(f"🔍 [{request_id}] POST /query/batch - Starting batch search request")
+    query_logger.info(f"   Request IP: {request.remote_addr}")
+    
+    start_time = time.time()
+    
     try:
-        catalog = load_document_catalog()
-        files_to_index, files_to_remove, current_files = get_files_to_index()
+        data = request.get_json(silent=True) or {}
+        queries = data.get('queries')
+        answer = bool(data.get('answer', False))
         
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Document Catalog</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 40px; }}
-                .header {{ background: #e3f2fd; padding: 20px; border-radius: 5px; margin-bottom: 20px; }}
-                .file-entry {{ background: #f5f5f5; padding: 15px; margin: 10px 0; border-radius: 5px; border-left: 4px solid #4caf50; }}
-                .file-entry.needs-update {{ border-left-color: #ff9800; }}
-                .file-entry.new {{ border-left-color: #2196f3; }}
-                .file-entry.removed {{ border-left-color: #f44336; }}
-                .status {{ font-weight: bold; padding: 5px 10px; border-radius: 3px; color: white; }}
-                .status.indexed {{ background: #4caf50; }}
-                .status.needs-update {{ background: #ff9800; }}
-                .status.new {{ background: #2196f3; }}
-                .status.removed {{ background: #f44336; }}
-                .metadata {{ font-size: 0.9em; color: #666; margin-top: 10px; }}
-                .actions {{ margin-top: 20px; }}
-                button {{ padding: 10px 15px; margin: 5px; background: #007bff; color: white; border: none; border-radius: 3px; cursor: pointer; }}
-                button:hover {{ background: #0056b3; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>Document Catalog</h1>
-                <p><strong>Total Indexed Files:</strong> {len(catalog['indexed_files'])}</p>
-                <p><strong>Total Chunks:</strong> {catalog['total_chunks']}</p>
-                <p><strong>Last Updated:</strong> {catalog['last_updated']}</p>
-                <p><strong>Files Needing Update:</strong> {len(files_to_index)}</p>
-                <p><strong>Files to Remove:</strong> {len(files_to_remove)}</p>
-            </div>
-            
-            <div class="actions">
-                <a href="/"><button>← Back to Home</button></a>
-                <form style="display: inline;" action="/index" method="post">
-                    <button type="submit">Update Index</button>
-                </form>
-                <form style="display: inline;" action="/force-reindex" method="post">
-                    <button type="submit" style="background: #dc3545;">Force Full Reindex</button>
-                </form>
-            </div>
-        """
+        try:
+            top_k = int(data.get('top_k', 5))
+        except (TypeError, ValueError):
+            return jsonify({"error": "'top_k' must be an integer", "request_id": request_id}), 400
+        if top_k < 1:
+            return jsonify({"error": "'top_k' must be at least 1", "request_id": request_id}), 400
         
-        # Show files that need updating
-        if files_to_index:
-            html += "<h2>Files Needing Update:</h2>"
-            for filename in files_to_index:
-                status = "new" if filename not in catalog['indexed_files'] else "needs-update"
-                status_text = "NEW" if filename not in catalog['indexed_files'] else "MODIFIED"
-                
-                file_info = current_files.get(filename, {})
-                html += f"""
-                <div class="file-entry {status}">
-                    <h3>{filename} <span class="status {status}">{status_text}</span></h3>
-                    <div class="metadata">
-                        Size: {file_info.get('size', 0):,} bytes<br>
-                        Modified: {datetime.fromtimestamp(file_info.get('modified_time', 0)).strftime('%Y-%m-%d %H:%M:%S') if file_info.get('modified_time') else 'Unknown'}<br>
-                        Hash: {file_info.get('hash', 'Unknown')[:16]}...
-                    </div>
-                </div>
-                """
+        if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+            query_logger.warning(f"⚠️  [{request_id}] Invalid queries list provided")
+            return jsonify({"error": "'queries' must be a non-empty list of query strings", "request_id": request_id}), 400
         
-        # Show files to be removed
-        if files_to_remove:
-            html += "<h2>Files to Remove (deleted from disk):</h2>"
-            for filename in files_to_remove:
-                old_info = catalog['indexed_files'].get(filename, {})
-                html += f"""
-                <div class="file-entry removed">
-                    <h3>{filename} <span class="status removed">DELETED</span></h3>
-                    <div class="metadata">
-                        Was indexed: {old_info.get('indexed_time', 'Unknown')}<br>
-                        Had chunks: {old_info.get('chunks_count', 0)}
-                    </div>
-                </div>
-                """
+        if len(queries) > MAX_BATCH_QUERIES:
+            return jsonify({"error": f"Too many queries: {len(queries)} (max {MAX_BATCH_QUERIES})", "request_id": request_id}), 400
         
-        # Show currently indexed files
-        html += "<h2>Currently Indexed Files:</h2>"
-        for filename, info in catalog['indexed_files'].items():
-            if filename not in files_to_remove:
-                status = "indexed"
-                if filename in files_to_index:
-                    status = "needs-update"
-                
-                html += f"""
-                <div class="file-entry {status}">
-                    <h3>{filename} <span class="status {status}">{'NEEDS UPDATE' if status == 'needs-update' else 'INDEXED'}</span></h3>
-                    <div class="metadata">
-                        Chunks: {info.get('chunks_count', 0)}<br>
-                        Size: {info.get('size', 0):,} bytes<br>
-                        Indexed: {info.get('indexed_time', 'Unknown')}<br>
-                        Hash: {info.get('hash', 'Unknown')[:16]}...
-                    </div>
-                </div>
-                """
+        query_logger.info(f"🔍 [{request_id}] Processing {len(queries)} queries (top_k: {top_k}, answer: {answer})")
         
-        html += """
-        </body>
-        </html>
-        """
-        return html
+        try:
+            with timed_stage("query.batch_total", queries=len(queries)):
+                success, results = query_documents_batch(queries, top_k, answer)
+        except LuceneBatchUnsupported as e:
+            query_logger.warning(f"⚠️  [{request_id}] {e}")
+            return jsonify({"error": str(e), "request_id": request_id}), 501
+        
+        elapsed = time.time() - start_time
+        
+        if not success:
+            query_logger.error(f"❌ [{request_id}] Batch query failed after {elapsed:.2f}s: {results}")
+            return jsonify({"error": results, "request_id": request_id}), 500
+        
+        query_logger.info(f"✅ [{request_id}] Batch of {len(queries)} queries completed in {elapsed:.2f}s")
+        
+        return jsonify({
+            "results": results,
+            "query_count": len(queries),
+            "top_k": top_k,
+            "answered": answer,
+            "request_id": request_id,
+            "processing_time": elapsed
+        })
         
+    except Exception as e:
+        elapsed = time.time() - start_time
+        query_logger.error(f"❌ [{request_id}] Batch query request failed after {elapsed:.2f}s: {e}")
+        query_logger.error(f"   Traceback: {traceback.format_exc()}")
+        return jsonify({"error": f"Batch query failed: {str(e)}", "request_id": request_id}), 500
+
+@app.route('/api/catalog', methods=['GET'])
+def catalog_api():
+    """Paginated, filterable catalog entries as JSON."""
+    try:
+        return jsonify(query_catalog(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to load catalog: {str(e)}"}), 500
 
+@app.route('/catalog', methods=['GET'])
+def view_catalog():
+    """View the document catalog, one filtered page at a time."""
+    try:
+        result = query_catalog(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to load catalog: {str(e)}"}), 500
+    
+    counts = result["counts"]
+    state_labels = {"new": "NEW", "modified": "MODIFIED", "indexed": "INDEXED", "removed": "DELETED"}
+    state_classes = {"new": "new", "modified": "needs-update", "indexed": "indexed", "removed": "removed"}
+    
+    def page_link(label, page):
+        params = dict(request.args)
+        params["page"] = page
+        return f'<a href="/catalog?{urlencode(params)}">{label}</a>'
+    
+    state_links = " | ".join(
+        f'<a href="/catalog?{urlencode({"state": state})}">{state_labels[state]} ({counts[state]})</a>'
+        for state in SCAN_STATES
+    )
+    
+    html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Document Catalog</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 40px; }}
+            .header {{ background: #e3f2fd; padding: 20px; border-radius: 5px; margin-bottom: 20px; }}
+            .file-entry {{ background: #f5f5f5; padding: 15px; margin: 10px 0; border-radius: 5px; border-left: 4px solid #4caf50; }}
+            .file-entry.needs-update {{ border-left-color: #ff9800; }}
+            .file-entry.new {{ border-left-color: #2196f3; }}
+            .file-entry.removed {{ border-left-color: #f44336; }}
+            .status {{ font-weight: bold; padding: 5px 10px; border-radius: 3px; color: white; }}
+            .status.indexed {{ background: #4caf50; }}
+            .status.needs-update {{ background: #ff9800; }}
+            .status.new {{ background: #2196f3; }}
+            .status.removed {{ background: #f44336; }}
+            .metadata {{ font-size: 0.9em; color: #666; margin-top: 10px; }}
+            .actions {{ margin-top: 20px; }}
+            .pager {{ margin: 20px 0; }}
+            button {{ padding: 10px 15px; margin: 5px; background: #007bff; color: white; border: none; border-radius: 3px; cursor: pointer; }}
+            button:hover {{ background: #0056b3; }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>Document Catalog</h1>
+            <p><strong>Total Indexed Files:</strong> {catalog_db.count_files()}</p>
+            <p><strong>Total Chunks:</strong> {catalog_db.total_chunks()}</p>
+            <p><strong>Last Updated:</strong> {catalog_db.last_updated()}</p>
+            <p><strong>Last Scan:</strong> {result['scanned_at']} (<a href="/catalog?rescan=1">rescan</a>)</p>
+            <p><strong>Files Needing Update:</strong> {counts['new'] + counts['modified']}</p>
+            <p><strong>Files to Remove:</strong> {counts['removed']}</p>
+            <p><strong>Show:</strong> <a href="/catalog">ALL</a> | {state_links}</p>
+        </div>
+        
+        <div class="actions">
+            <a href="/"><button>← Back to Home</button></a>
+            <form style="display: inline;" action="/index" method="post">
+                <button type="submit">Update Index</button>
+            </form>
+            <form style="display: inline;" action="/force-reindex" method="post">
+                <button type="submit" style="background: #dc3545;">Force Full Reindex</button>
+            </form>
+        </div>
+        
+        <h2>Files {(result['page'] - 1) * result['per_page'] + 1 if result['total'] else 0}-{min(result['page'] * result['per_page'], result['total'])} of {result['total']}</h2>
+    """
+    
+    for item in result["items"]:
+        css_class = state_classes[item["state"]]
+        modified = datetime.fromtimestamp(item["modified_time"]).strftime('%Y-%m-%d %H:%M:%S') if item["modified_time"] else 'Unknown'
+        html += f"""
+        <div class="file-entry {css_class}">
+            <h3>{item['filename']} <span class="status {css_class}">{state_labels[item['state']]}</span></h3>
+            <div class="metadata">
+                Chunks: {item['chunks_count'] or 0}<br>
+                Size: {item['size']:,} bytes<br>
+                Modified: {modified}<br>
+                Indexed: {item['indexed_time'] or 'Not indexed'}<br>
+                Hash: {(item['hash'] or 'Unknown')[:16]}...
+            </div>
+        </div>
+        """
+    
+    pager = []
+    if result["page"] > 1:
+        pager.append(page_link("← Previous", result["page"] - 1))
+    pager.append(f"Page {result['page']} of {max(result['pages'], 1)}")
+    if result["page"] < result["pages"]:
+        pager.append(page_link("Next →", result["page"] + 1))
+    html += f"""
+        <div class="pager">{' | '.join(pager)}</div>
+    </body>
+    </html>
+    """
+    return html
+
 @app.route('/status', methods=['GET'])
 def status():
-    """Get indexing status and statistics."""
+    """Get indexing status and statistics from the stored scan.
+
+    ?rescan=1 rescans DOCS_DIR first; ?details=1 adds paginated file lists
+    (page/per_page apply to each list).
+    """
     try:
-        catalog = load_document_catalog()
-        files_to_index, files_to_remove, current_files = get_files_to_index()
+        scanned_at = ensure_scan(request.args.get("rescan") in ("1", "true"))
+        counts = catalog_db.state_counts()
+        files_needing_update = counts["new"] + counts["modified"]
         
         stats = {
             "lucene_index_exists": os.path.exists(LUCENE_INDEX_DIR),
             "embeddings_index_exists": os.path.exists(INDEX_FILE),
-            "catalog_exists": os.path.exists(CATALOG_FILE),
+            "catalog_exists": os.path.exists(CATALOG_DB_FILE),
             "docs_directory": DOCS_DIR,
-            "documents_on_disk": len(current_files),
-            "documents_indexed": len(catalog["indexed_files"]),
-            "total_chunks": catalog["total_chunks"],
-            "files_needing_update": len(files_to_index),
-            "files_to_remove": len(files_to_remove),
-            "last_updated": catalog["last_updated"],
-            "up_to_date": len(files_to_index) == 0 and len(files_to_remove) == 0
+            "documents_on_disk": counts["new"] + counts["modified"] + counts["indexed"],
+            "documents_indexed": catalog_db.count_files(),
+            "total_chunks": catalog_db.total_chunks(),
+            "files_needing_update": files_needing_update,
+            "files_to_remove": counts["removed"],
+            "state_counts": counts,
+            "last_updated": catalog_db.last_updated(),
+            "last_scan": scanned_at,
+            "scan": scan_freshness(),
+            "enrichment_mode": ENRICHMENT_MODE,
+            "pending_enrichment": count_pending_enrichment(),
+            "up_to_date": files_needing_update == 0 and counts["removed"] == 0
         }
         
-        # Detailed file information
-        stats["file_details"] = {
-            "on_disk": list(current_files.keys()),
-            "indexed": list(catalog["indexed_files"].keys()),
-            "needs_update": files_to_index,
-            "to_remove": files_to_remove
-        }
+        # Detailed file information is opt-in and paginated
+        if request.args.get("details") in ("1", "true"):
+            _, page, per_page = parse_catalog_query(request.args)
+            offset = (page - 1) * per_page
+            stats["file_details"] = {
+                "page": page,
+                "per_page": per_page,
+                "new": catalog_db.filenames_in_state("new", per_page, offset),
+                "modified": catalog_db.filenames_in_state("modified", per_page, offset),
+                "indexed": catalog_db.filenames_in_state("indexed", per_page, offset),
+                "to_remove": catalog_db.filenames_in_state("removed", per_page, offset)
+            }
         
         return jsonify(stats)
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Status check failed: {str(e)}"}), 500
 
@@ -1274,23 +2307,17 @@ def upload_and_index_single():
                 "error": f"Unsupported file type: {file_ext}. Supported: {', '.join(allowed_extensions)}"
             }), 400
         
-        # Save file to docs directory
+        # Stream file to docs directory, hashing as it is written
         file_path = os.path.join(DOCS_DIR, filename)
-        file.save(file_path)
+        file_info, file_data = save_upload_stream(file, file_path)
         
         print(f"📄 Uploaded file: {filename}")
         
-        # Get file info before indexing
-        file_info = get_file_info(file_path)
-        if not file_info:
-            return jsonify({"error": "Failed to read file information"}), 500
-        
         # Check if this file was already indexed
-        catalog = load_document_catalog()
-        was_already_indexed = filename in catalog["indexed_files"]
+        was_already_indexed = catalog_db.get_file(filename) is not None
         
-        # Extract text to verify file is readable
-        extracted_text = extract_text_from_file(file_path)
+        # Extract text from the received bytes to verify file is readable
+        extracted_text = extract_text_from_file(file_path, data=file_data)
         if not extracted_text:
             # Clean up the uploaded file
             os.remove(file_path)
@@ -1301,7 +2328,8 @@ def upload_and_index_single():
         text_preview = extracted_text[:200] + "..." if len(extracted_text) > 200 else extracted_text
         
         # Index this specific file
-        success, result = index_single_document(filename, file_path, file_info)
+        with file_lock(INDEX_LOCK_FILE):
+            success, result = index_single_document(filename, file_path, file_info, doc_text=extracted_text)
         
         if not success:
             # Clean up on failure
@@ -1333,49 +2361,77 @@ def upload_and_index_single():
             os.remove(file_path)
         return jsonify({"error": f"Upload and indexing failed: {str(e)}"}), 500
 
-def index_single_document(filename, file_path, file_info):
-    """Index a single document and update the catalog."""
+def index_single_document(filename, file_path, file_info, doc_text=None):
+    """Index a single document and update the catalog.
+
+    Pass doc_text when the caller already extracted the text to skip re-reading the file.
+    """
     try:
-        # Create temporary directory with just this file
-        temp_docs_dir = tempfile.mkdtemp()
-        temp_file_path = os.path.join(temp_docs_dir, filename)
-        shutil.copy2(file_path, temp_file_path)
+        if CHUNKER == "python":
+            doc_texts = {filename: doc_text} if doc_text is not None else None
+            success, result = chunk_and_embed_streaming([filename], doc_texts)
+            if not success:
+                return False, result
+            new_chunks, new_embeddings = result
+            if not new_chunks:
+                return False, "No chunks generated for this file"
+        else:
+            # Create temporary directory with just this file, next to DOCS_DIR so it can be hardlinked
+            temp_docs_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(DOCS_DIR)))
+            temp_file_path = os.path.join(temp_docs_dir, filename)
+            try:
+                os.link(file_path, temp_file_path)
+            except OSError:
+                # Different filesystem or no hardlink support
+                shutil.copy2(file_path, temp_file_path)
+        
+            # Build Lucene index for this file
+            lucene_input = {
+                "action": "index-dir",
+                "docs_dir": temp_docs_dir,
+                "index_dir": LUCENE_INDEX_DIR
+            }
         
-        # Build Lucene index for this file
-        lucene_input = {
-            "action": "index-dir",
-            "docs_dir": temp_docs_dir,
-            "index_dir": LUCENE_INDEX_DIR
-        }
+            with open(LUCENE_INPUT_FILE, "w") as f:
+                json.dump(lucene_input, f)
+        
+            # Run Java indexer
+            classpath = (
+                f".:"
+                f"{LIBS}/lucene-core-9.12.2.jar:"
+                f"{LIBS}/lucene-analyzers-common-9.12.2.jar:"
+                f"{LIBS}/lucene-queryparser-9.12.2.jar:"
+                f"{LIBS}/gson-2.10.1.jar:"
+                f"{LIBS}/pdfbox-3.0.5.jar:"
+                f"{LIBS}/pdfbox-io-3.0.5.jar:"
+                f"{LIBS}/fontbox-3.0.5.jar:"
+                f"{LIBS}/poi-4.1.2.jar:"
+                f"{LIBS}/poi-ooxml-4.1.2.jar:"
+                f"{LIBS}/poi-scratchpad-4.1.2.jar:"
+                f"{LIBS}/xmlbeans-3.1.0.jar:"
+                f"{LIBS}/compress-1.9.2.jar:"
+                f"{LIBS}/commons-collections4-4.4.jar:"
+                f"{LIBS}/poi-ooxml-schemas-4.1.2.jar"
+            )
         
-        with open(LUCENE_INPUT_FILE, "w") as f:
-            json.dump(lucene_input, f)
+            run_started = time.time()
+            result = subprocess.run(
+                ["java", "-cp", classpath, JAVA_CLASS, LUCENE_INPUT_FILE],
+                capture_output=True,
+                text=True,
+                check=True
+            )
         
-        # Run Java indexer
-        classpath = (
-            f".:"
-            f"{LIBS}/lucene-core-9.12.2.jar:"
-            f"{LIBS}/lucene-analyzers-common-9.12.2.jar:"
-            f"{LIBS}/lucene-queryparser-9.12.2.jar:"
-            f"{LIBS}/gson-2.10.1.jar:"
-            f"{LIBS}/pdfbox-3.0.5.jar:"
-            f"{LIBS}/pdfbox-io-3.0.5.jar:"
-            f"{LIBS}/fontbox-3.0.5.jar:"
-            f"{LIBS}/poi-4.1.2.jar:"
-            f"{LIBS}/poi-ooxml-4.1.2.jar:"
-            f"{LIBS}/poi-scratchpad-4.1.2.jar:"
-            f"{LIBS}/xmlbeans-3.1.0.jar:"
-            f"{LIBS}/compress-1.9.2.jar:"
-            f"{LIBS}/commons-collections4-4.4.jar:"
-            f"{LIBS}/poi-ooxml-schemas-4.1.2.jar"
-        )
+            # Store chunk metadata for this specific file
+            new_chunks = merge_lucene_chunks([filename], run_started)
         
-        result = subprocess.run(
-            ["java", "-cp", classpath, JAVA_CLASS, LUCENE_INPUT_FILE],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+            if not new_chunks:
+                return False, "No chunks generated for this file"
+        
+            # Reuse the caller's extracted text when available
+            print(f"🧮 Generating embeddings for {len(new_chunks)} chunks...")
+            doc_texts = {filename: doc_text} if doc_text is not None else None
+            new_chunks, new_embeddings = run_indexing_pipeline([filename], {filename: new_chunks}, doc_texts)
         
         # Load existing embeddings
         existing_embeddings = []
@@ -1387,73 +2443,15 @@ def index_single_document(filename, file_path, file_info):
         existing_embeddings = [emb for emb in existing_embeddings 
                               if emb["doc_name"] != filename]
         
-        # Load new chunk metadata
-        if not os.path.exists(LUCENE_CHUNKS_FILE):
-            return False, "Failed to generate chunks"
-        
-        with open(LUCENE_CHUNKS_FILE, "r") as f:
-            all_chunks = json.load(f)
-        
-        # Filter chunks for this specific file
-        new_chunks = [chunk for chunk in all_chunks if chunk["doc_name"] == filename]
-        
-        if not new_chunks:
-            return False, "No chunks generated for this file"
-        
-        # Extract document text
-        doc_text = extract_text_from_file(file_path)
-        
-        # Generate embeddings for new chunks
-        contextualized_chunks = [
-            f"Document: {chunk['doc_name']}, Chunk {chunk['chunk_id']}\n"
-            f"Keywords: {', '.join(chunk['keywords'])}\n"
-            f"Summary: {generate_summary(chunk['content'])}\n\n"
-            f"{chunk['content']}"
-            for chunk in new_chunks
-        ]
-        
-        print(f"🧮 Generating embeddings for {len(contextualized_chunks)} chunks...")
-        embeddings = embedding_model.encode(contextualized_chunks, batch_size=32, show_progress_bar=False)
-        
-        # Create embedding entries
-        new_embeddings = []
-        for i, chunk in enumerate(new_chunks):
-            summary = generate_summary(chunk['content'])
-            qa_pairs = generate_qa_pairs(chunk['content'], doc_text)
-            embedding = embeddings[i].tolist() if i < len(embeddings) else None
-            
-            if embedding:
-                new_embeddings.append({
-                    "doc_name": chunk["doc_name"],
-                    "chunk_id": chunk["chunk_id"],
-                    "chunk": chunk["content"],
-                    "summary": summary,
-                    "keywords": chunk["keywords"],
-                    "qa_pairs": qa_pairs,
-                    "embedding": embedding
-                })
-        
         # Merge with existing embeddings
         all_embeddings = existing_embeddings + new_embeddings
         
-        # Save updated embeddings
-        with open(INDEX_FILE, "w") as f:
-            json.dump(all_embeddings, f)
+        # Save updated embeddings and publish them to the query workers
+        save_index_file(all_embeddings)
+        publish_search_index(all_embeddings)
         
         # Update catalog
-        catalog = load_document_catalog()
-        catalog["indexed_files"][filename] = {
-            "hash": file_info["hash"],
-            "size": file_info["size"],
-            "modified_time": file_info["modified_time"],
-            "chunks_count": len(new_chunks),
-            "indexed_time": datetime.now().isoformat()
-        }
-        catalog["total_chunks"] = len(all_embeddings)
-        save_document_catalog(catalog)
-        
-        # Clean up temp directory
-        shutil.rmtree(temp_docs_dir, ignore_errors=True)
+        update_catalog_file(filename, file_info, new_chunks)
         
         return True, {
             "chunks_created": len(new_chunks),
@@ -1472,12 +2470,12 @@ def index_single_document(filename, file_path, file_info):
     """Force a complete reindex of all documents."""
     try:
         # Clear existing catalog and indexes
-        if os.path.exists(CATALOG_FILE):
-            os.remove(CATALOG_FILE)
+        catalog_db.clear()
         if os.path.exists(INDEX_FILE):
             os.remove(INDEX_FILE)
         if os.path.exists(LUCENE_CHUNKS_FILE):
             os.remove(LUCENE_CHUNKS_FILE)
+        chunk_store.clear()
         
         # Remove Lucene index directory
         if os.path.exists(LUCENE_INDEX_DIR):
@@ -1485,7 +2483,8 @@ def index_single_document(filename, file_path, file_info):
             os.makedirs(LUCENE_INDEX_DIR, exist_ok=True)
         
         # Perform fresh indexing
-        success, result = index_documents_incremental()
+        with file_lock(INDEX_LOCK_FILE):
+            success, result = index_documents_incremental()
         if not success:
             return jsonify({"error": f"Failed to reindex documents: {result}"}), 500
         
@@ -1495,6 +2494,11 @@ def index_single_document(filename, file_path, file_info):
     except Exception as e:
         return jsonify({"error": f"Force reindex failed: {str(e)}"}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-stage latency histograms in Prometheus text format."""
+    return Response(stage_metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
@@ -1514,7 +2518,9 @@ def health_check():
         health["indexes"] = {
             "lucene": os.path.exists(LUCENE_INDEX_DIR),
             "embeddings": os.path.exists(INDEX_FILE),
-            "catalog": os.path.exists(CATALOG_FILE)
+            "catalog": os.path.exists(CATALOG_DB_FILE),
+            "index_version": read_current_version(INDEX_VERSIONS_DIR),
+            "worker_pid": os.getpid()
         }
         
         return jsonify(health)
@@ -1615,9 +2621,12 @@ def startup_check():
         app_logger.info("   • POST /index      - Index documents")
         app_logger.info("   • POST /upload-and-index - Upload & index single file")
         app_logger.info("   • POST /query      - Search documents")
+        app_logger.info("   • POST /query/batch - Retrieve results for many queries")
         app_logger.info("   • GET  /catalog    - View document catalog")
+        app_logger.info("   • GET  /api/catalog - Paginated, filterable catalog (JSON)")
         app_logger.info("   • GET  /status     - System status")
         app_logger.info("   • GET  /health     - Health check")
+        app_logger.info("   • GET  /metrics    - Stage latency histograms (Prometheus)")
         app_logger.info(f"🌐 Server ready at http://localhost:8000")
         app_logger.info("=" * 60)
         
@@ -1625,14 +2634,31 @@ def startup_check():
         app_logger.error(f"⚠️  Startup check failed: {e}")
         app_logger.error(f"   Traceback: {traceback.format_exc()}")
 
-# Run startup check when app context is available
-with app.app_context():
-    startup_check()
+def create_app():
+    """Application factory for production servers (see wsgi.py and gunicorn.conf.py).
+
+    Runs the startup check and loads the current index version. With Gunicorn's
+    preload_app this happens once in the master, so workers fork with the
+    embedding model and index already in memory.
+    """
+    with app.app_context():
+        startup_check()
+    bootstrap_index_versions()
+    snapshot = index_reader.get()
+    if snapshot:
+        app_logger.info(f"📦 Serving index version {snapshot.version} ({len(snapshot.chunks)} chunks)")
+    # Workers write their own pins; the pre-fork master must not hold this version forever
+    index_reader.release_pins()
+    return app
 
 if __name__ == '__main__':
     print("🔍 Document Search API")
     print("=" * 50)
     
+    create_app()
+    clear_metrics_dir()
+    start_background_workers()
+    
     # Additional startup logging
     app_logger.info("🎬 Starting Flask development server...")
     app_logger.info("   • Debug mode: True")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+SimpleChunk Extraction Microbenchmark
+
+Times the indexer's per-chunk pattern extraction on one large TAL file: the
+single-pass scanner (scan_code) against the reference per-pattern regexes
+(extract_code_patterns). Every chunk's outputs are checked for equality first.
+
+By default a synthetic TAL file with procedures, declarations, calls and
+control keywords is generated in-process; --file benchmarks a real one.
+"""
+
+import sys
+import time
+import random
+import argparse
+
+from indexer import TALChunker, scan_code, extract_code_patterns
+
+# ===== SYNTHETIC DATA =====
+
+def generate_tal_source(num_procs=2000, statements_per_proc=25, seed=7):
+    """TAL-like source text: PROC blocks of declarations, CALLs and IF statements."""
+    rng = random.Random(seed)
+    domain = ["wire", "payment", "fedwire", "swift", "chips", "account", "balance", "routing",
+              "beneficiary", "originator", "settlement", "message", "validate", "queue", "funds"]
+    controls = ["IF", "ELSE", "WHILE", "FOR", "CASE", "RETURN"]
+
+    lines = []
+    for p in range(num_procs):
+        lines.append(f"PROC {rng.choice(domain)}_proc_{p};")
+        lines.append("BEGIN")
+        for s in range(statements_per_proc):
+            kind = rng.randrange(4)
+            if kind == 0:
+                lines.append(f"  {rng.choice(['INT', 'STRING'])} {rng.choice(domain)}_{s};")
+            elif kind == 1:
+                lines.append(f"  CALL {rng.choice(domain)}_{rng.choice(domain)}({rng.choice(domain)}, {s});")
+            elif kind == 2:
+                lines.append(f"  {rng.choice(controls)} {rng.choice(domain)}_{s} > {rng.randint(0, 999)} THEN")
+            else:
+                lines.append(f"    {rng.choice(domain)}_{s} := {rng.choice(domain)}_{s} + 1; ! {rng.choice(domain)}")
+        lines.append("END;")
+    return "\n".join(lines) + "\n"
+
+# ===== BENCHMARK =====
+
+def time_extractor(extract, contents, repeat):
+    """Best wall time of repeat runs of extract over every chunk."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in contents:
+            extract(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="SimpleChunk pattern extraction microbenchmark")
+    parser.add_argument("--file", help="TAL source file to benchmark (default: synthetic)")
+    parser.add_argument("--procs", type=int, default=2000, help="Synthetic procedures")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per extractor; the best is reported")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8", errors="ignore") as f:
+            source = f.read()
+        source_name = args.file
+    else:
+        source = generate_tal_source(num_procs=args.procs, seed=args.seed)
+        source_name = "synthetic.tal"
+    print(f"📄 {source_name}: {len(source) / 1e6:.1f} MB, {source.count(chr(10))} lines")
+
+    contents = [chunk.content for chunk in TALChunker()._chunk_content_enhanced(source, source_name)]
+    # The scanner only handles ASCII chunks; SimpleChunk sends the rest to the reference
+    contents = [content for content in contents if content.isascii()]
+    print(f"📦 {len(contents)} ASCII chunks")
+
+    mismatches = sum(1 for content in contents if scan_code(content) != extract_code_patterns(content))
+    if mismatches:
+        print(f"❌ {mismatches} chunks differ between the scanner and the reference")
+        return False
+    print("✅ Scanner output matches the reference on every chunk")
+
+    reference_time = time_extractor(extract_code_patterns, contents, args.repeat)
+    scanner_time = time_extractor(scan_code, contents, args.repeat)
+
+    print(f"\n{'extractor':<24}{'total ms':>12}{'µs/chunk':>12}")
+    for name, seconds in (("per-pattern regexes", reference_time), ("single-pass scanner", scanner_time)):
+        print(f"{name:<24}{seconds * 1000:>12.1f}{seconds * 1e6 / max(1, len(contents)):>12.1f}")
+    print(f"\n🚀 Speedup: {reference_time / scanner_time:.2f}x")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+SQLite Document Catalog
+
+Embedded catalog of indexed documents for the document search API. Each file
+and each of its chunks is a row, updated in its own transaction, so a crash
+mid-index leaves every other file's entry intact and status pages are simple
+indexed queries instead of a full JSON load.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+SCAN_STATES = ("new", "modified", "indexed", "removed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    filename      TEXT PRIMARY KEY,
+    extension     TEXT NOT NULL,
+    hash          TEXT,
+    size          INTEGER NOT NULL DEFAULT 0,
+    modified_time REAL NOT NULL DEFAULT 0,
+    chunks_count  INTEGER NOT NULL DEFAULT 0,
+    indexed_time  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_extension ON files(extension);
+CREATE INDEX IF NOT EXISTS idx_files_indexed_time ON files(indexed_time);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    doc_name   TEXT NOT NULL REFERENCES files(filename) ON DELETE CASCADE,
+    chunk_id   INTEGER NOT NULL,
+    char_count INTEGER NOT NULL DEFAULT 0,
+    keywords   TEXT NOT NULL DEFAULT '[]',
+    PRIMARY KEY (doc_name, chunk_id)
+);
+
+-- Result of the last DOCS_DIR scan: every file on disk plus indexed files that disappeared
+CREATE TABLE IF NOT EXISTS scan_state (
+    filename      TEXT PRIMARY KEY,
+    state         TEXT NOT NULL,  -- new | modified | indexed | removed
+    extension     TEXT NOT NULL,
+    size          INTEGER NOT NULL DEFAULT 0,
+    modified_time REAL NOT NULL DEFAULT 0,
+    hash          TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scan_state ON scan_state(state);
+CREATE INDEX IF NOT EXISTS idx_scan_extension ON scan_state(extension);
+CREATE INDEX IF NOT EXISTS idx_scan_modified_time ON scan_state(modified_time);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class DocumentCatalogDB:
+    """Document catalog stored in SQLite (WAL mode), one connection per thread."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.pid = os.getpid()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        """Per-thread connection; use it as a context manager to commit or roll back a transaction."""
+        if os.getpid() != self.pid:
+            # Forked worker: never reuse a connection opened by the parent process
+            self.local = threading.local()
+            self.pid = os.getpid()
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self.local.conn = conn
+        return conn
+
+    # ===== WRITES =====
+
+    def _touch(self, conn):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_updated', ?)",
+                     (datetime.now().isoformat(),))
+
+    def upsert_file(self, filename, file_info, chunks, indexed_time=None):
+        """Replace one file's catalog row and chunk rows atomically."""
+        indexed_time = indexed_time or datetime.now().isoformat()
+        with self.connection() as conn:
+            conn.execute("DELETE FROM chunks WHERE doc_name = ?", (filename,))
+            conn.execute(
+                "INSERT OR REPLACE INTO files (filename, extension, hash, size, modified_time, chunks_count, indexed_time) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (filename, os.path.splitext(filename)[1].lower(), file_info.get("hash"),
+                 file_info.get("size", 0), file_info.get("modified_time", 0), len(chunks), indexed_time)
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks (doc_name, chunk_id, char_count, keywords) VALUES (?, ?, ?, ?)",
+                [(filename, int(chunk["chunk_id"]), len(chunk.get("content", "")), json.dumps(chunk.get("keywords", [])))
+                 for chunk in chunks]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO scan_state (filename, state, extension, size, modified_time, hash) "
+                "VALUES (?, 'indexed', ?, ?, ?, ?)",
+                (filename, os.path.splitext(filename)[1].lower(), file_info.get("size", 0),
+                 file_info.get("modified_time", 0), file_info.get("hash"))
+            )
+            self._touch(conn)
+
+    def remove_file(self, filename):
+        """Drop a file and its chunk rows."""
+        with self.connection() as conn:
+            conn.execute("DELETE FROM chunks WHERE doc_name = ?", (filename,))
+            conn.execute("DELETE FROM files WHERE filename = ?", (filename,))
+            conn.execute("DELETE FROM scan_state WHERE filename = ? AND state = 'removed'", (filename,))
+            self._touch(conn)
+
+    def clear(self):
+        """Remove every catalog entry (used by a forced full reindex)."""
+        with self.connection() as conn:
+            conn.execute("DELETE FROM chunks")
+            conn.execute("DELETE FROM files")
+            conn.execute("UPDATE scan_state SET state = 'new' WHERE state IN ('indexed', 'modified')")
+            conn.execute("DELETE FROM scan_state WHERE state = 'removed'")
+            self._touch(conn)
+
+    def record_scan(self, current_files, files_to_index, files_to_remove, docs_dir_mtime=0):
+        """Replace the stored scan result with a fresh DOCS_DIR scan."""
+        to_index = set(files_to_index)
+        indexed = self.indexed_files()
+        rows = []
+        for filename, info in current_files.items():
+            if filename not in to_index:
+                state = "indexed"
+            elif filename in indexed:
+                state = "modified"
+            else:
+                state = "new"
+            rows.append((filename, state, os.path.splitext(filename)[1].lower(),
+                         info.get("size", 0), info.get("modified_time", 0), info.get("hash")))
+        for filename in files_to_remove:
+            info = indexed.get(filename, {})
+            rows.append((filename, "removed", os.path.splitext(filename)[1].lower(),
+                         info.get("size", 0), info.get("modified_time", 0), info.get("hash")))
+        with self.connection() as conn:
+            conn.execute("DELETE FROM scan_state")
+            conn.executemany(
+                "INSERT INTO scan_state (filename, state, extension, size, modified_time, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan', ?)",
+                         (datetime.now().isoformat(),))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan_dir_mtime', ?)",
+                         (repr(docs_dir_mtime),))
+
+    def import_json_catalog(self, json_path):
+        """One-time migration from the old document_catalog.json layout."""
+        with open(json_path, "r") as f:
+            catalog = json.load(f)
+        with self.connection() as conn:
+            for filename, info in catalog.get("indexed_files", {}).items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO files (filename, extension, hash, size, modified_time, chunks_count, indexed_time) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (filename, os.path.splitext(filename)[1].lower(), info.get("hash"), info.get("size", 0),
+                     info.get("modified_time", 0), info.get("chunks_count", 0), info.get("indexed_time"))
+                )
+                # The JSON catalog only kept counts, so chunk rows are placeholders until the file is reindexed
+                conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (doc_name, chunk_id) VALUES (?, ?)",
+                    [(filename, chunk_id) for chunk_id in range(info.get("chunks_count", 0))]
+                )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_updated', ?)",
+                         (catalog.get("last_updated") or datetime.now().isoformat(),))
+        return len(catalog.get("indexed_files", {}))
+
+    # ===== READS =====
+
+    def get_file(self, filename):
+        row = self.connection().execute("SELECT * FROM files WHERE filename = ?", (filename,)).fetchone()
+        return dict(row) if row else None
+
+    def indexed_files(self):
+        """All catalog rows as {filename: {hash, size, modified_time, chunks_count, indexed_time}}."""
+        rows = self.connection().execute(
+            "SELECT filename, hash, size, modified_time, chunks_count, indexed_time FROM files ORDER BY filename"
+        ).fetchall()
+        return {row["filename"]: {key: row[key] for key in row.keys() if key != "filename"} for row in rows}
+
+    def count_files(self):
+        return self.connection().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def total_chunks(self):
+        return self.connection().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def last_updated(self):
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'last_updated'").fetchone()
+        return row[0] if row else None
+
+    def is_empty(self):
+        return self.connection().execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def last_scan(self):
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'last_scan'").fetchone()
+        return row[0] if row else None
+
+    def last_scan_dir_mtime(self):
+        """DOCS_DIR mtime seen by the last scan (None if never scanned)."""
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'last_scan_dir_mtime'").fetchone()
+        return float(row[0]) if row else None
+
+    def load_scan(self):
+        """The stored scan as (files_to_index, files_to_remove, current_files), like get_files_to_index()."""
+        files_to_index, files_to_remove, current_files = [], [], {}
+        for row in self.connection().execute(
+            "SELECT filename, state, size, modified_time, hash FROM scan_state ORDER BY filename"
+        ):
+            if row["state"] == "removed":
+                files_to_remove.append(row["filename"])
+                continue
+            current_files[row["filename"]] = {
+                "size": row["size"], "modified_time": row["modified_time"], "hash": row["hash"]
+            }
+            if row["state"] in ("new", "modified"):
+                files_to_index.append(row["filename"])
+        return files_to_index, files_to_remove, current_files
+
+    def known_file_stats(self):
+        """{filename: (size, modified_time, hash)} from the catalog and the last scan, for skipping rehashes."""
+        known = {}
+        for row in self.connection().execute("SELECT filename, size, modified_time, hash FROM scan_state WHERE state != 'removed'"):
+            known[row["filename"]] = (row["size"], row["modified_time"], row["hash"])
+        for row in self.connection().execute("SELECT filename, size, modified_time, hash FROM files"):
+            known[row["filename"]] = (row["size"], row["modified_time"], row["hash"])
+        return known
+
+    def state_counts(self):
+        """Number of scanned files per state (every state present, zero if none)."""
+        counts = {state: 0 for state in SCAN_STATES}
+        for row in self.connection().execute("SELECT state, COUNT(*) AS n FROM scan_state GROUP BY state"):
+            counts[row["state"]] = row["n"]
+        return counts
+
+    def filenames_in_state(self, state, limit=None, offset=0):
+        """Filenames in one scan state, sorted; limit=None returns all of them."""
+        rows = self.connection().execute(
+            "SELECT filename FROM scan_state WHERE state = ? ORDER BY filename LIMIT ? OFFSET ?",
+            (state, -1 if limit is None else limit, offset)
+        ).fetchall()
+        return [row["filename"] for row in rows]
+
+    def list_entries(self, state=None, extension=None, modified_after=None, modified_before=None,
+                     indexed_after=None, indexed_before=None, limit=50, offset=0):
+        """One page of catalog entries matching the filters, plus the total match count.
+
+        Dates: modified_* are epoch seconds, indexed_* are ISO timestamps.
+        Returns (total, [entry dicts]).
+        """
+        clauses, params = [], []
+        if state:
+            clauses.append("s.state = ?")
+            params.append(state)
+        if extension:
+            clauses.append("s.extension = ?")
+            params.append(extension.lower() if extension.startswith(".") else f".{extension.lower()}")
+        if modified_after is not None:
+            clauses.append("s.modified_time >= ?")
+            params.append(modified_after)
+        if modified_before is not None:
+            clauses.append("s.modified_time < ?")
+            params.append(modified_before)
+        if indexed_after:
+            clauses.append("f.indexed_time >= ?")
+            params.append(indexed_after)
+        if indexed_before:
+            clauses.append("f.indexed_time < ?")
+            params.append(indexed_before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        conn = self.connection()
+        base = f"FROM scan_state s LEFT JOIN files f ON f.filename = s.filename {where}"
+        total = conn.execute(f"SELECT COUNT(*) {base}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT s.filename, s.state, s.extension, s.size, s.modified_time, s.hash, "
+            f"f.chunks_count, f.indexed_time {base} ORDER BY s.filename LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        return total, [dict(row) for row in rows]
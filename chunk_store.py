@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Segmented Chunk Metadata Store
+
+Keeps the chunk metadata produced by the Java Lucene indexer as one JSON
+segment per document, so reindexing a document rewrites only that document's
+segment instead of the whole lucene_chunks.json. Queries are served from the
+published index snapshot, so the store is write-only from the app's side.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+class ChunkStore:
+    """Per-document chunk segments under a single directory."""
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _segment_path(self, doc_name):
+        # Hash the name so any document name maps to a safe, fixed-length file name
+        digest = hashlib.sha1(doc_name.encode("utf-8")).hexdigest()
+        return os.path.join(self.root_dir, f"{digest}.json")
+
+    def replace_document(self, doc_name, chunks):
+        """Atomically replace one document's chunks."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"doc_name": doc_name, "chunks": chunks}, f)
+            os.replace(tmp_path, self._segment_path(doc_name))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def remove_document(self, doc_name):
+        """Drop a document's segment; returns True if it existed."""
+        path = self._segment_path(doc_name)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+    def clear(self):
+        """Remove every segment (used by a forced full reindex)."""
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+        os.makedirs(self.root_dir, exist_ok=True)
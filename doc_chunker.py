@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+In-Process Document Chunker
+
+Splits extracted document text into overlapping chunks and picks keywords for
+each chunk, producing the same records the Java Lucene indexer writes to
+lucene_chunks.json:
+
+    {"doc_name": ..., "chunk_id": 0, "content": ..., "keywords": [...]}
+
+Running in Python lets the indexing pipeline chunk and embed each document as
+soon as its text is extracted instead of waiting for the whole JVM batch.
+"""
+
+import re
+from collections import Counter
+
+CHUNK_SIZE = 1000  # target characters per chunk
+CHUNK_OVERLAP = 200  # characters repeated at the start of the next chunk
+NUM_KEYWORDS = 5
+
+# Lucene's EnglishAnalyzer stop set, so keywords match what the Java side indexed
+STOP_WORDS = frozenset("""
+a an and are as at be but by for if in into is it no not of on or such that the their then
+there these they this to was will with
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9_'-]*")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_BREAK = re.compile(r"[.!?]\s+")
+
+def _find_boundary(text, start, end):
+    """Best split point in text[start:end]: paragraph, then sentence, then whitespace."""
+    if end >= len(text):
+        return len(text)
+    window = text[start:end]
+    # Only accept a break in the second half so chunks do not get tiny
+    min_offset = len(window) // 2
+    for pattern in (PARAGRAPH_BREAK, SENTENCE_BREAK):
+        matches = [m.end() for m in pattern.finditer(window) if m.end() > min_offset]
+        if matches:
+            return start + matches[-1]
+    space = window.rfind(" ", min_offset)
+    if space > 0:
+        return start + space + 1
+    return end
+
+def extract_keywords(content, num_keywords=NUM_KEYWORDS):
+    """Most frequent non-stop-word terms (ties broken by first occurrence)."""
+    tokens = [token.lower() for token in TOKEN_PATTERN.findall(content)]
+    counts = Counter(token for token in tokens if len(token) > 2 and token not in STOP_WORDS)
+    return [term for term, _ in counts.most_common(num_keywords)]
+
+def chunk_text(doc_name, text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, num_keywords=NUM_KEYWORDS):
+    """Split one document's text into chunk records with keywords."""
+    text = text.strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = _find_boundary(text, start, start + chunk_size)
+        content = text[start:end].strip()
+        if content:
+            chunks.append({
+                "doc_name": doc_name,
+                "chunk_id": len(chunks),
+                "content": content,
+                "keywords": extract_keywords(content, num_keywords)
+            })
+        if end >= len(text):
+            break
+        # Step back by the overlap, but always make progress
+        next_start = max(end - overlap, start + 1)
+        while next_start < end and not text[next_start - 1].isspace():
+            next_start += 1
+        start = next_start
+    return chunks
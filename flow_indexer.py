@@ -18,6 +18,8 @@ from pathlib import Path
 from enum import Enum
 from typing import Dict, List, Set, Tuple, Any, Optional
 
+from tal_corpus import SparseMatrix
+
 # Try to import NLTK components (graceful fallback if not available)
 try:
     import nltk
@@ -89,7 +91,7 @@ class IndexableChunk:
         self.flow_summary = ""
         self.flow_vector = []
         self.network_vector = []
-        self.tfidf_vector = []
+        self.tfidf_row = -1
     
     def _extract_function_calls(self):
         """Extract function call patterns."""
@@ -149,7 +151,7 @@ class IndexableChunk:
             'flow_summary': self.flow_summary,
             'flow_vector': self.flow_vector,
             'network_vector': self.network_vector,
-            'tfidf_vector': self.tfidf_vector
+            'tfidf_row': self.tfidf_row
         }
 
 # ===== TEXT PROCESSOR =====
@@ -464,6 +466,7 @@ class PaymentFlowIndexer:
         
         self.chunks = []
         self.vocabulary = {}
+        self.tfidf_matrix = SparseMatrix()
         self.stats = {}
     
     def index_directory(self, directory_path, file_extensions=None, output_file=None):
@@ -578,6 +581,7 @@ class PaymentFlowIndexer:
             vocab_words = vocab_words[:self.max_features]
         
         self.vocabulary = {word: idx for idx, word in enumerate(vocab_words)}
+        self.tfidf_matrix = SparseMatrix(len(self.vocabulary))
         
         # Create vectors for chunks
         for chunk in self.chunks:
@@ -592,8 +596,8 @@ class PaymentFlowIndexer:
                 for network in PaymentNetwork
             ]
             
-            # Simple TF-IDF vector
-            chunk.tfidf_vector = [0.0] * len(self.vocabulary)
+            # Simple TF-IDF vector (a row of the sparse matrix)
+            tfidf_vector = {}
             word_counts = Counter(chunk.stemmed_words)
             total_words = len(chunk.stemmed_words)
             
@@ -601,7 +605,9 @@ class PaymentFlowIndexer:
                 for word, count in word_counts.items():
                     if word in self.vocabulary:
                         tf = count / total_words
-                        chunk.tfidf_vector[self.vocabulary[word]] = tf
+                        tfidf_vector[self.vocabulary[word]] = tf
+            
+            chunk.tfidf_row = self.tfidf_matrix.append_row(tfidf_vector)
         
         print(f"   📝 Vocabulary size: {len(self.vocabulary)}")
     
@@ -639,10 +645,11 @@ class PaymentFlowIndexer:
         
         try:
             index_data = {
-                'version': '1.0-payment-flow-index',
+                'version': '1.1-payment-flow-index',
                 'created_at': __import__('datetime').datetime.now().isoformat(),
                 'chunks': [chunk.to_dict() for chunk in self.chunks],
                 'vocabulary': self.vocabulary,
+                'tfidf_matrix': self.tfidf_matrix.to_dict(),
                 'flow_types': [flow.value for flow in FlowType],
                 'network_types': [net.value for net in PaymentNetwork],
                 'statistics': self.stats
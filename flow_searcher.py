@@ -17,6 +17,8 @@ from collections import defaultdict, Counter
 from typing import Dict, List, Set, Tuple, Any, Optional
 from enum import Enum
 
+from tal_corpus import ChunkBase, SparseMatrix
+
 # ===== ENUM DEFINITIONS (must match indexer) =====
 
 class PaymentNetwork(Enum):
@@ -56,9 +58,14 @@ class ISOMessageType(Enum):
 
 # ===== CHUNK CLASS FOR LOADING =====
 
-class SearchableChunk:
+class SearchableChunk(ChunkBase):
     """Chunk class for search operations (loaded from saved corpus)."""
     
+    # Slotted like the other TAL chunk classes: no per-chunk attribute dict
+    __slots__ = ('detected_networks', 'flow_capabilities', 'primary_flow', 'secondary_flows',
+                 'flow_summary', 'message_patterns', 'transaction_types', 'flow_vector',
+                 'network_vector')
+    
     def __init__(self, chunk_data):
         # Basic properties
         self.content = chunk_data['content']
@@ -83,7 +90,7 @@ class SearchableChunk:
         # Vector data
         self.flow_vector = chunk_data['flow_vector']
         self.network_vector = chunk_data['network_vector']
-        self.tfidf_vector = chunk_data['tfidf_vector']
+        self.tfidf_row = chunk_data.get('tfidf_row', -1)
     
     def __hash__(self):
         """Make chunk hashable for use in sets."""
@@ -134,6 +141,7 @@ class PaymentFlowSearcher:
     def __init__(self, corpus_path: str):
         self.chunks = []
         self.vocabulary = {}
+        self.tfidf_matrix = SparseMatrix()
         self.corpus_stats = {}
         self.search_indexes = {}
         
@@ -156,7 +164,7 @@ class PaymentFlowSearcher:
             corpus_data = pickle.load(f)
         
         # Validate corpus version - updated to match indexer version format
-        if 'version' not in corpus_data or not corpus_data['version'].startswith('1.0-payment-flow'):
+        if 'version' not in corpus_data or not corpus_data['version'].startswith(('1.0-payment-flow', '1.1-payment-flow')):
             print("⚠️  Warning: Corpus may not be compatible with this searcher version")
         
         # Load chunks
@@ -164,6 +172,15 @@ class PaymentFlowSearcher:
             chunk = SearchableChunk(chunk_data)
             self.chunks.append(chunk)
         
+        # Sparse TF-IDF rows; 1.0 indexes store a dense list per chunk instead
+        if 'tfidf_matrix' in corpus_data:
+            self.tfidf_matrix = SparseMatrix.from_dict(corpus_data['tfidf_matrix'])
+        else:
+            self.tfidf_matrix = SparseMatrix.from_dense_rows(
+                chunk_data.get('tfidf_vector', []) for chunk_data in corpus_data['chunks'])
+            for row, chunk in enumerate(self.chunks):
+                chunk.tfidf_row = row
+        
         # Load vocabulary and statistics - updated to match indexer format
         self.vocabulary = corpus_data.get('vocabulary', {})
         self.corpus_stats = corpus_data.get('statistics', {})
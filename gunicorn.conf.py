@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for the document search API.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+preload_app imports wsgi.py once in the master, so the embedding model and the
+current index version are loaded before the workers fork and their memory is
+shared copy-on-write. Embeddings are memory-mapped from index_versions/, and
+each worker switches to a newly published version on its next query, so no
+restart is needed after POST /index. Each worker snapshots its stage metrics
+to METRICS_DIR and GET /metrics sums them, so any worker can serve a scrape.
+"""
+
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+threads = int(os.getenv("GUNICORN_THREADS", "2"))
+preload_app = True
+
+# Indexing and Claude calls can take minutes
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "600"))
+graceful_timeout = 30
+
+accesslog = "-"
+errorlog = "-"
+
+def on_starting(server):
+    # Runs once in the master: drop metric snapshots left by a previous run
+    from app import clear_metrics_dir
+    clear_metrics_dir()
+
+def post_fork(server, worker):
+    # Threads do not survive fork, so each worker starts its own scan refresher and
+    # enrichment thread; host-wide locks let only one of them do the work at a time
+    from app import start_background_workers
+    start_background_workers()
+
+def worker_exit(server, worker):
+    # Keep the observations made since the worker's last timed flush
+    from app import stage_metrics
+    stage_metrics.flush()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Versioned Search Index Store
+
+Publishes the query-side index (chunk entries plus a row-normalized float32
+embedding matrix) as immutable version directories:
+
+    index_versions/
+        CURRENT                  -> name of the live version
+        pins/<pid>               versions each worker process is reading
+        v20250101T120000-0001/
+            chunks.json          chunk entries without their embeddings
+            embeddings.npy       float32 matrix, one row per chunk
+            metadata.json        small caller-supplied facts about the version
+            lucene/              hardlinked copy of the Lucene index
+
+A new version is written under a temporary name, renamed into place, and then
+made live by swapping CURRENT with os.replace, so readers never see a partial
+index. A query pins the snapshot it started on, so chunk ids, embeddings and
+Lucene hits always come from the same indexing run. Old versions are removed
+once no live process pins them. Embeddings are opened with mmap, so
+pre-forked workers share the same page-cache pages.
+"""
+
+import os
+import json
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+CURRENT_POINTER = "CURRENT"
+PINS_DIR = "pins"
+CHUNKS_FILE = "chunks.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+LUCENE_SUBDIR = "lucene"
+
+def list_versions(root_dir):
+    """Published version names, oldest first."""
+    if not os.path.isdir(root_dir):
+        return []
+    return sorted(name for name in os.listdir(root_dir)
+                  if name.startswith("v") and os.path.isdir(os.path.join(root_dir, name)))
+
+def read_current_version(root_dir):
+    """Name of the live version, or None if nothing has been published."""
+    try:
+        with open(os.path.join(root_dir, CURRENT_POINTER), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _next_version_name(root_dir):
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    existing = list_versions(root_dir)
+    sequence = int(existing[-1].rsplit("-", 1)[-1]) + 1 if existing else 1
+    return f"v{stamp}-{sequence:04d}"
+
+def link_tree(src_dir, dst_dir):
+    """Hardlink every file of src_dir into dst_dir (copy when linking is not possible).
+
+    Lucene never rewrites a segment file in place, so the links stay a
+    consistent snapshot while the indexer keeps writing to src_dir.
+    """
+    for dirpath, _, filenames in os.walk(src_dir):
+        target_dir = os.path.join(dst_dir, os.path.relpath(dirpath, src_dir))
+        os.makedirs(target_dir, exist_ok=True)
+        for filename in filenames:
+            if filename == "write.lock":
+                continue
+            src_path = os.path.join(dirpath, filename)
+            dst_path = os.path.join(target_dir, filename)
+            try:
+                os.link(src_path, dst_path)
+            except OSError:
+                shutil.copy2(src_path, dst_path)
+
+def publish_index(root_dir, indexed_docs, lucene_dir=None, keep_versions=2, metadata=None):
+    """Write indexed_docs (and a snapshot of lucene_dir) as a new version and make it current.
+
+    metadata is stored with the version, so it can be read without loading the chunks.
+    Returns the version name.
+    """
+    os.makedirs(root_dir, exist_ok=True)
+    version = _next_version_name(root_dir)
+    staging_dir = os.path.join(root_dir, f".staging-{version}")
+    os.makedirs(staging_dir)
+
+    try:
+        chunks = [{key: value for key, value in doc.items() if key != "embedding"} for doc in indexed_docs]
+        with open(os.path.join(staging_dir, CHUNKS_FILE), "w") as f:
+            json.dump(chunks, f)
+
+        if indexed_docs:
+            matrix = np.asarray([doc["embedding"] for doc in indexed_docs], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix = matrix / norms
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        np.save(os.path.join(staging_dir, EMBEDDINGS_FILE), matrix)
+
+        with open(os.path.join(staging_dir, METADATA_FILE), "w") as f:
+            json.dump(metadata or {}, f)
+
+        if lucene_dir and os.path.isdir(lucene_dir):
+            link_tree(lucene_dir, os.path.join(staging_dir, LUCENE_SUBDIR))
+
+        os.rename(staging_dir, os.path.join(root_dir, version))
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    pointer_tmp = os.path.join(root_dir, f".{CURRENT_POINTER}.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(root_dir, CURRENT_POINTER))
+
+    collect_garbage(root_dir, keep_versions)
+    return version
+
+def read_version_metadata(root_dir, version):
+    """The metadata a version was published with ({} for versions published without any)."""
+    try:
+        with open(os.path.join(root_dir, version, METADATA_FILE), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def pinned_versions(root_dir):
+    """Versions pinned by live processes; pin files (and temp files) of dead processes are removed."""
+    pins_dir = os.path.join(root_dir, PINS_DIR)
+    pinned = set()
+    if not os.path.isdir(pins_dir):
+        return pinned
+    for name in os.listdir(pins_dir):
+        path = os.path.join(pins_dir, name)
+        pid, _, suffix = name.partition(".")
+        if not pid.isdigit() or not _pid_alive(int(pid)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # another process cleaned it up first
+            continue
+        if suffix:
+            continue  # a live process's <pid>.tmp, about to replace its pin file
+        try:
+            with open(path, "r") as f:
+                pinned.update(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return pinned
+
+def collect_garbage(root_dir, keep_versions=2):
+    """Delete versions that are not current, not among the newest keep_versions and not pinned."""
+    versions = list_versions(root_dir)
+    keep = set(versions[-keep_versions:]) if keep_versions > 0 else set()
+    keep.add(read_current_version(root_dir))
+    keep |= pinned_versions(root_dir)
+
+    removed = []
+    for version in versions:
+        if version not in keep:
+            shutil.rmtree(os.path.join(root_dir, version), ignore_errors=True)
+            removed.append(version)
+    return removed
+
+class IndexSnapshot:
+    """One published index version as loaded by a reader."""
+
+    def __init__(self, root_dir, version):
+        self.version = version
+        self.path = os.path.join(root_dir, version)
+        with open(os.path.join(self.path, CHUNKS_FILE), "r") as f:
+            self.chunks = json.load(f)
+        self.embeddings = np.load(os.path.join(self.path, EMBEDDINGS_FILE), mmap_mode="r")
+
+    @property
+    def lucene_dir(self):
+        return os.path.join(self.path, LUCENE_SUBDIR)
+
+class IndexReader:
+    """Loads the current version, reloads when CURRENT changes and pins versions in use."""
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.in_use = {}  # version -> number of active pins in this process
+        self.pid = os.getpid()
+        self.pinned = None  # version set last written to this process's pin file
+
+    def get(self):
+        """The live snapshot, or None if nothing has been published."""
+        version = read_current_version(self.root_dir)
+        if version is None:
+            return None
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.version != version:
+            with self.lock:
+                if self.snapshot is None or self.snapshot.version != version:
+                    self.snapshot = IndexSnapshot(self.root_dir, version)
+                    self._write_pins()
+                snapshot = self.snapshot
+        return snapshot
+
+    def _write_pins(self):
+        # Called with self.lock held; only touches disk when the pinned set changes
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.pinned = None
+        versions = {version for version, count in self.in_use.items() if count > 0}
+        if self.snapshot is not None:
+            versions.add(self.snapshot.version)
+        if versions == self.pinned:
+            return
+        pins_dir = os.path.join(self.root_dir, PINS_DIR)
+        os.makedirs(pins_dir, exist_ok=True)
+        pin_path = os.path.join(pins_dir, str(self.pid))
+        with open(f"{pin_path}.tmp", "w") as f:
+            json.dump(sorted(versions), f)
+        os.replace(f"{pin_path}.tmp", pin_path)
+        self.pinned = versions
+
+    def release_pins(self):
+        """Drop this process's pin file (e.g. in a pre-fork master that serves no queries)."""
+        with self.lock:
+            pin_path = os.path.join(self.root_dir, PINS_DIR, str(os.getpid()))
+            if os.path.exists(pin_path):
+                os.remove(pin_path)
+            self.pinned = None
+
+    @contextmanager
+    def pin(self, snapshot=None):
+        """Hold a snapshot (default: the current one) for the duration of a query.
+
+        Yields None if nothing has been published.
+        """
+        snapshot = snapshot or self.get()
+        if snapshot is None:
+            yield None
+            return
+        with self.lock:
+            self.in_use[snapshot.version] = self.in_use.get(snapshot.version, 0) + 1
+            self._write_pins()
+        try:
+            yield snapshot
+        finally:
+            with self.lock:
+                self.in_use[snapshot.version] -= 1
+                if self.in_use[snapshot.version] == 0:
+                    del self.in_use[snapshot.version]
+                self._write_pins()
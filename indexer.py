@@ -11,6 +11,7 @@ Features:
 - Technical pattern extraction (function calls, variables, control structures)
 - Semantic categorization optimized for wire processing
 - High-value term boosting for critical wire processing vocabulary
+- Incremental updates that re-index only new and changed files
 """
 
 import os
@@ -21,8 +22,14 @@ import math
 import random
 import sys
 import hashlib
+import multiprocessing
 from collections import defaultdict, Counter
+from functools import lru_cache
 from pathlib import Path
+from array import array
+
+from tal_corpus import (SparseMatrix, TermTable, CorpusDirectory, TERM_COLUMNS, is_corpus_dir,
+                        write_corpus_dir)
 
 # Try to import NLTK components (graceful fallback if not available)
 try:
@@ -45,6 +52,82 @@ except ImportError:
     NLTK_AVAILABLE = False
     print("⚠️  NLTK not available - using basic text processing")
 
+STEM_CACHE_SIZE = 200000  # distinct words whose stems are memoized per process
+
+# Separate per-pattern extraction regexes, compiled once
+WORD_PATTERN = re.compile(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b')
+FUNCTION_CALL_PATTERN = re.compile(r'\b([a-zA-Z_][a-zA-Z0-9_]*)\s*\(', re.IGNORECASE)
+VARIABLE_DECLARATION_PATTERNS = [
+    re.compile(r'\bINT\s+([a-zA-Z_][a-zA-Z0-9_]*)', re.IGNORECASE),  # TAL INT declarations
+    re.compile(r'\bSTRING\s+([a-zA-Z_][a-zA-Z0-9_]*)', re.IGNORECASE),  # TAL STRING declarations
+    re.compile(r'\bchar\s+([a-zA-Z_][a-zA-Z0-9_]*)', re.IGNORECASE),  # C char declarations
+    re.compile(r'\bint\s+([a-zA-Z_][a-zA-Z0-9_]*)', re.IGNORECASE),   # C int declarations
+]
+CONTROL_KEYWORDS = ['if', 'else', 'while', 'for', 'switch', 'case', 'return', 'break', 'continue']
+CONTROL_KEYWORD_PATTERNS = [(keyword, re.compile(r'\b' + keyword + r'\b')) for keyword in CONTROL_KEYWORDS]
+
+# Single-pass scanner: every word, plus the whitespace after it when another
+# word follows directly, or "(" when it is called
+CODE_TOKEN_PATTERN = re.compile(r'(\w+)(?:(\s+)(?=\w)|\s*(\())?')
+DECLARATION_KEYWORDS = ('INT', 'STRING', 'CHAR')  # upper-cased; also covers C int and char
+
+def extract_code_patterns(content):
+    """(raw_words, function_calls, variable_declarations, control_structures) of a chunk.
+    
+    Reference implementation: one regex pass per pattern.
+    """
+    raw_words = WORD_PATTERN.findall(content.lower())
+    
+    # Pattern for function calls: word followed by parentheses
+    function_calls = list(set(FUNCTION_CALL_PATTERN.findall(content)))
+    
+    # Common TAL/C variable declaration patterns
+    variables = []
+    for pattern in VARIABLE_DECLARATION_PATTERNS:
+        variables.extend(pattern.findall(content))
+    variable_declarations = list(set(variables))
+    
+    content_lower = content.lower()
+    control_structures = [keyword for keyword, pattern in CONTROL_KEYWORD_PATTERNS if pattern.search(content_lower)]
+    
+    return raw_words, function_calls, variable_declarations, control_structures
+
+def scan_code(content):
+    """Same result as extract_code_patterns from one scan of ASCII content.
+    
+    For ASCII text \\w is exactly [a-zA-Z0-9_], so every pattern above
+    matches whole scanned words: a word is raw (lower-cased) when it does not
+    start with a digit, a call when "(" follows, a declaration when it
+    directly follows a declaration keyword and whitespace. Like the separate
+    findall passes, a word taken as a declared name cannot also start a
+    declaration of the same keyword. Lists collected from sets get the same
+    insertion order, hence the same order, as the reference.
+    """
+    raw_words = []
+    calls = []
+    declarations = {keyword: [] for keyword in DECLARATION_KEYWORDS}
+    pending = None  # declaration keyword whose name would be the next word
+    
+    for word, space, paren in CODE_TOKEN_PATTERN.findall(content):
+        declared_by = None
+        if not word[0].isdigit():
+            raw_words.append(word.lower())
+            if paren:
+                calls.append(word)
+            if pending is not None:
+                declarations[pending].append(word)
+                declared_by = pending
+        pending = None
+        if space:
+            keyword = word.upper()
+            if keyword in declarations and keyword != declared_by:
+                pending = keyword
+    
+    words_seen = set(raw_words)
+    variables = [name for keyword in DECLARATION_KEYWORDS for name in declarations[keyword]]
+    return (raw_words, list(set(calls)), list(set(variables)),
+            [keyword for keyword in CONTROL_KEYWORDS if keyword in words_seen])
+
 class SimpleChunk:
     """Enhanced chunk representation with wire processing metadata."""
     def __init__(self, content, source_file, chunk_id, start_line=0, end_line=0, procedure_name=""):
@@ -55,59 +138,31 @@ class SimpleChunk:
         self.end_line = end_line
         self.procedure_name = procedure_name
         
-        # Extract basic info
-        self.raw_words = re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', content.lower())
+        # Extract basic info and technical patterns specific to TAL/C code, in one
+        # pass for ASCII source (nearly all TAL); other text takes the per-pattern regexes
+        extract = scan_code if content.isascii() else extract_code_patterns
+        self.raw_words, self.function_calls, self.variable_declarations, self.control_structures = extract(content)
         self.words = []  # Will be filled with processed words
         self.stemmed_words = []  # Will be filled with stemmed words
         self.word_count = len(self.raw_words)
         self.char_count = len(content)
         
-        # Technical patterns specific to TAL/C code
-        self.function_calls = self._extract_function_calls()
-        self.variable_declarations = self._extract_variable_declarations()
-        self.control_structures = self._extract_control_structures()
-        
         # Will be filled by vectorizer
-        self.tfidf_vector = []
+        self.tfidf_row = -1  # row of the vectorizer's sparse TF-IDF matrix
         self.topic_distribution = []
         self.dominant_topic = -1
         self.dominant_topic_prob = 0.0
         self.keywords = []
         self.semantic_category = ""
     
-    def _extract_function_calls(self):
-        """Extract function call patterns from code."""
-        # Pattern for function calls: word followed by parentheses
-        pattern = r'\b([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-        return list(set(re.findall(pattern, self.content, re.IGNORECASE)))
-    
-    def _extract_variable_declarations(self):
-        """Extract variable declaration patterns."""
-        # Common TAL/C variable declaration patterns
-        patterns = [
-            r'\bINT\s+([a-zA-Z_][a-zA-Z0-9_]*)',  # TAL INT declarations
-            r'\bSTRING\s+([a-zA-Z_][a-zA-Z0-9_]*)',  # TAL STRING declarations
-            r'\bchar\s+([a-zA-Z_][a-zA-Z0-9_]*)',  # C char declarations
-            r'\bint\s+([a-zA-Z_][a-zA-Z0-9_]*)',   # C int declarations
-        ]
-        
-        variables = []
-        for pattern in patterns:
-            variables.extend(re.findall(pattern, self.content, re.IGNORECASE))
-        
-        return list(set(variables))
+    @classmethod
+    def from_saved(cls, record):
+        """Chunk rebuilt from its saved record (words decoded), without re-running the extractors."""
+        chunk = cls.__new__(cls)
+        chunk.__dict__.update(record)
+        chunk.raw_words = []  # only needed to process words, which the record already has
+        return chunk
     
-    def _extract_control_structures(self):
-        """Extract control structure keywords."""
-        control_keywords = ['if', 'else', 'while', 'for', 'switch', 'case', 'return', 'break', 'continue']
-        found_structures = []
-        
-        content_lower = self.content.lower()
-        for keyword in control_keywords:
-            if re.search(r'\b' + keyword + r'\b', content_lower):
-                found_structures.append(keyword)
-        
-        return found_structures
 
 class EnhancedTextProcessor:
     """Enhanced text processing with NLP capabilities for wire processing."""
@@ -123,6 +178,9 @@ class EnhancedTextProcessor:
             except:
                 pass
         
+        # Identifiers repeat across thousands of chunks, so stem each distinct word once
+        self._cached_stem = lru_cache(maxsize=STEM_CACHE_SIZE)(self.stemmer.stem) if self.stemmer else None
+        
         # Add programming-specific stop words
         prog_stop_words = {
             'int', 'char', 'string', 'void', 'return', 'if', 'else', 'while', 'for',
@@ -154,11 +212,15 @@ class EnhancedTextProcessor:
         # Apply stemming if available
         stemmed_words = []
         if self.stemmer and filtered_words:
-            stemmed_words = [self.stemmer.stem(word) for word in filtered_words]
+            stemmed_words = [self._cached_stem(word) for word in filtered_words]
         else:
             stemmed_words = filtered_words.copy()
         
         return filtered_words, stemmed_words
+    
+    def stem(self, word):
+        """Stem a single word (memoized; identity without NLTK)."""
+        return self._cached_stem(word) if self.stemmer else word
 
 class TALChunker:
     """Enhanced chunker with better procedure detection."""
@@ -268,6 +330,99 @@ class TALChunker:
         
         return chunks
 
+def count_document_frequencies(chunks):
+    """Document frequencies of processed and stemmed words over chunks.
+    
+    Keys are inserted in first-seen order, so merging per-file counts in file
+    order gives the same dicts as counting the whole corpus at once.
+    """
+    word_doc_freq = defaultdict(int)
+    stemmed_doc_freq = defaultdict(int)
+    
+    for chunk in chunks:
+        for word in set(chunk.words):
+            word_doc_freq[word] += 1
+        for stemmed in set(chunk.stemmed_words):
+            stemmed_doc_freq[stemmed] += 1
+    
+    return word_doc_freq, stemmed_doc_freq
+
+def subtract_document_frequencies(totals, doc_freqs):
+    """Remove one (word_df, stemmed_df) pair from corpus totals in place, dropping zero counts."""
+    for total, freqs in zip(totals, doc_freqs):
+        for term, freq in freqs.items():
+            total[term] -= freq
+            if total[term] <= 0:
+                del total[term]
+
+def merge_document_frequencies(doc_freqs):
+    """Reduce per-file (word_df, stemmed_df) pairs, in file order, into corpus totals."""
+    word_doc_freq = defaultdict(int)
+    stemmed_doc_freq = defaultdict(int)
+    for file_word_df, file_stemmed_df in doc_freqs:
+        for word, freq in file_word_df.items():
+            word_doc_freq[word] += freq
+        for stemmed, freq in file_stemmed_df.items():
+            stemmed_doc_freq[stemmed] += freq
+    return word_doc_freq, stemmed_doc_freq
+
+def file_digest(file_path):
+    """SHA-256 of a source file's bytes (None if unreadable), recorded for incremental updates."""
+    try:
+        with open(file_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def load_saved_corpus(corpus_path):
+    """(corpus_data, chunk records, TF-IDF matrix) of a saved corpus in either format.
+    
+    Records are plain dicts with words and stemmed_words decoded from their
+    token ids, and the matrix is an in-memory copy, so nothing refers back to
+    the files once this returns and the corpus can be rewritten in place.
+    """
+    if is_corpus_dir(corpus_path):
+        corpus = CorpusDirectory(corpus_path)
+        corpus_data = dict(corpus.manifest)
+        records = [
+            {name: corpus.value(name, index) for name in corpus.columns}
+            for index in range(corpus.n_chunks)
+        ]
+        terms = corpus.term_table.terms
+        matrix = corpus.tfidf_matrix
+    else:
+        with open(corpus_path, 'rb') as f:
+            corpus_data = pickle.load(f)
+        records = corpus_data.get('chunks', [])
+        terms = corpus_data.get('terms', [])
+        matrix = SparseMatrix.from_dict(corpus_data['tfidf_matrix']) if 'tfidf_matrix' in corpus_data else SparseMatrix()
+    
+    for record in records:
+        for words_name, ids_name in TERM_COLUMNS.items():
+            if ids_name in record:
+                record[words_name] = [terms[term_id] for term_id in record.pop(ids_name)]
+    
+    matrix = SparseMatrix(matrix.n_cols, array('q', matrix.indptr), array('i', matrix.indices), array('d', matrix.data))
+    return corpus_data, records, matrix
+
+# Per-process state for the indexing pool (set by _init_index_worker)
+_worker_chunker = None
+_worker_processor = None
+
+def _init_index_worker(stop_words):
+    global _worker_chunker, _worker_processor
+    _worker_chunker = TALChunker()
+    _worker_processor = EnhancedTextProcessor()
+    # Use the vectorizer's stop words, including the wire domain additions
+    _worker_processor.stop_words = set(stop_words)
+
+def _index_file(file_path):
+    """Pool task: chunk one file, process its words, count its document frequencies and hash it."""
+    file_chunks = _worker_chunker.chunk_file(file_path)
+    for chunk in file_chunks:
+        chunk.words, chunk.stemmed_words = _worker_processor.process_words(chunk.raw_words)
+    return file_path, file_chunks, count_document_frequencies(file_chunks), file_digest(file_path)
+
 class EnhancedVectorizer:
     """Enhanced vectorizer with wire processing domain knowledge and improved topic modeling."""
     
@@ -278,6 +433,9 @@ class EnhancedVectorizer:
         self.vocabulary = {}
         self.stemmed_vocabulary = {}
         self.idf_values = {}
+        self.stem_idf_values = {}
+        self.high_value_stems = set()
+        self.tfidf_matrix = SparseMatrix()
         self.topic_labels = []
         self.topic_keywords = []
         self.document_count = 0
@@ -386,19 +544,25 @@ class EnhancedVectorizer:
                 'investigation', 'exception', 'repair', 'reversal', 'return'
             }
     
-    def fit_transform(self, chunks):
-        """Enhanced vectorization with improved topic modeling."""
+    def fit_transform(self, chunks, doc_freqs=None):
+        """Enhanced vectorization with improved topic modeling.
+        
+        doc_freqs is a precomputed (word_df, stemmed_df) pair from parallel
+        indexing; when given, chunk words are assumed to be processed already.
+        """
         print(f"🔍 Processing {len(chunks)} chunks with wire processing NLP...")
         
         if not chunks:
             print("No chunks to process")
             return
         
-        # Process all chunk words
-        self._process_chunk_words(chunks)
+        if doc_freqs is None:
+            # Process all chunk words
+            self._process_chunk_words(chunks)
+            doc_freqs = count_document_frequencies(chunks)
         
         # Build enhanced vocabulary
-        self._build_enhanced_vocabulary(chunks)
+        self._build_enhanced_vocabulary(chunks, doc_freqs)
         
         # Create TF-IDF vectors
         self._create_enhanced_tfidf_vectors(chunks)
@@ -415,6 +579,44 @@ class EnhancedVectorizer:
         print(f"   🏷️  {len(self.topic_labels)} semantic topics")
         print(f"   🔧 {sum(1 for c in chunks if c.procedure_name)} procedures identified")
     
+    def update_transform(self, chunks, doc_freqs, new_chunks, previous_vectorizer, previous_matrix):
+        """Incremental fit_transform after some source files changed.
+        
+        chunks is the whole corpus in order and doc_freqs its updated totals.
+        new_chunks were re-chunked from changed files (words processed); the
+        others come from the saved corpus with their topics and a tfidf_row
+        into previous_matrix. Saved rows and keywords are kept when the stemmed
+        vocabulary and IDF values come out unchanged; otherwise every row is
+        recomputed from the saved stemmed words, which needs no re-stemming.
+        """
+        print(f"🔍 Updating {len(chunks)} chunks ({len(new_chunks)} re-chunked)...")
+        
+        self._build_enhanced_vocabulary(chunks, doc_freqs)
+        
+        reuse_rows = (self.stemmed_vocabulary == previous_vectorizer.get('stemmed_vocabulary') and
+                      self.stem_idf_values == previous_vectorizer.get('stem_idf_values'))
+        if reuse_rows:
+            new_chunk_ids = {id(chunk) for chunk in new_chunks}
+            self.tfidf_matrix = SparseMatrix(len(self.stemmed_vocabulary))
+            for chunk in chunks:
+                if id(chunk) in new_chunk_ids:
+                    row = self._tfidf_row(chunk)
+                else:
+                    row = previous_matrix.row_dict(chunk.tfidf_row) if chunk.tfidf_row >= 0 else {}
+                chunk.tfidf_row = self.tfidf_matrix.append_row(row)
+            print(f"  ♻️  Vocabulary and IDF unchanged: kept {len(chunks) - len(new_chunks)} TF-IDF rows")
+        else:
+            self._create_enhanced_tfidf_vectors(chunks)
+        
+        # Topic scores depend only on a chunk's own words and the domain seeds
+        self._create_semantic_topics(chunks, new_chunks)
+        
+        self._extract_enhanced_keywords(new_chunks if reuse_rows else chunks)
+        
+        print(f"✅ Incremental processing complete:")
+        print(f"   📝 {len(self.vocabulary)} vocabulary terms")
+        print(f"   🌿 {len(self.stemmed_vocabulary)} stemmed terms")
+    
     def _process_chunk_words(self, chunks):
         """Process words for all chunks."""
         for chunk in chunks:
@@ -423,21 +625,16 @@ class EnhancedVectorizer:
             chunk.words = filtered_words
             chunk.stemmed_words = stemmed_words
     
-    def _build_enhanced_vocabulary(self, chunks):
+    def _build_enhanced_vocabulary(self, chunks, doc_freqs=None):
         """Build vocabulary with stemming and filtering."""
-        # Count word and stemmed word frequencies
-        word_doc_freq = defaultdict(int)
-        stemmed_doc_freq = defaultdict(int)
+        # Word and stemmed word document frequencies
+        if doc_freqs is None:
+            doc_freqs = count_document_frequencies(chunks)
+        word_doc_freq, stemmed_doc_freq = doc_freqs
         
-        for chunk in chunks:
-            unique_words = set(chunk.words)
-            unique_stemmed = set(chunk.stemmed_words)
-            
-            for word in unique_words:
-                word_doc_freq[word] += 1
-            
-            for stemmed in unique_stemmed:
-                stemmed_doc_freq[stemmed] += 1
+        # Kept for saving, so later incremental updates can adjust them
+        self.word_doc_freq = word_doc_freq
+        self.stemmed_doc_freq = stemmed_doc_freq
         
         self.document_count = len(chunks)
         
@@ -457,9 +654,10 @@ class EnhancedVectorizer:
             if min_df <= freq <= max_df and len(word) >= 3
         ]
         
-        # Sort by frequency and take top features
-        vocab_candidates.sort(key=lambda x: x[1], reverse=True)
-        stemmed_candidates.sort(key=lambda x: x[1], reverse=True)
+        # Sort by frequency and take top features; ties go alphabetically, so the
+        # result does not depend on the order documents were counted in (see update_transform)
+        vocab_candidates.sort(key=lambda x: (-x[1], x[0]))
+        stemmed_candidates.sort(key=lambda x: (-x[1], x[0]))
         
         if len(vocab_candidates) > self.max_features:
             vocab_candidates = vocab_candidates[:self.max_features]
@@ -475,49 +673,59 @@ class EnhancedVectorizer:
         for word, doc_freq in vocab_candidates:
             self.idf_values[word] = math.log(self.document_count / doc_freq)
         
+        self.stem_idf_values = {
+            stemmed: math.log(self.document_count / doc_freq)
+            for stemmed, doc_freq in stemmed_candidates
+        }
+        
+        # Stems of the high-value wire terms, so every inflection gets the boost
+        self.high_value_stems = {
+            self.text_processor.stem(term.lower()) for term in getattr(self, 'high_value_terms', ())
+        }
+        
         print(f"  📚 Vocabulary: {len(self.vocabulary)} words, {len(self.stemmed_vocabulary)} stems")
     
     def _create_enhanced_tfidf_vectors(self, chunks):
         """Create TF-IDF vectors using processed words with wire processing boost."""
+        self.tfidf_matrix = SparseMatrix(len(self.stemmed_vocabulary))
         for chunk in chunks:
-            # Create vector using stemmed words for better matching
-            vector = [0.0] * len(self.stemmed_vocabulary)
-            stemmed_counts = Counter(chunk.stemmed_words)
-            total_words = len(chunk.stemmed_words)
-            
-            if total_words > 0:
-                for stemmed_word, count in stemmed_counts.items():
-                    if stemmed_word in self.stemmed_vocabulary:
-                        tf = count / total_words
-                        
-                        # Find original word for IDF calculation
-                        original_words = [w for w in chunk.words if self.text_processor.stemmer and self.text_processor.stemmer.stem(w) == stemmed_word]
-                        if original_words:
-                            original_word = original_words[0]
-                            idf = self.idf_values.get(original_word, 1.0)
-                            
-                            # Apply wire processing domain boost
-                            wire_boost = 1.0
-                            if hasattr(self, 'high_value_terms') and original_word.lower() in self.high_value_terms:
-                                wire_boost = 1.5  # 50% boost for high-value wire terms
-                            
-                        else:
-                            idf = 1.0
-                            wire_boost = 1.0
-                        
-                        tfidf = tf * idf * wire_boost
-                        vector[self.stemmed_vocabulary[stemmed_word]] = tfidf
-            
-            chunk.tfidf_vector = vector
+            chunk.tfidf_row = self.tfidf_matrix.append_row(self._tfidf_row(chunk))
+    
+    def _tfidf_row(self, chunk):
+        """One chunk's {stem column: TF-IDF weight} row."""
+        # Create vector using stemmed words for better matching
+        vector = {}
+        stemmed_counts = Counter(chunk.stemmed_words)
+        total_words = len(chunk.stemmed_words)
+        
+        if total_words > 0:
+            for stemmed_word, count in stemmed_counts.items():
+                if stemmed_word in self.stemmed_vocabulary:
+                    tf = count / total_words
+                    idf = self.stem_idf_values.get(stemmed_word, 1.0)
+                    
+                    # Apply wire processing domain boost
+                    wire_boost = 1.0
+                    if stemmed_word in self.high_value_stems:
+                        wire_boost = 1.5  # 50% boost for high-value wire terms
+                    
+                    tfidf = tf * idf * wire_boost
+                    vector[self.stemmed_vocabulary[stemmed_word]] = tfidf
+        
+        return vector
     
-    def _create_semantic_topics(self, chunks):
-        """Create semantic topics using wire processing domain knowledge and word co-occurrence."""
+    def _create_semantic_topics(self, chunks, new_chunks=None):
+        """Create semantic topics using wire processing domain knowledge and word co-occurrence.
+        
+        With new_chunks only those are scored; topic label counts still cover all chunks.
+        """
         print("  🎯 Creating wire processing semantic topics...")
+        scored_chunks = chunks if new_chunks is None else new_chunks
         
         # Initialize topic assignment with enhanced wire processing logic
         chunk_topic_scores = []
         
-        for chunk in chunks:
+        for chunk in scored_chunks:
             chunk_words_set = set(chunk.words + chunk.stemmed_words)
             
             # Calculate scores for each wire processing domain
@@ -572,7 +780,7 @@ class EnhancedVectorizer:
         self.topic_labels = list(self.domain_seeds.keys())
         self.topic_keywords = list(self.domain_seeds.values())
         
-        for chunk, scores in zip(chunks, chunk_topic_scores):
+        for chunk, scores in zip(scored_chunks, chunk_topic_scores):
             # Normalize scores to create probability distribution
             total_score = sum(scores) if sum(scores) > 0 else 1
             chunk.topic_distribution = [score / total_score for score in scores]
@@ -631,12 +839,13 @@ class EnhancedVectorizer:
     
     def _extract_enhanced_keywords(self, chunks):
         """Extract enhanced keywords combining TF-IDF and wire processing domain knowledge."""
+        stemmed_terms = sorted(self.stemmed_vocabulary, key=self.stemmed_vocabulary.get)
         for chunk in chunks:
             # Get TF-IDF keywords
-            word_scores = []
-            for word, idx in self.stemmed_vocabulary.items():
-                if idx < len(chunk.tfidf_vector) and chunk.tfidf_vector[idx] > 0:
-                    word_scores.append((word, chunk.tfidf_vector[idx]))
+            word_scores = [
+                (stemmed_terms[idx], score)
+                for idx, score in self.tfidf_matrix.row_items(chunk.tfidf_row) if score > 0
+            ]
             
             # Sort by TF-IDF score
             word_scores.sort(key=lambda x: x[1], reverse=True)
@@ -663,10 +872,12 @@ class EnhancedVectorizer:
 class EnhancedCorpusIndexer:
     """Enhanced corpus indexer with wire processing functionality grouping."""
     
-    def __init__(self, max_features=3000, n_topics=12):
+    def __init__(self, max_features=3000, n_topics=12, workers=None):
         self.chunker = TALChunker()
         self.vectorizer = EnhancedVectorizer(max_features, n_topics)
+        self.workers = workers or os.cpu_count() or 1
         self.chunks = []
+        self.file_hashes = {}  # source file -> SHA-256, saved for incremental updates
         self.functionality_groups = {}
         self.stats = {
             'total_files': 0,
@@ -681,14 +892,11 @@ class EnhancedCorpusIndexer:
             'variable_declarations_found': 0
         }
     
-    def index_directory(self, directory_path, file_extensions=None):
-        """Index directory with enhanced processing."""
+    def _find_files(self, directory_path, file_extensions=None):
+        """Source files under directory_path with one of the extensions."""
         if file_extensions is None:
             file_extensions = ['.tal', '.TAL', '.c', '.h', '.cpp', '.hpp']
         
-        print(f"📁 Enhanced wire processing indexing from: {directory_path}")
-        
-        # Find files
         matching_files = []
         for root, dirs, files in os.walk(directory_path):
             for file in files:
@@ -697,21 +905,37 @@ class EnhancedCorpusIndexer:
         
         if not matching_files:
             print(f"❌ No files found with extensions: {file_extensions}")
+        return matching_files
+    
+    def _count_file_types(self, matching_files):
+        file_type_counts = defaultdict(int)
+        for file_path in matching_files:
+            file_ext = Path(file_path).suffix.lower()
+            file_type_counts[file_ext] += 1
+        return file_type_counts
+    
+    def index_directory(self, directory_path, file_extensions=None):
+        """Index directory with enhanced processing."""
+        print(f"📁 Enhanced wire processing indexing from: {directory_path}")
+        
+        # Find files
+        matching_files = self._find_files(directory_path, file_extensions)
+        if not matching_files:
             return []
         
         print(f"📄 Found {len(matching_files)} files to process")
         
         # Process files
         all_chunks = []
-        file_type_counts = defaultdict(int)
+        file_doc_freqs = []
+        file_type_counts = self._count_file_types(matching_files)
+        self.file_hashes = {}
         
-        for file_path in matching_files:
-            file_ext = Path(file_path).suffix.lower()
-            file_type_counts[file_ext] += 1
-            
+        for file_path, file_chunks, doc_freqs, digest in self._map_files(matching_files):
             print(f"  Processing: {os.path.basename(file_path)}")
-            file_chunks = self.chunker.chunk_file(file_path)
             all_chunks.extend(file_chunks)
+            file_doc_freqs.append(doc_freqs)
+            self.file_hashes[file_path] = digest
             print(f"    📦 {len(file_chunks)} chunks")
         
         self.chunks = all_chunks
@@ -723,7 +947,7 @@ class EnhancedCorpusIndexer:
         print(f"\n📊 Total chunks: {len(self.chunks)}")
         
         # Enhanced vectorization with wire processing domain knowledge
-        self.vectorizer.fit_transform(self.chunks)
+        self.vectorizer.fit_transform(self.chunks, merge_document_frequencies(file_doc_freqs))
         
         # Create functionality groups
         self._create_functionality_groups()
@@ -733,6 +957,106 @@ class EnhancedCorpusIndexer:
         
         return self.chunks
     
+    def update_directory(self, directory_path, corpus_path, file_extensions=None):
+        """Bring a saved corpus up to date, re-indexing only new and changed files.
+        
+        Files are compared with the SHA-256 hashes saved in the corpus. Chunks
+        of unchanged files are reused as saved. Document frequencies are
+        updated by subtracting the old chunks of changed and deleted files and
+        adding the re-chunked ones. A corpus saved without file hashes gets a
+        full index_directory instead.
+        """
+        print(f"📁 Incremental wire processing update of {corpus_path} from: {directory_path}")
+        
+        corpus_data, records, previous_matrix = load_saved_corpus(corpus_path)
+        saved_hashes = corpus_data.get('file_hashes')
+        saved_doc_freqs = corpus_data.get('document_frequencies')
+        if saved_hashes is None or saved_doc_freqs is None:
+            print("⚠️  Corpus has no file hashes (saved before incremental updates), re-indexing everything")
+            return self.index_directory(directory_path, file_extensions)
+        
+        matching_files = self._find_files(directory_path, file_extensions)
+        if not matching_files:
+            return []
+        
+        # The saved vocabulary size applies to the updated corpus as well
+        self.vectorizer.max_features = corpus_data.get('vectorizer', {}).get('max_features', self.vectorizer.max_features)
+        
+        self.file_hashes = {file_path: file_digest(file_path) for file_path in matching_files}
+        changed_files = [file_path for file_path in matching_files
+                         if file_path not in saved_hashes or saved_hashes[file_path] != self.file_hashes[file_path]]
+        removed_files = set(saved_hashes) - set(self.file_hashes)
+        print(f"📄 {len(matching_files)} files: {len(changed_files)} new or changed, "
+              f"{len(removed_files)} removed, {len(matching_files) - len(changed_files)} unchanged")
+        
+        saved_chunks = defaultdict(list)
+        for record in records:
+            saved_chunks[record['source_file']].append(SimpleChunk.from_saved(record))
+        
+        # Take the old chunks of changed and removed files out of the document frequencies
+        doc_freqs = (defaultdict(int, saved_doc_freqs['words']), defaultdict(int, saved_doc_freqs['stemmed']))
+        for file_path in set(changed_files) | removed_files:
+            subtract_document_frequencies(doc_freqs, count_document_frequencies(saved_chunks.pop(file_path, [])))
+        
+        new_file_chunks = {}
+        for file_path, file_chunks, (word_doc_freq, stemmed_doc_freq), digest in self._map_files(changed_files):
+            print(f"  Processing: {os.path.basename(file_path)}")
+            new_file_chunks[file_path] = file_chunks
+            for word, freq in word_doc_freq.items():
+                doc_freqs[0][word] += freq
+            for stemmed, freq in stemmed_doc_freq.items():
+                doc_freqs[1][stemmed] += freq
+            print(f"    📦 {len(file_chunks)} chunks")
+        
+        # Same file order as a full index
+        self.chunks = [
+            chunk for file_path in matching_files
+            for chunk in (new_file_chunks[file_path] if file_path in new_file_chunks else saved_chunks.get(file_path, []))
+        ]
+        
+        if not self.chunks:
+            print("❌ No chunks created")
+            return []
+        
+        print(f"\n📊 Total chunks: {len(self.chunks)}")
+        
+        new_chunks = [chunk for file_chunks in new_file_chunks.values() for chunk in file_chunks]
+        self.vectorizer.update_transform(self.chunks, doc_freqs, new_chunks,
+                                         corpus_data.get('vectorizer', {}), previous_matrix)
+        
+        # Groups and statistics are cheap to rebuild over all chunks
+        self._create_functionality_groups()
+        self._update_enhanced_statistics(matching_files, self._count_file_types(matching_files))
+        
+        return self.chunks
+    
+    def _map_files(self, matching_files):
+        """Yield (file_path, chunks, doc_freqs, file hash) per file, in file order.
+        
+        Chunking, regex extraction and stemming run in a process pool; only
+        the per-file document frequencies are reduced in this process.
+        """
+        stop_words = self.vectorizer.text_processor.stop_words
+        workers = min(self.workers, len(matching_files))
+        
+        if not matching_files:
+            return
+        
+        if workers <= 1:
+            _init_index_worker(stop_words)
+            for file_path in matching_files:
+                yield _index_file(file_path)
+            return
+        
+        print(f"⚙️  Indexing with {workers} worker processes")
+        # Forked workers share this process's hash seed, so set-derived lists
+        # (function calls, declarations) come out in the same order as a serial run
+        start_methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in start_methods else None)
+        chunksize = max(1, min(32, len(matching_files) // (workers * 4)))
+        with context.Pool(workers, initializer=_init_index_worker, initargs=(stop_words,)) as pool:
+            yield from pool.imap(_index_file, matching_files, chunksize=chunksize)
+    
     def _create_functionality_groups(self):
         """Group chunks by functionality and semantic similarity."""
         print("  🔗 Creating wire processing functionality groups...")
@@ -879,11 +1203,18 @@ class EnhancedCorpusIndexer:
                     print(f"     {clean_line[:65]}{'...' if len(clean_line) > 65 else ''}")
     
     def save_enhanced_corpus(self, output_path):
-        """Save enhanced corpus with all wire processing metadata."""
+        """Save enhanced corpus with all wire processing metadata.
+        
+        A path ending in .corpus is written as a columnar corpus directory
+        (see tal_corpus); any other path as a single pickle.
+        """
         print(f"\n💾 Saving enhanced wire processing corpus...")
         
+        # Words are saved as token ids into one corpus-wide term list
+        term_table = TermTable()
+        
         corpus_data = {
-            'version': '2.0-wire-enhanced',
+            'version': '2.2-wire-enhanced',
             'created_at': __import__('datetime').datetime.now().isoformat(),
             'chunks': [
                 {
@@ -898,8 +1229,8 @@ class EnhancedCorpusIndexer:
                     'char_count': chunk.char_count,
                     
                     # Enhanced NLP data
-                    'words': chunk.words,
-                    'stemmed_words': chunk.stemmed_words,
+                    'word_ids': term_table.encode(chunk.words),
+                    'stemmed_ids': term_table.encode(chunk.stemmed_words),
                     'semantic_category': chunk.semantic_category,
                     
                     # Technical pattern data
@@ -908,7 +1239,7 @@ class EnhancedCorpusIndexer:
                     'control_structures': chunk.control_structures,
                     
                     # Vector and topic data
-                    'tfidf_vector': chunk.tfidf_vector,
+                    'tfidf_row': chunk.tfidf_row,
                     'topic_distribution': chunk.topic_distribution,
                     'dominant_topic': chunk.dominant_topic,
                     'dominant_topic_prob': chunk.dominant_topic_prob,
@@ -916,10 +1247,18 @@ class EnhancedCorpusIndexer:
                 }
                 for chunk in self.chunks
             ],
+            'tfidf_matrix': self.vectorizer.tfidf_matrix.to_dict(),
+            'terms': term_table.terms,  # filled while encoding the chunks above
+            'file_hashes': self.file_hashes,
+            'document_frequencies': {
+                'words': dict(self.vectorizer.word_doc_freq),
+                'stemmed': dict(self.vectorizer.stemmed_doc_freq)
+            },
             'vectorizer': {
                 'vocabulary': self.vectorizer.vocabulary,
                 'stemmed_vocabulary': self.vectorizer.stemmed_vocabulary,
                 'idf_values': self.vectorizer.idf_values,
+                'stem_idf_values': self.vectorizer.stem_idf_values,
                 'topic_labels': self.vectorizer.topic_labels,
                 'topic_keywords': self.vectorizer.topic_keywords,
                 'domain_seeds': self.vectorizer.domain_seeds,
@@ -933,12 +1272,32 @@ class EnhancedCorpusIndexer:
             'wire_processing_optimized': True
         }
         
+        # Ids of small vocabularies fit in two bytes each
+        for chunk_data in corpus_data['chunks']:
+            chunk_data['word_ids'] = term_table.narrow(chunk_data['word_ids'])
+            chunk_data['stemmed_ids'] = term_table.narrow(chunk_data['stemmed_ids'])
+        
         # Save main corpus file
-        with open(output_path, 'wb') as f:
-            pickle.dump(corpus_data, f)
+        chunk_numbers = {id(chunk): i for i, chunk in enumerate(self.chunks)}
+        if output_path.endswith('.corpus'):
+            # Groups refer to chunks by position in the directory format
+            corpus_data['functionality_groups'] = {
+                group_type: {name: [chunk_numbers[id(chunk)] for chunk in chunks] for name, chunks in groups.items()}
+                for group_type, groups in self.functionality_groups.items()
+            }
+            write_corpus_dir(output_path, corpus_data)
+        else:
+            # Groups hold the saved chunk records, so each chunk is pickled once
+            saved_chunks = corpus_data['chunks']
+            corpus_data['functionality_groups'] = {
+                group_type: {name: [saved_chunks[chunk_numbers[id(chunk)]] for chunk in chunks] for name, chunks in groups.items()}
+                for group_type, groups in self.functionality_groups.items()
+            }
+            with open(output_path, 'wb') as f:
+                pickle.dump(corpus_data, f)
         
         # Save enhanced human-readable summary
-        summary_path = output_path.replace('.pkl', '_wire_enhanced_summary.json')
+        summary_path = os.path.splitext(output_path)[0] + '_wire_enhanced_summary.json'
         summary = {
             'version': corpus_data['version'],
             'created_at': corpus_data['created_at'],
@@ -1018,9 +1377,10 @@ def main():
     try:
         max_features = int(input("🔧 Max vocabulary features (default 3000): ") or "3000")
         n_topics = int(input("🏷️  Number of semantic topics (default 12): ") or "12")
+        workers = int(input(f"⚙️  Worker processes (default {os.cpu_count() or 1}): ") or "0")
     except ValueError:
         print("Invalid input, using defaults")
-        max_features, n_topics = 3000, 12
+        max_features, n_topics, workers = 3000, 12, 0
     
     print(f"\n🚀 Starting enhanced wire processing indexing...")
     print(f"   📝 Max features: {max_features}")
@@ -1029,10 +1389,20 @@ def main():
     print(f"   🏦 Wire processing domains: 12 specialized categories")
     
     # Create enhanced indexer and process
-    indexer = EnhancedCorpusIndexer(max_features, n_topics)
+    indexer = EnhancedCorpusIndexer(max_features, n_topics, workers=workers or None)
+    dir_name = os.path.basename(os.path.abspath(directory))
+    output_file = f"wire_enhanced_tal_corpus_{dir_name}.corpus"
     
     try:
-        chunks = indexer.index_directory(directory, file_extensions)
+        update = False
+        if os.path.exists(output_file):
+            update_choice = input(f"🔄 Update existing {output_file} incrementally? (y/n): ").strip().lower()
+            update = update_choice in ['y', 'yes', '']
+        
+        if update:
+            chunks = indexer.update_directory(directory, output_file, file_extensions)
+        else:
+            chunks = indexer.index_directory(directory, file_extensions)
         
         if not chunks:
             print("❌ No chunks created - check directory and file extensions")
@@ -1044,9 +1414,6 @@ def main():
         indexer.print_enhanced_sample_chunks()
         
         # Save enhanced corpus
-        dir_name = os.path.basename(os.path.abspath(directory))
-        output_file = f"wire_enhanced_tal_corpus_{dir_name}.pkl"
-        
         save_choice = input(f"\n💾 Save enhanced wire processing corpus to {output_file}? (y/n): ").strip().lower()
         if save_choice in ['y', 'yes', '']:
             indexer.save_enhanced_corpus(output_file)
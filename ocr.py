@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+OCR Fallback for Image-Only PDF Pages
+
+Pages that yield no text layer are rendered and run through local Tesseract in
+a separate process pool, one task per page. Results are cached on disk keyed by
+the hash of the page's own single-page PDF, so re-uploading or reindexing a
+scanned document never OCRs the same page twice. A per-document time budget
+and page cap bound the work per document; each call gets its own process pool,
+whose workers are terminated when the budget runs out.
+
+Optional dependencies: pytesseract (plus the tesseract binary) and pdf2image
+(plus poppler). Without them OCR_AVAILABLE is False and callers skip OCR.
+"""
+
+import io
+import os
+import time
+import logging
+import hashlib
+import tempfile
+import multiprocessing
+
+import PyPDF2
+
+try:
+    import pytesseract
+    from pdf2image import convert_from_bytes
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+logger = logging.getLogger("OCR")
+
+def page_pdf_bytes(reader, page_index):
+    """One page of an open PdfReader as a standalone PDF."""
+    writer = PyPDF2.PdfWriter()
+    writer.add_page(reader.pages[page_index])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+def _ocr_page(page_bytes, dpi, lang):
+    """Worker process: render a single-page PDF and OCR it."""
+    images = convert_from_bytes(page_bytes, dpi=dpi)
+    return "\n".join(pytesseract.image_to_string(image, lang=lang) for image in images).strip()
+
+class OcrEngine:
+    """Page-level OCR with per-call process pools, an on-disk page cache and a time budget."""
+
+    def __init__(self, cache_dir, workers=2, dpi=300, lang="eng"):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.dpi = dpi
+        self.lang = lang
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _cache_path(self, page_hash):
+        return os.path.join(self.cache_dir, f"{page_hash}.txt")
+
+    def _write_cache(self, page_hash, text):
+        # Unique temp name: several processes may OCR the same page at once
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self._cache_path(page_hash))
+        except OSError as e:
+            logger.warning(f"⚠️  Could not cache OCR text {page_hash}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def ocr_pages(self, pages, budget_seconds=120):
+        """OCR {page_index: single-page PDF bytes}.
+
+        Returns (texts, failed, skipped): {page_index: text} for cached and
+        finished pages, the pages whose OCR raised (logged) and the pages cut
+        off by the budget. When the budget runs out the pool's worker
+        processes are terminated, so no OCR outlives the call.
+        """
+        results = {}
+        pending = {}
+        for page_index, page_bytes in pages.items():
+            page_hash = hashlib.sha256(page_bytes).hexdigest()
+            cache_path = self._cache_path(page_hash)
+            if os.path.exists(cache_path):
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    results[page_index] = f.read()
+            else:
+                pending[page_index] = (page_hash, page_bytes)
+
+        if not pending:
+            return results, [], []
+
+        # Spawned workers stay clear of the server's threads and loaded models
+        pool = multiprocessing.get_context("spawn").Pool(processes=min(self.workers, len(pending)))
+        skipped = []
+        finished = False
+        try:
+            tasks = {page_index: (page_hash, pool.apply_async(_ocr_page, (page_bytes, self.dpi, self.lang)))
+                     for page_index, (page_hash, page_bytes) in pending.items()}
+            deadline = time.time() + budget_seconds
+            for page_index, (page_hash, task) in tasks.items():
+                task.wait(max(0.0, deadline - time.time()))
+
+            failed = []
+            for page_index, (page_hash, task) in tasks.items():
+                if not task.ready():
+                    skipped.append(page_index)
+                    continue
+                try:
+                    text = task.get()
+                except Exception as e:
+                    logger.error(f"❌ OCR failed for page {page_index + 1}: {e}")
+                    failed.append(page_index)
+                    continue
+                results[page_index] = text
+                self._write_cache(page_hash, text)
+            finished = True
+        finally:
+            if skipped or not finished:
+                # Pages still running past the budget (or after an error) are stopped by killing the workers
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+
+        return results, sorted(failed), sorted(skipped)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Staged Producer/Consumer Pipeline
+
+Runs items through a chain of stages connected by bounded queues. Each stage
+has its own worker threads, so a CPU-bound stage (embedding) and network-bound
+stages (LLM enrichment) run at the same time and total time approaches that of
+the slowest stage. Bounded queues keep a fast stage from racing ahead and
+holding every intermediate result in memory.
+"""
+
+import queue
+import threading
+
+_DONE = object()
+
+class Stage:
+    """One pipeline stage.
+
+    fn receives one item (or a list of up to batch_size items when batch_size
+    is set) and returns an iterable of outputs for the next stage; returning
+    several outputs fans out, returning none filters. on_done runs once after
+    the stage has processed its last item.
+    """
+
+    def __init__(self, name, fn, workers=1, batch_size=None, batch_wait=0.2, on_done=None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.on_done = on_done
+
+def run_pipeline(source, stages, queue_size=64):
+    """Feed source through stages; returns the outputs of the last stage.
+
+    Output order follows completion, not input order. The first exception
+    raised by any stage stops the pipeline and is re-raised here.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    results = []
+    results_lock = threading.Lock()
+    errors = []
+    abort = threading.Event()
+
+    def emit(index, outputs):
+        if index + 1 < len(stages):
+            for output in outputs:
+                queues[index + 1].put(output)
+        else:
+            with results_lock:
+                results.extend(outputs)
+
+    def next_batch(stage, in_queue):
+        """Up to batch_size items (a lone item when unbatched); the list ends with _DONE at end of input."""
+        first = in_queue.get()
+        if stage.batch_size is None or first is _DONE:
+            return [first]
+        batch = [first]
+        while len(batch) < stage.batch_size:
+            try:
+                item = in_queue.get(timeout=stage.batch_wait)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _DONE:
+                break
+        return batch
+
+    def run_worker(index, stage, remaining):
+        in_queue = queues[index]
+        while True:
+            batch = next_batch(stage, in_queue)
+            done = batch[-1] is _DONE
+            items = batch[:-1] if done else batch
+            if items and not abort.is_set():
+                try:
+                    if stage.batch_size is None:
+                        emit(index, list(stage.fn(items[0])))
+                    else:
+                        emit(index, list(stage.fn(items)))
+                except Exception as e:
+                    errors.append((stage.name, e))
+                    abort.set()
+            if done:
+                break
+
+        with remaining["lock"]:
+            remaining["count"] -= 1
+            last = remaining["count"] == 0
+        if not last:
+            # Let the sibling workers see the end of input too
+            in_queue.put(_DONE)
+            return
+        if stage.on_done and not abort.is_set():
+            try:
+                stage.on_done()
+            except Exception as e:
+                errors.append((stage.name, e))
+                abort.set()
+        if index + 1 < len(stages):
+            queues[index + 1].put(_DONE)
+
+    threads = []
+    for index, stage in enumerate(stages):
+        remaining = {"count": stage.workers, "lock": threading.Lock()}
+        for worker in range(stage.workers):
+            thread = threading.Thread(target=run_worker, args=(index, stage, remaining),
+                                      name=f"{stage.name}-{worker}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    try:
+        for item in source:
+            if abort.is_set():
+                break
+            queues[0].put(item)
+    except Exception as e:
+        errors.append(("source", e))
+        abort.set()
+    queues[0].put(_DONE)
+
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        stage_name, error = errors[0]
+        raise RuntimeError(f"Pipeline stage '{stage_name}' failed: {error}") from error
+    return results
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Retrieval helpers for the document search API
+
+Semantic search over the chunk embedding matrix, Java Lucene search requests
+and mapping of Lucene hits back to indexed chunks. Kept free of Flask and model
+state so the same code serves /query, /query/batch and offline tools.
+"""
+
+import os
+import json
+import tempfile
+import subprocess
+
+import numpy as np
+
+LUCENE_JARS = [
+    "lucene-core-9.12.2.jar",
+    "lucene-analyzers-common-9.12.2.jar",
+    "lucene-queryparser-9.12.2.jar",
+    "gson-2.10.1.jar",
+    "pdfbox-3.0.5.jar",
+    "pdfbox-io-3.0.5.jar",
+    "fontbox-3.0.5.jar",
+    "poi-4.1.2.jar",
+    "poi-ooxml-4.1.2.jar",
+    "poi-scratchpad-4.1.2.jar",
+    "poi-ooxml-schemas-4.1.2.jar",
+    "xmlbeans-3.1.0.jar",
+    "compress.1.9.2.jar",
+    "commons-collections4-4.4.jar"
+]
+
+def build_lucene_classpath(libs_dir):
+    """Build the Java classpath for the Lucene indexer/searcher."""
+    return ":".join(["."] + [f"{libs_dir}/{jar}" for jar in LUCENE_JARS])
+
+def build_embedding_matrix(indexed_docs):
+    """Stack chunk embeddings into a row-normalized float32 matrix."""
+    matrix = np.asarray([doc["embedding"] for doc in indexed_docs], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def semantic_search(embedding_matrix, query_embeddings, top_k):
+    """Cosine top-k for one or many queries with a single matrix-matrix product.
+
+    Returns (indices, scores): one array of chunk indices (best first) and one
+    array of similarities per query.
+    """
+    queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+    query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    query_norms[query_norms == 0] = 1.0
+    similarities = (queries / query_norms) @ embedding_matrix.T
+
+    k = min(top_k, similarities.shape[1])
+    if k <= 0:
+        empty = [np.array([], dtype=np.int64) for _ in range(len(queries))]
+        return empty, [np.array([], dtype=np.float32) for _ in range(len(queries))]
+
+    # argpartition keeps this linear in the number of chunks; only the top k are sorted
+    candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    indices, scores = [], []
+    for row, row_candidates in enumerate(candidates):
+        order = np.argsort(-similarities[row, row_candidates])
+        best = row_candidates[order]
+        indices.append(best)
+        scores.append(similarities[row, best])
+    return indices, scores
+
+def build_chunk_position_map(indexed_docs):
+    """Map (doc_name, chunk_id) to the chunk's position in indexed_docs."""
+    return {(doc["doc_name"], doc["chunk_id"]): i for i, doc in enumerate(indexed_docs)}
+
+def lucene_hits_to_indices(hits, position_map):
+    """Translate Lucene hits into indexed_docs positions, dropping hits with no embedding."""
+    indices = []
+    for hit in hits:
+        position = position_map.get((hit["doc_name"], int(hit["chunk_id"])))
+        if position is not None:
+            indices.append(position)
+    return indices
+
+def reciprocal_rank_fusion(rankings, top_k, k=60):
+    """Fuse ranked index lists by summing 1 / (k + rank) across rankings."""
+    scores = {}
+    for ranking in rankings:
+        for rank, index in enumerate(ranking, 1):
+            scores[int(index)] = scores.get(int(index), 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda index: (-scores[index], index))[:top_k]
+
+def combine_results(semantic_indices, lucene_indices, top_k, method="union"):
+    """Combine semantic and Lucene results.
+
+    "union" is the original set union of both top-k lists; "rrf" ranks the
+    union by reciprocal rank fusion.
+    """
+    if method == "rrf":
+        return reciprocal_rank_fusion([semantic_indices, lucene_indices], top_k)
+    return list(set(int(i) for i in semantic_indices) | set(lucene_indices))[:top_k]
+
+# Without "search-batch" support each query costs one JVM start, so larger batches are refused
+LUCENE_FALLBACK_MAX_QUERIES = 16
+
+class LuceneBatchUnsupported(Exception):
+    """The Java searcher has no batch search and the batch is too large to run query by query."""
+
+# java_class -> whether it answered a "search-batch" request, learned on first use
+_batch_search_support = {}
+
+def _run_lucene_request(request, classpath, java_class, results_file=None):
+    """Run the JVM on one request and return its parsed results.
+
+    The request goes through a private temp file. With results_file=None the
+    results do too: the path is passed to the searcher as "results_file",
+    which only searchers that support the field honor. Otherwise the searcher
+    writes its fixed results_file, and the caller must serialize searches.
+    """
+    input_fd, input_file = tempfile.mkstemp(prefix="lucene_search_input_", suffix=".json")
+    private_results = results_file is None
+    if private_results:
+        results_fd, results_file = tempfile.mkstemp(prefix="lucene_search_results_", suffix=".json")
+        os.close(results_fd)
+        request = dict(request, results_file=results_file)
+    elif os.path.exists(results_file):
+        os.remove(results_file)  # never read the previous search's results
+    try:
+        with os.fdopen(input_fd, "w") as f:
+            json.dump(request, f)
+
+        subprocess.run(
+            ["java", "-cp", classpath, java_class, input_file],
+            check=True,
+            capture_output=True
+        )
+
+        with open(results_file, "r") as f:
+            return json.load(f)
+    finally:
+        os.remove(input_file)
+        if private_results:
+            os.remove(results_file)
+
+def run_lucene_search(queries, index_dir, top_k, classpath, java_class, results_file=None):
+    """Run one JVM for all queries and return a list of hit lists, one per query.
+
+    A single query uses the "search" action. Several queries are sent as one
+    "search-batch" request; the results are expected to be
+    {"results": [{"hits": [...]}, ...]} in query order. The first batch
+    request doubles as the capability check: if the searcher fails on it or
+    answers without a "results" list, batching is switched off for that
+    class and queries are searched one JVM each, for at most
+    LUCENE_FALLBACK_MAX_QUERIES queries (LuceneBatchUnsupported beyond that).
+    results_file is the searcher's fixed results path, if it has one (see
+    _run_lucene_request).
+    """
+    if len(queries) == 1:
+        request = {"action": "search", "query": queries[0], "index_dir": index_dir, "top_k": top_k}
+        return [_run_lucene_request(request, classpath, java_class, results_file).get("hits", [])]
+
+    if _batch_search_support.get(java_class, True):
+        request = {"action": "search-batch", "queries": list(queries), "index_dir": index_dir, "top_k": top_k}
+        try:
+            lucene_results = _run_lucene_request(request, classpath, java_class, results_file)
+        except (subprocess.CalledProcessError, ValueError):
+            lucene_results = {}
+        results = lucene_results.get("results")
+        if isinstance(results, list) and len(results) == len(queries):
+            _batch_search_support[java_class] = True
+            return [result.get("hits", []) for result in results]
+        _batch_search_support[java_class] = False
+
+    if len(queries) > LUCENE_FALLBACK_MAX_QUERIES:
+        raise LuceneBatchUnsupported(
+            f"{java_class} does not support batch search; at most {LUCENE_FALLBACK_MAX_QUERIES} "
+            f"queries can be searched one by one, got {len(queries)}")
+
+    return [
+        run_lucene_search([query], index_dir, top_k, classpath, java_class, results_file)[0]
+        for query in queries
+    ]
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Offline Retrieval Benchmark for the Document Search API
+
+Measures retrieval quality and speed without calling Claude. Runs semantic,
+lexical and fused retrieval over a labeled query set and reports recall@k,
+MRR and latency percentiles per method.
+
+By default everything is generated in-process (synthetic documents, labeled
+queries, a hashing embedder and a BM25 stand-in for Lucene) so it runs offline.
+Real data can be benchmarked with --index/--queries, --embedder sentence-transformers
+and --lexical lucene.
+
+Labeled query file (JSON lines):
+    {"query": "...", "relevant": [["doc_name", chunk_id], ...]}
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from retrieval import (build_embedding_matrix, semantic_search, build_chunk_position_map,
+                       lucene_hits_to_indices, combine_results, run_lucene_search,
+                       build_lucene_classpath)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# ===== SYNTHETIC DATA =====
+
+def generate_synthetic_corpus(num_docs=200, chunks_per_doc=8, words_per_chunk=120,
+                              num_topics=25, num_queries=300, seed=13):
+    """Generate chunked documents and labeled queries with known relevant chunks.
+
+    Each chunk mixes words from one topic with shared filler words and carries a
+    few anchor terms of its own; queries are built from a chunk's anchors and
+    topic words, so that chunk is the relevant answer.
+    """
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ru", "te", "sa", "vo", "ni", "pe", "da", "zu", "xo", "bi", "fe", "qu"]
+
+    def make_word():
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+    filler = [make_word() for _ in range(300)]
+    topics = [[make_word() for _ in range(40)] for _ in range(num_topics)]
+
+    indexed_docs = []
+    chunk_anchors = []
+    for d in range(num_docs):
+        doc_name = f"synthetic_{d:04d}.txt"
+        doc_topic = rng.randrange(num_topics)
+        for c in range(chunks_per_doc):
+            topic = doc_topic if rng.random() < 0.7 else rng.randrange(num_topics)
+            anchors = [make_word() + str(rng.randint(10, 99)) for _ in range(3)]
+            words = []
+            for _ in range(words_per_chunk):
+                roll = rng.random()
+                if roll < 0.45:
+                    words.append(rng.choice(topics[topic]))
+                elif roll < 0.97:
+                    words.append(rng.choice(filler))
+                else:
+                    words.append(rng.choice(anchors))
+            words.extend(anchors)
+            rng.shuffle(words)
+            indexed_docs.append({
+                "doc_name": doc_name,
+                "chunk_id": c,
+                "chunk": " ".join(words),
+                "summary": "",
+                "keywords": anchors,
+                "qa_pairs": []
+            })
+            chunk_anchors.append((topic, anchors))
+
+    queries = []
+    for _ in range(num_queries):
+        target = rng.randrange(len(indexed_docs))
+        topic, anchors = chunk_anchors[target]
+        terms = rng.sample(anchors, 2) + rng.sample(topics[topic], 2) + [rng.choice(filler)]
+        rng.shuffle(terms)
+        queries.append({
+            "query": " ".join(terms),
+            "relevant": [[indexed_docs[target]["doc_name"], indexed_docs[target]["chunk_id"]]]
+        })
+
+    return indexed_docs, queries
+
+def load_labeled_queries(path):
+    """Load a JSON lines labeled query set."""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                queries.append(json.loads(line))
+    return queries
+
+# ===== EMBEDDERS =====
+
+class HashingEmbedder:
+    """Offline embedder: feature-hashed term counts with sublinear weighting."""
+
+    def __init__(self, dimensions=384):
+        self.dimensions = dimensions
+
+    def _bucket(self, token):
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+        sign = 1.0 if digest[4] & 1 else -1.0
+        return bucket, sign
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token, count in Counter(TOKEN_PATTERN.findall(text.lower())).items():
+                bucket, sign = self._bucket(token)
+                vectors[row, bucket] += sign * (1.0 + math.log(count))
+        return vectors
+
+def load_embedder(name):
+    """Create the requested embedder."""
+    if name == "hashing":
+        return HashingEmbedder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer("all-MiniLM-L6-v2")
+
+# ===== LEXICAL SEARCH =====
+
+class BM25Index:
+    """In-process BM25 over chunk text, used as an offline stand-in for Lucene."""
+
+    def __init__(self, texts, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(chunk index, tf)]
+        self.lengths = []
+        for i, text in enumerate(texts):
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            self.lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings[term].append((i, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        n = len(self.lengths)
+        self.idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def search(self, query, top_k):
+        scores = defaultdict(float)
+        for term in set(TOKEN_PATTERN.findall(query.lower())):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores, key=lambda i: (-scores[i], i))[:top_k]
+
+# ===== METRICS =====
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+def score_rankings(rankings, relevant_sets, k):
+    """Return (recall@k, MRR) for per-query rankings against relevant index sets."""
+    recall_total = 0.0
+    reciprocal_total = 0.0
+    for ranking, relevant in zip(rankings, relevant_sets):
+        if not relevant:
+            continue
+        top = list(ranking)[:k]
+        recall_total += len(relevant.intersection(top)) / len(relevant)
+        for rank, index in enumerate(ranking, 1):
+            if index in relevant:
+                reciprocal_total += 1.0 / rank
+                break
+    evaluated = sum(1 for relevant in relevant_sets if relevant)
+    if evaluated == 0:
+        return 0.0, 0.0
+    return recall_total / evaluated, reciprocal_total / evaluated
+
+# ===== BENCHMARK =====
+
+def run_benchmark(indexed_docs, queries, embedder, lexical="bm25", top_k=5, lucene_config=None,
+                  stored_embeddings=False):
+    """Run each retrieval method over the labeled queries and collect metrics.
+
+    Chunks are embedded with the same embedder as the queries. With
+    stored_embeddings the chunks' own "embedding" fields are used instead;
+    only valid when embedder is the model that produced them.
+    """
+    position_map = build_chunk_position_map(indexed_docs)
+    relevant_sets = [
+        {position_map[(doc_name, int(chunk_id))] for doc_name, chunk_id in q["relevant"]
+         if (doc_name, int(chunk_id)) in position_map}
+        for q in queries
+    ]
+    query_texts = [q["query"] for q in queries]
+
+    if stored_embeddings and all("embedding" in doc for doc in indexed_docs):
+        print(f"🧮 Using the stored embeddings of {len(indexed_docs)} chunks")
+        embedding_matrix = build_embedding_matrix(indexed_docs)
+    else:
+        print(f"🧮 Embedding {len(indexed_docs)} chunks...")
+        chunk_vectors = embedder.encode([doc["chunk"] for doc in indexed_docs], batch_size=32)
+        embedding_matrix = build_embedding_matrix([{"embedding": v} for v in chunk_vectors])
+
+    bm25 = BM25Index([doc["chunk"] for doc in indexed_docs]) if lexical == "bm25" else None
+
+    rankings = defaultdict(list)
+    latencies = defaultdict(list)
+
+    print(f"🔍 Running {len(queries)} queries (top_k={top_k}, lexical={lexical})...")
+    for query in query_texts:
+        start = time.perf_counter()
+        query_vector = embedder.encode([query], batch_size=1)
+        semantic_indices, _ = semantic_search(embedding_matrix, query_vector, top_k)
+        semantic_ranking = [int(i) for i in semantic_indices[0]]
+        semantic_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if bm25 is not None:
+            lexical_ranking = bm25.search(query, top_k)
+        else:
+            hits = run_lucene_search([query], top_k=top_k, **lucene_config)[0]
+            lexical_ranking = lucene_hits_to_indices(hits, position_map)
+        lexical_time = time.perf_counter() - start
+
+        rankings["semantic"].append(semantic_ranking)
+        latencies["semantic"].append(semantic_time)
+        rankings[lexical].append(lexical_ranking)
+        latencies[lexical].append(lexical_time)
+
+        for method in ("union", "rrf"):
+            start = time.perf_counter()
+            fused = combine_results(semantic_ranking, lexical_ranking, top_k, method)
+            fusion_time = time.perf_counter() - start
+            rankings[f"fused_{method}"].append(fused)
+            latencies[f"fused_{method}"].append(semantic_time + lexical_time + fusion_time)
+
+    report = {}
+    for method, method_rankings in rankings.items():
+        recall, mrr = score_rankings(method_rankings, relevant_sets, top_k)
+        times_ms = [t * 1000 for t in latencies[method]]
+        report[method] = {
+            f"recall@{top_k}": recall,
+            "mrr": mrr,
+            "latency_ms_p50": percentile(times_ms, 50),
+            "latency_ms_p95": percentile(times_ms, 95),
+            "latency_ms_p99": percentile(times_ms, 99)
+        }
+    return report
+
+def print_report(report, top_k):
+    """Print the benchmark report as a table."""
+    print(f"\n{'='*78}")
+    print("📊 RETRIEVAL BENCHMARK")
+    print("="*78)
+    print(f"{'method':<14}{'recall@' + str(top_k):>10}{'MRR':>10}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for method, metrics in report.items():
+        print(f"{method:<14}{metrics[f'recall@{top_k}']:>10.3f}{metrics['mrr']:>10.3f}"
+              f"{metrics['latency_ms_p50']:>12.2f}{metrics['latency_ms_p95']:>12.2f}{metrics['latency_ms_p99']:>12.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark (no answer generation)")
+    parser.add_argument("--index", help="indexed_docs.json to benchmark (default: synthetic corpus)")
+    parser.add_argument("--queries", help="Labeled queries, JSON lines (required with --index)")
+    parser.add_argument("--embedder", choices=["hashing", "sentence-transformers"], default="hashing")
+    parser.add_argument("--lexical", choices=["bm25", "lucene"], default="bm25",
+                        help="bm25 runs in-process; lucene calls the Java searcher on --lucene-index")
+    parser.add_argument("--lucene-index", default="./lucene_index")
+    parser.add_argument("--libs", default="./libs")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--docs", type=int, default=200, help="Synthetic documents")
+    parser.add_argument("--num-queries", type=int, default=300, help="Synthetic queries")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if args.index:
+        if not args.queries:
+            parser.error("--queries is required with --index")
+        with open(args.index, "r") as f:
+            indexed_docs = json.load(f)
+        queries = load_labeled_queries(args.queries)
+        print(f"📚 Loaded {len(indexed_docs)} chunks and {len(queries)} labeled queries")
+    else:
+        indexed_docs, queries = generate_synthetic_corpus(
+            num_docs=args.docs, num_queries=args.num_queries, seed=args.seed
+        )
+        print(f"🧪 Generated {len(indexed_docs)} synthetic chunks and {len(queries)} labeled queries")
+
+    lucene_config = None
+    if args.lexical == "lucene":
+        lucene_config = {
+            "index_dir": args.lucene_index,
+            "classpath": build_lucene_classpath(args.libs),
+            "java_class": "LuceneIndexerSearcher",
+            "results_file": "lucene_results.json"  # the searcher's fixed output; the benchmark runs one search at a time
+        }
+
+    embedder = load_embedder(args.embedder)
+    # Stored index embeddings come from the sentence-transformers model; any other
+    # embedder re-embeds the chunks so queries and chunks share one vector space
+    stored_embeddings = bool(args.index) and args.embedder == "sentence-transformers"
+    if args.index and not stored_embeddings:
+        print(f"⚠️  Re-embedding indexed chunks with the {args.embedder} embedder (stored embeddings ignored)")
+    report = run_benchmark(indexed_docs, queries, embedder, args.lexical, args.top_k, lucene_config,
+                           stored_embeddings=stored_embeddings)
+    print_report(report, args.top_k)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"top_k": args.top_k, "queries": len(queries), "chunks": len(indexed_docs),
+                       "embedder": args.embedder, "lexical": args.lexical, "methods": report}, f, indent=2)
+        print(f"\n💾 Report saved to: {args.output}")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -12,8 +12,12 @@ import json
 import pickle
 import math
 import sys
+import heapq
 from collections import Counter, defaultdict
 
+from tal_corpus import (SparseMatrix, InvertedIndex, CorpusDirectory, TalChunk, TermTable,
+                        is_corpus_dir, share_group_chunks)
+
 # Try to import NLTK for consistent text processing
 try:
     import nltk
@@ -41,7 +45,7 @@ class SimpleChunk:
         self.function_calls = []
         self.variable_declarations = []
         self.control_structures = []
-        self.tfidf_vector = []
+        self.tfidf_row = -1
         self.topic_distribution = []
         self.dominant_topic = 0
         self.dominant_topic_prob = 0.0
@@ -221,6 +225,11 @@ class EnhancedCorpusSearcher:
     def __init__(self):
         self.chunks = []
         self.vectorizer_data = {}
+        self.tfidf_matrix = SparseMatrix()
+        self._tfidf_row_norms = None
+        self._row_to_chunk = None
+        self._word_index = None
+        self.term_table = TermTable()
         self.functionality_groups = {}
         self.stats = {}
         self.corpus_metadata = {}
@@ -274,68 +283,68 @@ class EnhancedCorpusSearcher:
             globals()['SimpleChunk'] = SimpleChunk
             sys.modules[__name__].SimpleChunk = SimpleChunk
             
-            with open(corpus_path, 'rb') as f:
-                corpus_data = pickle.load(f)
+            corpus = None
+            if is_corpus_dir(corpus_path):
+                # Columnar corpus directory: memory-mapped, nothing is unpickled
+                corpus = CorpusDirectory(corpus_path)
+                corpus_data = dict(corpus.manifest, functionality_groups=corpus.functionality_groups)
+            else:
+                with open(corpus_path, 'rb') as f:
+                    corpus_data = pickle.load(f)
             
             # Check corpus version
             version = corpus_data.get('version', 'unknown')
             print(f"   📦 Corpus version: {version}")
             
-            # Reconstruct enhanced chunks with error handling
+            # Reconstruct enhanced chunks as compact slotted objects sharing one term table;
+            # saved token ids index the corpus term list, so they are used as they are
             self.chunks = []
+            self.term_table = TermTable(corpus_data.get('terms', ()))
+            legacy_vectors = []
             for i, chunk_data in enumerate(corpus_data.get('chunks', [])):
                 try:
                     # Handle both object and dictionary formats
                     if hasattr(chunk_data, '__dict__'):
                         # It's a SimpleChunk object
-                        chunk = chunk_data
-                    else:
-                        # It's a dictionary, create a simple object
-                        chunk = type('EnhancedChunk', (), {})()
-                        
-                        # Basic properties (always present)
-                        chunk.content = chunk_data.get('content', '')
-                        chunk.source_file = chunk_data.get('source_file', '')
-                        chunk.chunk_id = chunk_data.get('chunk_id', i)
-                        chunk.start_line = chunk_data.get('start_line', 0)
-                        chunk.end_line = chunk_data.get('end_line', 0)
-                        chunk.procedure_name = chunk_data.get('procedure_name', '')
-                        chunk.word_count = chunk_data.get('word_count', 0)
-                        chunk.char_count = chunk_data.get('char_count', 0)
-                        
-                        # Enhanced NLP properties
-                        chunk.words = chunk_data.get('words', [])
-                        chunk.stemmed_words = chunk_data.get('stemmed_words', [])
-                        chunk.semantic_category = chunk_data.get('semantic_category', 'general')
-                        
-                        # Technical pattern properties
-                        chunk.function_calls = chunk_data.get('function_calls', [])
-                        chunk.variable_declarations = chunk_data.get('variable_declarations', [])
-                        chunk.control_structures = chunk_data.get('control_structures', [])
-                        
-                        # Vector and topic properties
-                        chunk.tfidf_vector = chunk_data.get('tfidf_vector', [])
-                        chunk.topic_distribution = chunk_data.get('topic_distribution', [])
-                        chunk.dominant_topic = chunk_data.get('dominant_topic', 0)
-                        chunk.dominant_topic_prob = chunk_data.get('dominant_topic_prob', 0.0)
-                        chunk.keywords = chunk_data.get('keywords', [])
+                        chunk_data = vars(chunk_data)
+                    
+                    chunk = TalChunk.from_dict(chunk_data, self.term_table)
+                    chunk.chunk_id = chunk_data.get('chunk_id', i)
+                    chunk.semantic_category = chunk_data.get('semantic_category', 'general')
                     
                     # Ensure chunk has words for searching
-                    if not hasattr(chunk, 'words') or not chunk.words:
-                        if hasattr(chunk, 'content') and chunk.content:
-                            chunk.words = re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', chunk.content.lower())
-                        else:
-                            chunk.words = []
+                    if not chunk.word_ids and chunk.content:
+                        chunk.words = re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', chunk.content.lower())
                     
                     self.chunks.append(chunk)
+                    legacy_vectors.append(chunk_data.get('tfidf_vector'))
                     
                 except Exception as chunk_error:
                     print(f"⚠️  Warning: Error loading chunk {i}: {chunk_error}")
                     continue
             
+            # Sparse TF-IDF rows; corpora before 2.1 carry a dense list per chunk
+            if corpus is not None:
+                self.chunks = corpus.chunks
+                self.term_table = corpus.term_table
+                self.tfidf_matrix = corpus.tfidf_matrix
+            elif 'tfidf_matrix' in corpus_data:
+                self.tfidf_matrix = SparseMatrix.from_dict(corpus_data['tfidf_matrix'])
+            else:
+                self.tfidf_matrix = SparseMatrix.from_dense_rows(vector or [] for vector in legacy_vectors)
+                for row, chunk in enumerate(self.chunks):
+                    chunk.tfidf_row = row
+            
+            # Search structures are rebuilt on first use for the new corpus
+            self._tfidf_row_norms = None
+            self._row_to_chunk = None
+            self._word_index = None
+            
             # Load enhanced vectorizer data with error handling
             self.vectorizer_data = corpus_data.get('vectorizer', {})
             self.functionality_groups = corpus_data.get('functionality_groups', {})
+            if corpus is None:
+                self.functionality_groups = share_group_chunks(self.functionality_groups, self.chunks)
             self.stats = corpus_data.get('stats', {})
             self.corpus_metadata = {
                 'version': version,
@@ -388,29 +397,53 @@ class EnhancedCorpusSearcher:
             traceback.print_exc()
             return False
     
-    def enhanced_text_search(self, query, max_results=15, use_semantic_boost=True):
-        """Enhanced text search with semantic category boosting."""
+    @property
+    def word_index(self):
+        """Posting lists over chunk token ids, so a query only visits matching chunks (built on first use)."""
+        if self._word_index is None:
+            self._word_index = InvertedIndex.build(
+                chunk.word_ids or self.term_table.encode(re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', chunk.content.lower()))
+                for chunk in self.chunks)
+        return self._word_index
+    
+    def enhanced_text_search(self, query, max_results=15, use_semantic_boost=True, scoring="overlap"):
+        """Enhanced text search with semantic category boosting.
+        
+        scoring="overlap" ranks by the share of query terms a chunk contains;
+        scoring="bm25" ranks by Okapi BM25 over the chunk words instead;
+        scoring="cosine" ranks by cosine similarity with the stored TF-IDF vectors.
+        """
         print(f"🔍 Enhanced search: '{query[:50]}{'...' if len(query) > 50 else ''}'")
         
         # Process query
         query_words = re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', query.lower())
         filtered_words, stemmed_words = self.text_processor.process_words(query_words)
+        query_words_set = set(filtered_words)
+        
+        # Only chunks in the posting lists of the query terms can match; words
+        # outside the term list (complete once the index is built) have no postings
+        word_index = self.word_index
+        query_ids = self.term_table.lookup(filtered_words)
+        matches = word_index.match(query_ids)
+        if scoring == "cosine":
+            base_scores = self._cosine_scores(stemmed_words)
+        elif scoring == "bm25":
+            base_scores = word_index.bm25(query_ids)
+        else:
+            base_scores = {
+                chunk_index: len(matched) / len(query_words_set)
+                for chunk_index, matched in matches.items()
+            }
         
-        # Simple keyword matching for chunks
         results = []
-        for chunk in self.chunks:
-            # Basic keyword matching
-            chunk_words_set = set(chunk.words) if hasattr(chunk, 'words') and chunk.words else set()
-            if not chunk_words_set and chunk.content:
-                chunk_words_set = set(re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', chunk.content.lower()))
-            
-            query_words_set = set(filtered_words)
+        for chunk_index in sorted(base_scores):
+            chunk = self.chunks[chunk_index]
+            matched_words = self.term_table.decode(matches.get(chunk_index, []))
+            base_score = base_scores[chunk_index]
             
             # Calculate overlap
-            overlap = len(chunk_words_set & query_words_set)
-            if overlap > 0:
-                # Calculate similarity score
-                base_score = overlap / len(query_words_set) if query_words_set else 0
+            overlap = len(matched_words)
+            if overlap > 0 or base_score > 0:
                 
                 # Boost for semantic category
                 semantic_boost = 0.0
@@ -431,7 +464,11 @@ class EnhancedCorpusSearcher:
                 
                 # Generate match reasons
                 reasons = []
-                if base_score > 0:
+                if scoring == "cosine":
+                    reasons.append(f"TF-IDF cosine: {base_score:.3f}")
+                elif scoring == "bm25":
+                    reasons.append(f"BM25: {base_score:.2f} ({overlap} terms)")
+                elif base_score > 0:
                     reasons.append(f"Keyword overlap: {overlap} terms")
                 if semantic_boost > 0:
                     reasons.append(f"Semantic category: {chunk.semantic_category}")
@@ -439,7 +476,7 @@ class EnhancedCorpusSearcher:
                     reasons.append(f"Procedure: {chunk.procedure_name}")
                 
                 result = EnhancedSearchResult(chunk, combined_score, reasons)
-                result.keyword_matches = list(chunk_words_set & query_words_set)
+                result.keyword_matches = matched_words
                 result.semantic_relevance = semantic_boost
                 
                 if hasattr(chunk, 'semantic_category'):
@@ -447,8 +484,41 @@ class EnhancedCorpusSearcher:
                 
                 results.append(result)
         
-        results.sort(key=lambda x: x.similarity_score, reverse=True)
-        return results[:max_results]
+        # Same order as a stable sort by score, without sorting every match
+        return heapq.nlargest(max_results, results, key=lambda x: x.similarity_score)
+    
+    def _cosine_scores(self, stemmed_words):
+        """{chunk index: cosine similarity} between the query and each chunk's TF-IDF row.
+        
+        The query is projected into the stemmed vocabulary with the indexer's
+        weighting (term frequency times stem IDF) and scored against every row
+        in one sparse matrix-vector product.
+        """
+        stemmed_vocabulary = self.vectorizer_data.get('stemmed_vocabulary', {})
+        stem_idf_values = self.vectorizer_data.get('stem_idf_values', {})  # absent before 2.1
+        stem_counts = Counter(word for word in stemmed_words if word in stemmed_vocabulary)
+        if not stem_counts:
+            return {}
+        
+        query_vector = {
+            stemmed_vocabulary[word]: count / len(stemmed_words) * stem_idf_values.get(word, 1.0)
+            for word, count in stem_counts.items()
+        }
+        query_norm = math.sqrt(sum(weight * weight for weight in query_vector.values()))
+        
+        if self._tfidf_row_norms is None:
+            self._tfidf_row_norms = self.tfidf_matrix.row_norms()
+            self._row_to_chunk = {
+                chunk.tfidf_row: i for i, chunk in enumerate(self.chunks)
+                if getattr(chunk, 'tfidf_row', -1) >= 0
+            }
+        
+        scores = {}
+        for row, dot in self.tfidf_matrix.matvec_nonzero(query_vector).items():
+            chunk_index = self._row_to_chunk.get(row)
+            if chunk_index is not None and self._tfidf_row_norms[row] > 0:
+                scores[chunk_index] = dot / (query_norm * self._tfidf_row_norms[row])
+        return scores
     
     def search_semantic_categories(self, category_name=None, max_results=15):
         """Search by semantic category."""
@@ -840,7 +910,7 @@ def main():
     if len(sys.argv) > 1:
         corpus_file = sys.argv[1]
     else:
-        corpus_file = input("\n📚 Enter enhanced corpus file (.pkl): ").strip()
+        corpus_file = input("\n📚 Enter enhanced corpus file (.corpus or .pkl): ").strip()
     
     if not os.path.exists(corpus_file):
         print(f"❌ Corpus file not found: {corpus_file}")
@@ -873,10 +943,13 @@ def main():
                 max_results = int(input("Max results (default 15): ") or "15")
                 use_semantic = input("Use semantic boosting? (y/n, default y): ").strip().lower()
                 use_semantic = use_semantic != 'n'
+                scoring = input("Ranking: overlap, bm25 or cosine (default overlap): ").strip().lower()
+                if scoring not in ['overlap', 'bm25', 'cosine']:
+                    scoring = "overlap"
             except ValueError:
-                max_results, use_semantic = 15, True
+                max_results, use_semantic, scoring = 15, True, "overlap"
             
-            results = searcher.enhanced_text_search(query, max_results, use_semantic)
+            results = searcher.enhanced_text_search(query, max_results, use_semantic, scoring)
             searcher.display_enhanced_results(results)
             
             # Offer LLM prompt generation
@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+"""
+Shared TAL Corpus Structures
+
+Compact, array-backed data structures shared by the TAL indexers and
+searchers (indexer.py, searcher.py, flow_indexer.py, flow_searcher.py).
+
+SparseMatrix is a CSR matrix holding one TF-IDF row per chunk. It replaces
+the dense per-chunk Python lists of up to max_features floats, which were
+almost all zeros. Chunks keep only their row number (tfidf_row). The three
+backing arrays pickle as raw bytes, and scipy is used for vectorized
+products when it is installed.
+
+InvertedIndex maps each term to a posting list of (chunk number, term
+frequency), so keyword and BM25 search visit only the chunks that contain
+a query term.
+
+A corpus can also be saved as a directory of columnar files instead of one
+pickle:
+
+    wire_enhanced_tal_corpus_src.corpus/
+        manifest.json        format version, vectorizer data, stats, groups
+        <column>.q / .d      one int64 / float64 value per chunk
+        <column>.str + .off  UTF-8 strings and their int64 offsets
+        <column>.lst         int64 per-chunk offsets of list columns
+        <column>.I           uint32 token ids of word_ids / stemmed_ids
+        terms.str + .off     the term list those ids index
+        tfidf.indptr/.indices/.data   the sparse TF-IDF matrix
+
+Each save writes a new sibling directory (<name>.v<time>-<pid>) and then
+atomically repoints the <name> symlink at it, so readers see either the old
+or the new corpus, never a mix or a missing path. The previous version is
+kept for readers that still have it open; older ones are removed.
+
+Columns are memory-mapped and decoded only when a chunk attribute is read,
+so opening a corpus takes milliseconds. Nothing in the directory is
+unpickled, which makes it safe to open files from elsewhere.
+
+Chunks loaded from pickles become TalChunk objects. TalChunk uses __slots__
+instead of a per-object dict, and stores words as arrays of ids into a
+TermTable shared by the whole corpus.
+
+Since corpus version 2.2 the indexer saves words the same way: one global
+term list ('terms') plus per-chunk array('I') token ids ('word_ids',
+'stemmed_ids') instead of per-chunk lists of strings.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import mmap
+import time
+import shutil
+from array import array
+
+try:
+    import numpy as np
+    from scipy import sparse
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+class SparseMatrix:
+    """Compressed sparse row matrix backed by array.array buffers.
+
+    Row i's entries are indices[indptr[i]:indptr[i+1]] (column numbers, in
+    ascending order) with the matching values in data.
+    """
+
+    def __init__(self, n_cols=0, indptr=None, indices=None, data=None):
+        self.n_cols = n_cols
+        self.indptr = indptr if indptr is not None else array('q', [0])
+        self.indices = indices if indices is not None else array('i')
+        self.data = data if data is not None else array('d')
+        self._scipy = None
+        self._columns = None
+
+    @classmethod
+    def from_rows(cls, rows, n_cols):
+        """Build from an iterable of {column: value} dicts (zero values are dropped)."""
+        matrix = cls(n_cols)
+        for row in rows:
+            matrix.append_row(row)
+        return matrix
+
+    @classmethod
+    def from_dense_rows(cls, rows, n_cols=None):
+        """Build from dense lists (e.g. tfidf_vector entries of older corpora)."""
+        rows = list(rows)
+        if n_cols is None:
+            n_cols = max((len(row) for row in rows), default=0)
+        return cls.from_rows(({col: value for col, value in enumerate(row) if value} for row in rows), n_cols)
+
+    def append_row(self, row):
+        """Append one {column: value} row; returns its row number."""
+        for col in sorted(row):
+            value = row[col]
+            if value:
+                self.indices.append(col)
+                self.data.append(value)
+        self.indptr.append(len(self.indices))
+        self._scipy = None
+        self._columns = None
+        return len(self.indptr) - 2
+
+    @property
+    def n_rows(self):
+        return len(self.indptr) - 1
+
+    @property
+    def shape(self):
+        return (self.n_rows, self.n_cols)
+
+    @property
+    def nnz(self):
+        return len(self.indices)
+
+    def __len__(self):
+        return self.n_rows
+
+    def row_items(self, row):
+        """(column, value) pairs of one row, in column order."""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return list(zip(self.indices[start:end], self.data[start:end]))
+
+    def row_dict(self, row):
+        return dict(self.row_items(row))
+
+    def dense_row(self, row):
+        """One row as a dense list (the old tfidf_vector layout)."""
+        vector = [0.0] * self.n_cols
+        for col, value in self.row_items(row):
+            vector[col] = value
+        return vector
+
+    def row_norms(self):
+        """Euclidean norm of every row."""
+        norms = array('d')
+        indptr, data = self.indptr, self.data
+        for row in range(self.n_rows):
+            norms.append(math.sqrt(sum(value * value for value in data[indptr[row]:indptr[row + 1]])))
+        return norms
+
+    def _column_index(self):
+        """Transposed (CSC) copy, built on first use: column -> (rows, values)."""
+        if self._columns is None:
+            columns = {}
+            indptr, indices, data = self.indptr, self.indices, self.data
+            for row in range(self.n_rows):
+                for pos in range(indptr[row], indptr[row + 1]):
+                    entry = columns.get(indices[pos])
+                    if entry is None:
+                        entry = columns[indices[pos]] = (array('i'), array('d'))
+                    entry[0].append(row)
+                    entry[1].append(data[pos])
+            self._columns = columns
+        return self._columns
+
+    def to_scipy(self):
+        """scipy.sparse.csr_matrix view over the same buffers (cached)."""
+        if not SCIPY_AVAILABLE:
+            raise RuntimeError("scipy is not installed")
+        if self._scipy is None:
+            self._scipy = sparse.csr_matrix(
+                (np.frombuffer(self.data, dtype=np.float64),
+                 np.frombuffer(self.indices, dtype=np.int32),
+                 np.frombuffer(self.indptr, dtype=np.int64)),
+                shape=self.shape)
+        return self._scipy
+
+    def matvec(self, vector):
+        """Dot product of every row with a {column: weight} vector; returns a list per row."""
+        if SCIPY_AVAILABLE and self.nnz:
+            dense = np.zeros(self.n_cols, dtype=np.float64)
+            for col, weight in vector.items():
+                if 0 <= col < self.n_cols:
+                    dense[col] = weight
+            return self.to_scipy().dot(dense).tolist()
+
+        scores = []
+        indptr, indices, data = self.indptr, self.indices, self.data
+        for row in range(self.n_rows):
+            score = 0.0
+            for pos in range(indptr[row], indptr[row + 1]):
+                weight = vector.get(indices[pos])
+                if weight is not None:
+                    score += data[pos] * weight
+            scores.append(score)
+        return scores
+
+    def matvec_nonzero(self, vector):
+        """Like matvec, but only {row: score} for rows with a non-zero score.
+
+        Without scipy only the columns present in vector are visited.
+        """
+        if SCIPY_AVAILABLE and self.nnz:
+            scores = self.matvec(vector)
+            return {row: scores[row] for row in np.flatnonzero(scores).tolist()}
+
+        scores = {}
+        columns = self._column_index()
+        for col, weight in vector.items():
+            entry = columns.get(col)
+            if entry is None:
+                continue
+            for row, value in zip(*entry):
+                scores[row] = scores.get(row, 0.0) + value * weight
+        return {row: score for row, score in scores.items() if score}
+
+    def to_dict(self):
+        """Picklable form; the arrays serialize as raw buffers."""
+        return {
+            'format': 'csr',
+            'shape': self.shape,
+            'indptr': self.indptr,
+            'indices': self.indices,
+            'data': self.data
+        }
+
+    @classmethod
+    def from_dict(cls, matrix_data):
+        return cls(matrix_data['shape'][1], matrix_data['indptr'], matrix_data['indices'], matrix_data['data'])
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(state['shape'][1], state['indptr'], state['indices'], state['data'])
+
+class InvertedIndex:
+    """Term -> posting list (chunk numbers with term frequencies) over chunk word lists.
+
+    A query only touches the postings of its own terms, so its cost follows
+    the number of matching chunks instead of the corpus size.
+    """
+
+    def __init__(self):
+        self.postings = {}  # term -> (array of chunk numbers, array of term frequencies)
+        self.doc_lengths = array('i')
+        self.avg_doc_length = 0.0
+
+    @classmethod
+    def build(cls, documents):
+        """Index an iterable of token lists; document i is chunk number i."""
+        index = cls()
+        for doc_id, tokens in enumerate(documents):
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                posting = index.postings.get(term)
+                if posting is None:
+                    posting = index.postings[term] = (array('i'), array('i'))
+                posting[0].append(doc_id)
+                posting[1].append(tf)
+            index.doc_lengths.append(len(tokens))
+        if index.doc_lengths:
+            index.avg_doc_length = sum(index.doc_lengths) / len(index.doc_lengths)
+        return index
+
+    @property
+    def n_docs(self):
+        return len(self.doc_lengths)
+
+    def doc_freq(self, term):
+        posting = self.postings.get(term)
+        return len(posting[0]) if posting else 0
+
+    def match(self, terms):
+        """{chunk number: [matched terms, in query order]} for chunks containing any term."""
+        matches = {}
+        for term in dict.fromkeys(terms):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            for doc_id in posting[0]:
+                matched = matches.get(doc_id)
+                if matched is None:
+                    matches[doc_id] = [term]
+                else:
+                    matched.append(term)
+        return matches
+
+    def bm25(self, terms, k1=1.2, b=0.75):
+        """{chunk number: Okapi BM25 score} for chunks containing any term."""
+        scores = {}
+        n_docs = self.n_docs
+        avg_length = self.avg_doc_length or 1.0
+        doc_lengths = self.doc_lengths
+        for term in dict.fromkeys(terms):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            doc_ids, tfs = posting
+            idf = math.log(1 + (n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for doc_id, tf in zip(doc_ids, tfs):
+                norm = k1 * (1 - b + b * doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+class TermTable:
+    """Interns terms to dense integer ids shared by every chunk of a corpus."""
+
+    __slots__ = ('ids', 'terms')
+
+    def __init__(self, terms=()):
+        self.terms = []
+        self.ids = {}
+        for term in terms:
+            self.id(term)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def id(self, term):
+        """Id of term, adding it on first use."""
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def encode(self, words):
+        return array('I', [self.id(word) for word in words])
+
+    def decode(self, term_ids):
+        terms = self.terms
+        return [terms[term_id] for term_id in term_ids]
+
+    def narrow(self, term_ids):
+        """term_ids as a 2-byte array('H') when every id of the table fits in one."""
+        return array('H', term_ids) if len(self.terms) <= 0x10000 else term_ids
+
+    def lookup(self, terms):
+        """Ids of the terms already in the table, in order; unknown terms are skipped."""
+        ids = self.ids
+        return [ids[term] for term in terms if term in ids]
+
+class ChunkBase:
+    """Slotted fields every TAL chunk has, in the indexers' saved layouts."""
+
+    __slots__ = ('content', 'source_file', 'chunk_id', 'start_line', 'end_line',
+                 'procedure_name', 'function_calls', 'tfidf_row')
+
+class TalChunk(ChunkBase):
+    """Compact loaded chunk of an enhanced TAL corpus.
+
+    words and stemmed_words read and write through the shared TermTable,
+    so each chunk keeps only two compact arrays of integer ids.
+    """
+
+    __slots__ = ('word_count', 'char_count', 'semantic_category', 'variable_declarations',
+                 'control_structures', 'topic_distribution', 'dominant_topic',
+                 'dominant_topic_prob', 'keywords', 'word_ids', 'stemmed_ids', 'term_table',
+                 'corpus_source', 'corpus_index')
+
+    def __init__(self, term_table):
+        self.term_table = term_table
+        self.word_ids = array('I')
+        self.stemmed_ids = array('I')
+
+    @property
+    def words(self):
+        return self.term_table.decode(self.word_ids)
+
+    @words.setter
+    def words(self, words):
+        self.word_ids = self.term_table.encode(words)
+
+    @property
+    def stemmed_words(self):
+        return self.term_table.decode(self.stemmed_ids)
+
+    @stemmed_words.setter
+    def stemmed_words(self, words):
+        self.stemmed_ids = self.term_table.encode(words)
+
+    @classmethod
+    def from_dict(cls, chunk_data, term_table, fill_defaults=True, term_map=None):
+        """Build from a saved chunk dict; unknown keys are ignored.
+
+        With fill_defaults, columns missing from chunk_data get the empty
+        value of their type; otherwise they are left unset. Saved token ids
+        index the corpus's own term list: term_map (saved id -> term_table
+        id) translates them when term_table is shared with other corpora.
+        Corpora before 2.2 save the word strings, which are encoded here.
+        """
+        chunk = cls(term_table)
+        for name, kind in CORPUS_COLUMNS.items():
+            if name in chunk_data:
+                value = chunk_data[name]
+                if kind == 'id_list':
+                    if term_map is not None:
+                        value = array('I', [term_map[term_id] for term_id in value])
+                    elif not isinstance(value, array):
+                        value = array('I', value)
+            elif fill_defaults and kind != 'id_list':
+                value = COLUMN_DEFAULTS[kind]
+            else:
+                continue
+            setattr(chunk, name, value)
+        for name in TERM_COLUMNS:
+            if name in chunk_data:
+                setattr(chunk, name, chunk_data[name])
+        if 'tfidf_row' not in chunk_data:
+            chunk.tfidf_row = -1
+        return chunk
+
+def share_group_chunks(functionality_groups, chunks):
+    """Point pickled functionality groups at the loaded chunks instead of their own copies.
+
+    Groups in a pickled corpus hold full chunk objects (before 2.2) or the
+    saved chunk dicts; matching them by (source_file, chunk_id) lets those
+    copies be freed.
+    """
+    by_key = {(chunk.source_file, chunk.chunk_id): chunk for chunk in chunks}
+
+    def shared(chunk):
+        fields = chunk if isinstance(chunk, dict) else vars(chunk) if hasattr(chunk, '__dict__') else {}
+        return by_key.get((fields.get('source_file'), fields.get('chunk_id')), chunk)
+
+    return {
+        group_type: {name: [shared(chunk) for chunk in group] for name, group in groups.items()}
+        if isinstance(groups, dict) else groups
+        for group_type, groups in functionality_groups.items()
+    }
+
+CORPUS_FORMAT = "tal-corpus"
+CORPUS_FORMAT_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+
+# Per-chunk columns of the directory format and how each is stored
+CORPUS_COLUMNS = {
+    'content': 'str',
+    'source_file': 'str',
+    'procedure_name': 'str',
+    'semantic_category': 'str',
+    'chunk_id': 'int',
+    'start_line': 'int',
+    'end_line': 'int',
+    'word_count': 'int',
+    'char_count': 'int',
+    'tfidf_row': 'int',
+    'dominant_topic': 'int',
+    'dominant_topic_prob': 'float',
+    'topic_distribution': 'float_list',
+    'word_ids': 'id_list',
+    'stemmed_ids': 'id_list',
+    'function_calls': 'str_list',
+    'variable_declarations': 'str_list',
+    'control_structures': 'str_list',
+    'keywords': 'str_list',
+}
+
+COLUMN_DEFAULTS = {'str': '', 'int': 0, 'float': 0.0, 'float_list': [], 'str_list': [], 'id_list': ()}
+
+# Word lists stored as token ids into the corpus term list, by word attribute
+TERM_COLUMNS = {'words': 'word_ids', 'stemmed_words': 'stemmed_ids'}
+
+def is_corpus_dir(path):
+    """True if path is a corpus directory written by write_corpus_dir."""
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+def _write_array(path, typecode, values):
+    with open(path, 'wb') as f:
+        array(typecode, values).tofile(f)
+
+def _write_strings(dir_path, name, strings):
+    """Concatenated UTF-8 strings plus n+1 int64 offsets."""
+    offsets = array('q', [0])
+    with open(os.path.join(dir_path, f"{name}.str"), 'wb') as f:
+        position = 0
+        for string in strings:
+            encoded = string.encode('utf-8')
+            f.write(encoded)
+            position += len(encoded)
+            offsets.append(position)
+    with open(os.path.join(dir_path, f"{name}.off"), 'wb') as f:
+        offsets.tofile(f)
+
+def _list_offsets(lists):
+    offsets = array('q', [0])
+    for values in lists:
+        offsets.append(offsets[-1] + len(values))
+    return offsets
+
+def _publish_corpus_version(path, version_dir):
+    """Point the path symlink at version_dir and drop all but the previous version."""
+    previous_dir = None
+    if os.path.islink(path):
+        previous_dir = os.path.join(os.path.dirname(path), os.readlink(path))
+    elif os.path.isdir(path):
+        # Plain directory from before versioned saves: the one swap that is not atomic
+        previous_dir = f"{path}.old-{os.getpid()}"
+        os.rename(path, previous_dir)
+
+    link_tmp = f"{path}.link-{os.getpid()}"
+    if os.path.lexists(link_tmp):
+        os.remove(link_tmp)
+    os.symlink(os.path.basename(version_dir), link_tmp)
+    os.replace(link_tmp, path)
+
+    # Versions older than the new one, except the previous; a concurrent writer's newer one is left alone
+    base = os.path.basename(path)
+    version_pattern = re.compile(rf"{re.escape(base)}\.(?:v(\d+)-\d+|old-\d+)$")
+    keep = {os.path.basename(version_dir), os.path.basename(previous_dir or "")}
+    new_stamp = int(version_pattern.match(os.path.basename(version_dir)).group(1))
+    parent = os.path.dirname(path) or "."
+    for name in os.listdir(parent):
+        match = version_pattern.match(name)
+        if match and name not in keep and int(match.group(1) or 0) < new_stamp:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+def write_corpus_dir(path, corpus_data):
+    """Write corpus_data (the layout save_enhanced_corpus pickles) as a corpus directory.
+
+    functionality_groups must hold chunk numbers rather than chunk objects.
+    The data goes into a new versioned directory and path is an atomically
+    swapped symlink to it.
+    """
+    chunks = corpus_data['chunks']
+    path = path.rstrip(os.sep)
+    staging_dir = f"{path}.v{int(time.time() * 1000)}-{os.getpid()}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    try:
+        for name, kind in CORPUS_COLUMNS.items():
+            default = COLUMN_DEFAULTS[kind]
+            values = [chunk.get(name, default) for chunk in chunks]
+            column_path = os.path.join(staging_dir, name)
+            if kind == 'str':
+                _write_strings(staging_dir, name, values)
+            elif kind == 'int':
+                _write_array(f"{column_path}.q", 'q', values)
+            elif kind == 'float':
+                _write_array(f"{column_path}.d", 'd', values)
+            elif kind == 'float_list':
+                _write_array(f"{column_path}.lst", 'q', _list_offsets(values))
+                _write_array(f"{column_path}.d", 'd', (value for row in values for value in row))
+            elif kind == 'id_list':
+                _write_array(f"{column_path}.lst", 'q', _list_offsets(values))
+                _write_array(f"{column_path}.I", 'I', (value for row in values for value in row))
+            else:
+                _write_array(f"{column_path}.lst", 'q', _list_offsets(values))
+                _write_strings(staging_dir, name, (value for row in values for value in row))
+
+        matrix = corpus_data.get('tfidf_matrix') or SparseMatrix().to_dict()
+        _write_array(os.path.join(staging_dir, "tfidf.indptr"), 'q', matrix['indptr'])
+        _write_array(os.path.join(staging_dir, "tfidf.indices"), 'i', matrix['indices'])
+        _write_array(os.path.join(staging_dir, "tfidf.data"), 'd', matrix['data'])
+        terms = corpus_data.get('terms', [])
+        _write_strings(staging_dir, "terms", terms)
+
+        manifest = {key: value for key, value in corpus_data.items() if key not in ('chunks', 'tfidf_matrix', 'terms')}
+        manifest.update({
+            'format': CORPUS_FORMAT,
+            'format_version': CORPUS_FORMAT_VERSION,
+            'byteorder': sys.byteorder,
+            'n_chunks': len(chunks),
+            'columns': CORPUS_COLUMNS,
+            'n_terms': len(terms),
+            'tfidf_shape': list(matrix['shape']),
+        })
+        with open(os.path.join(staging_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    _publish_corpus_version(path, staging_dir)
+
+class CorpusChunk:
+    """Lazy view of one chunk of a CorpusDirectory; columns are decoded on access."""
+
+    __slots__ = ('_corpus', 'index', 'corpus_source', 'corpus_index')
+
+    def __init__(self, corpus, index):
+        self._corpus = corpus
+        self.index = index
+
+    def __getattr__(self, name):
+        # Only called for attributes not set on the view itself
+        if self._corpus.has_column(name):
+            return self._corpus.value(name, self.index)
+        raise AttributeError(name)
+
+    def __repr__(self):
+        return f"CorpusChunk({self.index}, {os.path.basename(self.source_file)})"
+
+class CorpusDirectory:
+    """Read-only, memory-mapped view of a corpus directory."""
+
+    def __init__(self, path):
+        # Resolve the symlink once, so columns opened later come from the same version
+        self.path = os.path.realpath(path)
+        with open(os.path.join(self.path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != CORPUS_FORMAT:
+            raise ValueError(f"Not a TAL corpus directory: {path}")
+        if self.manifest.get('format_version', 0) > CORPUS_FORMAT_VERSION:
+            raise ValueError(f"Corpus format {self.manifest['format_version']} is newer than supported ({CORPUS_FORMAT_VERSION})")
+        if self.manifest.get('byteorder') != sys.byteorder:
+            raise ValueError(f"Corpus was written on a {self.manifest.get('byteorder')}-endian machine")
+
+        self._maps = {}
+        self._views = {}
+        self._term_table = None
+        self.columns = self.manifest['columns']
+        self.n_chunks = self.manifest['n_chunks']
+        self.chunks = [CorpusChunk(self, i) for i in range(self.n_chunks)]
+
+        n_rows, n_cols = self.manifest['tfidf_shape']
+        self.tfidf_matrix = SparseMatrix(
+            n_cols,
+            self._numbers("tfidf.indptr", 'q') if n_rows else array('q', [0]),
+            self._numbers("tfidf.indices", 'i'),
+            self._numbers("tfidf.data", 'd'))
+
+    def _mapped(self, filename):
+        """The file's mmap (None for an empty file, which cannot be mapped)."""
+        if filename not in self._maps:
+            with open(os.path.join(self.path, filename), 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                self._maps[filename] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        return self._maps[filename]
+
+    def _numbers(self, filename, typecode):
+        if filename not in self._views:
+            mapped = self._mapped(filename)
+            self._views[filename] = memoryview(mapped).cast(typecode) if mapped is not None else array(typecode)
+        return self._views[filename]
+
+    def _string(self, name, position):
+        offsets = self._numbers(f"{name}.off", 'q')
+        start, end = offsets[position], offsets[position + 1]
+        return self._mapped(f"{name}.str")[start:end].decode('utf-8') if end > start else ''
+
+    @property
+    def term_table(self):
+        """The corpus term list that token ids index (read on first use)."""
+        if self._term_table is None:
+            n_terms = self.manifest.get('n_terms', 0)
+            self._term_table = TermTable(self._string("terms", position) for position in range(n_terms))
+        return self._term_table
+
+    def has_column(self, name):
+        """True for stored columns and for word lists derivable from them."""
+        return name in self.columns or name in TERM_COLUMNS or name in TERM_COLUMNS.values()
+
+    def value(self, name, index):
+        """Decode one chunk's value of a column.
+
+        id_list columns come back as read-only uint32 memoryviews. Word lists
+        are decoded from their token ids, and version 1 directories, which
+        store the words themselves, are encoded into ids on request.
+        """
+        kind = self.columns.get(name)
+        if kind is None:
+            if name in TERM_COLUMNS:
+                return self.term_table.decode(self.value(TERM_COLUMNS[name], index))
+            for words_name, ids_name in TERM_COLUMNS.items():
+                if name == ids_name and words_name in self.columns:
+                    return self.term_table.encode(self.value(words_name, index))
+            raise KeyError(name)
+        if kind == 'str':
+            return self._string(name, index)
+        if kind == 'int':
+            return self._numbers(f"{name}.q", 'q')[index]
+        if kind == 'float':
+            return self._numbers(f"{name}.d", 'd')[index]
+        offsets = self._numbers(f"{name}.lst", 'q')
+        start, end = offsets[index], offsets[index + 1]
+        if kind == 'float_list':
+            return list(self._numbers(f"{name}.d", 'd')[start:end])
+        if kind == 'id_list':
+            return self._numbers(f"{name}.I", 'I')[start:end]
+        return [self._string(name, position) for position in range(start, end)]
+
+    def column(self, name):
+        """Every chunk's value of one column, in chunk order."""
+        return [self.value(name, index) for index in range(self.n_chunks)]
+
+    @property
+    def functionality_groups(self):
+        """Groups from the manifest with chunk numbers resolved to chunk views."""
+        return {
+            group_type: {name: [self.chunks[index] for index in indices] for name, indices in groups.items()}
+            for group_type, groups in self.manifest.get('functionality_groups', {}).items()
+        }
@@ -17,6 +17,8 @@ from dataclasses import dataclass
 from collections import Counter, defaultdict
 import math
 
+from tal_corpus import CorpusDirectory, TalChunk, TermTable, is_corpus_dir, share_group_chunks
+
 # Only use libraries that don't download external models
 try:
     from sklearn.feature_extraction.text import TfidfVectorizer
@@ -51,7 +53,7 @@ class SimpleChunk:
         self.function_calls = []
         self.variable_declarations = []
         self.control_structures = []
-        self.tfidf_vector = []
+        self.tfidf_row = -1
         self.topic_distribution = []
         self.dominant_topic = 0
         self.dominant_topic_prob = 0.0
@@ -169,6 +171,7 @@ class StandaloneCorpusDataExtractor:
             self.corpus_paths = corpus_paths
         
         self.chunks = []
+        self.term_table = TermTable()  # shared by the words of every loaded chunk
         self.vectorizer_data = {}
         self.functionality_groups = {}
         self.feature_extractor = WireProcessingFeatureExtractor()
@@ -191,21 +194,29 @@ class StandaloneCorpusDataExtractor:
             print(f"   📖 Loading corpus {i+1}/{len(self.corpus_paths)}: {os.path.basename(corpus_path)}")
             
             try:
-                with open(corpus_path, 'rb') as f:
-                    corpus_data = pickle.load(f)
-                
                 corpus_chunks = []
+                if is_corpus_dir(corpus_path):
+                    # Columnar corpus directory: chunk views over memory-mapped columns
+                    corpus = CorpusDirectory(corpus_path)
+                    corpus_data = dict(corpus.manifest, functionality_groups=corpus.functionality_groups)
+                    for chunk in corpus.chunks:
+                        chunk.corpus_source = os.path.basename(corpus_path)
+                        chunk.corpus_index = i
+                        corpus_chunks.append(chunk)
+                else:
+                    with open(corpus_path, 'rb') as f:
+                        corpus_data = pickle.load(f)
                 
-                # Reconstruct chunks with error handling
+                # Reconstruct chunks as compact slotted objects with error handling;
+                # saved token ids are translated into the shared term table
+                term_map = self.term_table.encode(corpus_data['terms']) if 'terms' in corpus_data else None
                 for j, chunk_data in enumerate(corpus_data.get('chunks', [])):
                     try:
                         # Handle both object and dictionary formats
                         if hasattr(chunk_data, '__dict__'):
-                            chunk = chunk_data
-                        else:
-                            chunk = type('Chunk', (), {})()
-                            for key, value in chunk_data.items():
-                                setattr(chunk, key, value)
+                            chunk_data = vars(chunk_data)
+                        chunk = TalChunk.from_dict(chunk_data, self.term_table, fill_defaults=False,
+                                                   term_map=term_map)
                         
                         # Ensure required attributes exist
                         if not hasattr(chunk, 'semantic_category'):
@@ -229,6 +240,8 @@ class StandaloneCorpusDataExtractor:
                 
                 # Combine functionality groups
                 func_groups = corpus_data.get('functionality_groups', {})
+                if not is_corpus_dir(corpus_path):
+                    func_groups = share_group_chunks(func_groups, corpus_chunks)
                 for group_type, groups in func_groups.items():
                     if isinstance(groups, dict):
                         for group_name, group_chunks in groups.items():
@@ -1291,6 +1304,10 @@ class StandaloneWireProcessingTrainer:
             print("🧠 No similar code found in training data")
             return "Code analysis: Unable to provide explanation based on training data."
 
+def is_corpus_path(path):
+    """A corpus pickle (.pkl) or a columnar corpus directory (.corpus)."""
+    return (os.path.isfile(path) and path.endswith('.pkl')) or is_corpus_dir(path)
+
 def get_corpus_files():
     """Interactive function to get corpus file paths."""
     print("📚 CORPUS FILE SELECTION")
@@ -1298,17 +1315,17 @@ def get_corpus_files():
     print("Options:")
     print("1. Single corpus file")
     print("2. Multiple corpus files")
-    print("3. All .pkl files in a directory")
+    print("3. All corpus files (.pkl / .corpus) in a directory")
     
     choice = input("\nSelect option (1-3): ").strip()
     
     if choice == "1":
         # Single file
-        corpus_path = input("📁 Enter corpus file path (.pkl): ").strip()
-        if os.path.exists(corpus_path) and corpus_path.endswith('.pkl'):
+        corpus_path = input("📁 Enter corpus file path (.pkl or .corpus): ").strip()
+        if is_corpus_path(corpus_path):
             return [corpus_path]
         else:
-            print(f"❌ File not found or not a .pkl file: {corpus_path}")
+            print(f"❌ Not a .pkl file or corpus directory: {corpus_path}")
             return None
     
     elif choice == "2":
@@ -1319,11 +1336,11 @@ def get_corpus_files():
             path = input("Corpus file: ").strip()
             if not path:
                 break
-            if os.path.exists(path) and path.endswith('.pkl'):
+            if is_corpus_path(path):
                 corpus_paths.append(path)
                 print(f"   ✅ Added: {os.path.basename(path)}")
             else:
-                print(f"   ❌ File not found or not a .pkl file: {path}")
+                print(f"   ❌ Not a .pkl file or corpus directory: {path}")
         
         if corpus_paths:
             return corpus_paths
@@ -1332,7 +1349,7 @@ def get_corpus_files():
             return None
     
     elif choice == "3":
-        # All .pkl files in directory
+        # All corpus files in directory
         directory = input("📁 Enter directory path: ").strip()
         if not os.path.exists(directory) or not os.path.isdir(directory):
             print(f"❌ Directory not found: {directory}")
@@ -1340,12 +1357,12 @@ def get_corpus_files():
         
         pkl_files = []
         for file in os.listdir(directory):
-            if file.endswith('.pkl'):
-                full_path = os.path.join(directory, file)
+            full_path = os.path.join(directory, file)
+            if is_corpus_path(full_path):
                 pkl_files.append(full_path)
         
         if pkl_files:
-            print(f"\n📦 Found {len(pkl_files)} .pkl files:")
+            print(f"\n📦 Found {len(pkl_files)} corpus files:")
             for i, file_path in enumerate(pkl_files, 1):
                 print(f"   {i}. {os.path.basename(file_path)}")
             
@@ -1362,7 +1379,7 @@ def get_corpus_files():
                 
                 return selected_files if selected_files else None
         else:
-            print(f"❌ No .pkl files found in directory: {directory}")
+            print(f"❌ No corpus files found in directory: {directory}")
             return None
     
     else:
@@ -1405,13 +1422,13 @@ def main():
         # Command line arguments - support multiple files
         corpus_paths = []
         for arg in sys.argv[1:]:
-            if os.path.exists(arg) and arg.endswith('.pkl'):
+            if is_corpus_path(arg):
                 corpus_paths.append(arg)
             else:
                 print(f"⚠️  Skipping invalid file: {arg}")
         
         if not corpus_paths:
-            print("❌ No valid .pkl files provided in command line")
+            print("❌ No valid corpus files provided in command line")
             corpus_paths = get_corpus_files()
     else:
         # Interactive mode
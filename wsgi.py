@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for the document search API.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()